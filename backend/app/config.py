@@ -32,6 +32,108 @@ class Settings(BaseSettings):
     google_client_secret: str | None = None
     frontend_origin: str | None = None
     enable_mock_data: bool = True
+
+    # Logging
+    log_level: str = "INFO"
+    log_json: bool = True
+    log_file: str | None = "llm_debug.log"  # relative to backend/; empty to disable
+    log_max_bytes: int = 10_000_000
+    log_backup_count: int = 5
+    log_payload_sample_rate: float = 0.0  # fraction of full tool payloads logged at DEBUG
+    log_payload_max_chars: int = 20000
+
+    # Import the Gemini SDK and MCP tool modules in a background task after startup
+    warmup_agents: bool = True
+
+    # Gemini call concurrency (per process)
+    gemini_max_concurrency: int = 16
+    gemini_queue_timeout_seconds: float = 30.0
+
+    # Agent tool execution
+    tool_timeout_seconds: float = 45.0
+    compact_tool_results: bool = True
+    tool_result_max_chars: int = 6000
+    prefetch_tools: bool = True  # start flight searches from travel_intent alongside the first LLM call
+    direct_search_enabled: bool = True  # answer complete travel-form searches from a template, without the LLM
+    query_router_enabled: bool = True  # bind only the tools of the chain(s) a travel/general prompt needs
+    query_router_min_confidence: float = 0.6  # classifier posterior below this keeps every tool
+    sandbox_pipelined_rag: bool = True  # sandbox: retrieve RAG (tool-parameter guidance) alongside the first turn
+
+    # Per-request time budget for the agent loop; requests may override it
+    agent_deadline_travel_seconds: float = 90.0
+    agent_deadline_jobs_seconds: float = 60.0
+    agent_deadline_trends_seconds: float = 60.0
+    agent_deadline_general_seconds: float = 60.0
+    agent_synthesis_reserve_seconds: float = 10.0  # held back for the final answer turn
+
+    # Tiered models: tool-call and planning turns vs the final answer. A mode
+    # setting overrides the all-modes one; unset falls back to gemini_model
+    gemini_tool_model: str | None = None
+    gemini_answer_model: str | None = None
+    gemini_tool_model_travel: str | None = None
+    gemini_tool_model_jobs: str | None = None
+    gemini_tool_model_trends: str | None = None
+    gemini_tool_model_general: str | None = None
+    gemini_answer_model_travel: str | None = None
+    gemini_answer_model_jobs: str | None = None
+    gemini_answer_model_trends: str | None = None
+    gemini_answer_model_general: str | None = None
+
+    # Conversation history budget (estimated tokens); older turns are summarized
+    history_keep_turns: int = 6
+    history_token_budget_travel: int = 6000
+    history_token_budget_jobs: int = 4000
+    history_token_budget_trends: int = 4000
+    history_token_budget_general: int = 4000
+
+    # Semantic response cache (stateless prompts only)
+    response_cache_enabled: bool = True
+    response_cache_embedder: str = "local"  # "local" hashing or "together" (RAG embeddings)
+    response_cache_threshold: float = 0.9  # free-text cosine similarity needed once the prompt slots match exactly
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_travel_seconds: float = 300.0  # fares and availability go stale fast
+    response_cache_ttl_jobs_seconds: float = 3600.0
+    response_cache_ttl_trends_seconds: float = 1800.0
+    response_cache_ttl_general_seconds: float = 600.0
+
+    # Server-side conversations for /api/llm/prompt (clients send only the new message)
+    conversation_backend: str = "memory"  # "memory" or "database" (persisted via DATABASE_URL)
+    conversation_ttl_seconds: float = 3600.0  # idle conversations expire after this
+    conversation_max_entries: int = 1000  # in-memory LRU bound
+    conversation_max_turns: int = 100  # oldest turns are dropped beyond this
+
+    # RapidAPI MCP HTTP client (sandbox agent): one connection pool per
+    # service; a service setting overrides the all-services one
+    mcp_http2: bool = True  # multiplex concurrent calls over one connection (needs h2)
+    mcp_timeout_seconds: float = 60.0
+    mcp_max_connections: int = 20
+    mcp_max_keepalive_connections: int = 10
+    mcp_keepalive_expiry_seconds: float = 120.0  # idle connections stay warm between bursts
+    mcp_max_connections_flights_sky: int | None = None
+    mcp_max_connections_booking: int | None = None
+    mcp_max_connections_google_flights2: int | None = None
+    mcp_warm_connections: int = 1  # opened per service at startup when RAPIDAPI_KEY is set (0 disables)
+    # Read-only tools retry timeouts, 5xx and 429 with jittered backoff
+    mcp_retry_attempts: int = 3  # total attempts, including the first
+    mcp_retry_base_delay_seconds: float = 0.5
+    mcp_retry_max_delay_seconds: float = 4.0
+    mcp_retry_attempts_flights_sky: int | None = None
+    mcp_retry_attempts_booking: int | None = None
+    mcp_retry_attempts_google_flights2: int | None = None
+    # Per-service circuit breaker: fail fast after this many consecutive failures
+    mcp_breaker_failure_threshold: int = 5
+    mcp_breaker_reset_seconds: float = 30.0  # open period before a probe call is let through
+    # RapidAPI rate limiter (MCP client and mcp_servers tools): a token bucket
+    # per API host, slowed further by the x-ratelimit-* headers RapidAPI returns
+    rapidapi_rate_per_second: float = 5.0
+    rapidapi_burst: int = 5
+    rapidapi_max_wait_seconds: float = 10.0  # longest a call queues for budget before it fails
+    rapidapi_quota_cooldown_seconds: float = 60.0  # an exhausted quota without a reset header blocks this long
+
+    # MCP tool catalog (schemas + forms for /api/mcp): snapshot on disk, refreshed in the background
+    mcp_catalog_path: str | None = "data/cache/mcp_tool_catalog.json"  # relative to backend/; empty: memory only
+    mcp_catalog_ttl_seconds: float = 21600.0
+    mcp_catalog_refresh: bool = False  # also refresh stale servers from a background task (else on request)
     
     # MCP Keys
     rapidapi_key: str | None = None
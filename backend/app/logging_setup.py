@@ -0,0 +1,148 @@
+"""
+Logging pipeline for the API.
+
+Records are handed to a QueueHandler on the calling thread and written by a
+QueueListener thread, so the event loop never blocks on console or disk I/O.
+Every record carries the current request id; with ``log_json`` enabled the
+output is one JSON object per line. Full tool-result payloads are only logged
+for a configurable sample of calls.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .config import Settings
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_listener: logging.handlers.QueueListener | None = None
+_payload_sample_rate = 0.0
+_payload_max_chars = 20000
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, request id, message and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(settings: Settings) -> None:
+    """Install the queue-backed logging pipeline (idempotent)."""
+    global _listener, _payload_sample_rate, _payload_max_chars
+    if _listener is not None:
+        return
+
+    _payload_sample_rate = settings.log_payload_sample_rate
+    _payload_max_chars = settings.log_payload_max_chars
+
+    if settings.log_json:
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] [%(request_id)s] %(message)s")
+
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if settings.log_file:
+        log_path = Path(settings.log_file)
+        if not log_path.is_absolute():
+            log_path = Path(__file__).parent.parent / log_path
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_path,
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Filter on the producer side so the request id is read in the request's context
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.setLevel(settings.log_level.upper())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def log_payload(logger: logging.Logger, label: str, payload: str, **fields: Any) -> None:
+    """Log a full payload at DEBUG for a sampled fraction of calls."""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= _payload_sample_rate:
+        return
+    logger.debug(
+        f"PAYLOAD {label}",
+        extra={"payload": payload[:_payload_max_chars], "payload_chars": len(payload), **fields},
+    )
+
+
+class RequestIdMiddleware:
+    """ASGI middleware that binds a request id (X-Request-ID or a new uuid) to the context."""
+
+    header = b"x-request-id"
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode() for key, value in scope["headers"] if key == self.header),
+            uuid.uuid4().hex[:16],
+        )
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((self.header, request_id.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,32 +1,71 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
+from .logging_setup import RequestIdMiddleware, configure_logging
 from .routers import discovery, llm, autocomplete, mcp_tools, trip_planner
 from .schemas import HealthResponse
 from .database import init_db
+from .dependencies import get_llm_client
+from .services.mcp_client import configure_rate_limiter, get_mcp_client, shutdown_mcp_client
+from .services.tool_catalog import get_tool_catalog
 
 settings = get_settings()
+configure_logging(settings)
+logger = logging.getLogger(__name__)
+
+
+async def warm_up_agents() -> None:
+    """Load the Gemini SDK and MCP tool modules in the background."""
+    try:
+        await asyncio.to_thread(lambda: get_llm_client().warm_up())
+    except Exception as e:
+        logger.warning(f"Agent warmup failed: {e}")
+
+
+async def warm_up_mcp_connections() -> None:
+    """Open the RapidAPI MCP connection pools before the first sandbox call."""
+    try:
+        await get_mcp_client().warm_up(settings.mcp_warm_connections)
+    except Exception as e:
+        logger.warning(f"MCP connection warmup failed: {e}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
+    """Initialize database and tool catalog on startup, warm up agents and connections once serving."""
     await init_db()
+    configure_rate_limiter(settings)
+    catalog = get_tool_catalog()
+    tasks = []
+    if settings.mcp_catalog_refresh:
+        tasks.append(asyncio.create_task(catalog.run()))
+    if settings.warmup_agents:
+        tasks.append(asyncio.create_task(warm_up_agents()))
+    if settings.rapidapi_key and settings.mcp_warm_connections > 0:
+        tasks.append(asyncio.create_task(warm_up_mcp_connections()))
     yield
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+    await shutdown_mcp_client()
 
 
 app = FastAPI(title=settings.project_name, version="0.1.0", lifespan=lifespan)
 
+app.add_middleware(RequestIdMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173", "*"], # Allow frontend origins
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
 app.include_router(discovery.router, prefix="/api")
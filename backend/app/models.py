@@ -1,5 +1,5 @@
-"""SQLAlchemy models for autocomplete data."""
-from sqlalchemy import String, Integer
+"""SQLAlchemy models for autocomplete data and persisted conversations."""
+from sqlalchemy import JSON, Float, String, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 from .database import Base
 
@@ -44,3 +44,13 @@ class Currency(Base):
             "label": f"{self.code} - {self.name}",
             "value": self.code,
         }
+
+
+class ConversationRecord(Base):
+    """Server-side /api/llm/prompt conversation (chat turns and last tool results)."""
+    __tablename__ = "conversations"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    mode: Mapped[str] = mapped_column(String(20), nullable=False)
+    data: Mapped[dict] = mapped_column(JSON, nullable=False)
+    updated_at: Mapped[float] = mapped_column(Float, nullable=False, index=True)  # unix time
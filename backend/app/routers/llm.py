@@ -1,21 +1,40 @@
 from __future__ import annotations
 
+import json
+import logging
 import os
-from fastapi import APIRouter, Depends
+from typing import TYPE_CHECKING, AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 from ..dependencies import get_llm_client
+from ..logging_setup import request_id_var
 from ..schemas import LLMRequest, LLMResponse, SandboxRequest, SandboxResponse
+from ..services.concurrency import LimiterBusyError
+from ..services.conversations import ConversationNotFoundError
 from ..services.llm import GeminiClient
-from ..services.sandbox_llm import LangChainSandboxService
+from ..services.mcp_client import get_mcp_client, get_rate_limiter
+from ..services.timing import RequestTimer
+
+if TYPE_CHECKING:
+    from ..services.sandbox_llm import LangChainSandboxService
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/llm", tags=["llm"])
 
+_CONVERSATION_GONE = "Conversation not found or expired; resend it with the full history"
+_STREAM_FAILED = "The request failed; quote the request id when reporting it"
+
 # Singleton sandbox service
 _sandbox_service = None
 
-def get_sandbox_service() -> LangChainSandboxService:
+def get_sandbox_service() -> "LangChainSandboxService":
     global _sandbox_service
     if _sandbox_service is None:
+        # LangChain is heavy to import; load it with the first sandbox request
+        from ..services.sandbox_llm import LangChainSandboxService
         _sandbox_service = LangChainSandboxService(
             gemini_api_key=os.getenv("GEMINI_API_KEY", ""),
             model_id=os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
@@ -25,14 +44,125 @@ def get_sandbox_service() -> LangChainSandboxService:
 
 @router.post("/prompt", response_model=LLMResponse)
 async def run_llm_prompt(
-    payload: LLMRequest, llm_client: GeminiClient = Depends(get_llm_client)
+    payload: LLMRequest, response: Response, llm_client: GeminiClient = Depends(get_llm_client)
 ) -> LLMResponse:
-    result = await llm_client.respond(payload.prompt, payload.context, payload.history, payload.mode, payload.travel_intent)
-    return LLMResponse(output=result.output if hasattr(result, 'output') else result.text, model=result.model, latency_ms=result.latency_ms)
+    timer = RequestTimer("llm_prompt")
+    with timer.activate():
+        try:
+            result = await llm_client.respond(payload.prompt, payload.context, payload.history, payload.mode, payload.travel_intent, payload.strategy, payload.deadline_seconds, payload.conversation_id, payload.start_conversation)
+        except LimiterBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except ConversationNotFoundError:
+            raise HTTPException(status_code=404, detail=_CONVERSATION_GONE)
+    _publish_timings(timer, response)
+    return LLMResponse(
+        output=result.output if hasattr(result, 'output') else result.text,
+        model=result.model,
+        latency_ms=result.latency_ms,
+        cached=result.cached,
+        cache_similarity=result.cache_similarity,
+        conversation_id=result.conversation_id,
+        timings=timer.to_dict(),
+    )
+
+
+def _publish_timings(timer: RequestTimer, response: Response) -> None:
+    """Expose the timing tree as a Server-Timing header and in the log."""
+    response.headers["Server-Timing"] = timer.server_timing()
+    logger.info(
+        f"{timer.root.name} took {timer.root.duration_ms:.0f}ms",
+        extra={"event": "request_timings", "timings": timer.to_dict()},
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _stream_error(stream: str) -> str:
+    """Log the exception being handled and return a generic `error` event.
+
+    Exception text can carry upstream URLs, keys in query strings or stack
+    details, so the browser only gets the request id to match the log.
+    """
+    logger.exception(f"{stream} failed", extra={"event": "stream_error"})
+    return _sse("error", {"detail": _STREAM_FAILED, "request_id": request_id_var.get()})
+
+
+@router.post("/prompt/stream")
+async def stream_llm_prompt(
+    payload: LLMRequest, llm_client: GeminiClient = Depends(get_llm_client)
+) -> StreamingResponse:
+    """
+    Streaming variant of /prompt using Server-Sent Events.
+
+    Emits `started`, `cache_hit`, `tool_prefetched`, `rag_retrieved`,
+    `tool_started`, `tool_finished`, `deadline_reached` and `token` events
+    while the agent runs, then a final `done` event with the model name,
+    latency and conversation id. An unknown conversation id without history
+    ends the stream with an `error` event.
+    """
+    async def event_source() -> AsyncIterator[str]:
+        # Headers are sent before the work starts, so the timing tree
+        # travels in the `done` event instead of Server-Timing
+        timer = RequestTimer("llm_prompt_stream")
+        with timer.activate():
+            try:
+                async for event in llm_client.stream(
+                    payload.prompt, payload.context, payload.history, payload.mode, payload.travel_intent,
+                    strategy=payload.strategy, deadline_seconds=payload.deadline_seconds,
+                    conversation_id=payload.conversation_id, start_conversation=payload.start_conversation,
+                ):
+                    if event.type == "done":
+                        timer.root.end()
+                        yield _sse("done", {
+                            "model": event.result.model,
+                            "latency_ms": event.result.latency_ms,
+                            "cached": event.result.cached,
+                            "conversation_id": event.result.conversation_id,
+                            "timings": timer.to_dict(),
+                        })
+                    else:
+                        yield _sse(event.type, event.data)
+            except ConversationNotFoundError:
+                yield _sse("error", {"detail": _CONVERSATION_GONE, "status": 404})
+            except Exception:
+                yield _stream_error(timer.root.name)
+        logger.info(
+            f"{timer.root.name} took {timer.root.duration_ms:.0f}ms",
+            extra={"event": "request_timings", "timings": timer.to_dict()},
+        )
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/status")
+async def llm_status(llm_client: GeminiClient = Depends(get_llm_client)) -> dict:
+    """Gemini limiter metrics (in-flight calls, queue depth, wait times), cache, MCP client and RapidAPI budget stats."""
+    cache = llm_client.response_cache
+    return {
+        "gemini": llm_client.limiter.stats(),
+        "response_cache": cache.stats() if cache else None,
+        "history": llm_client.history.stats(),
+        "conversations": llm_client.conversations.stats(),
+        "mcp": get_mcp_client().stats(),
+        "rapidapi": get_rate_limiter().stats(),
+    }
+
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str, llm_client: GeminiClient = Depends(get_llm_client)) -> dict:
+    """Forget a server-side conversation (e.g. when the user starts a new chat)."""
+    deleted = await llm_client.conversations.delete(conversation_id)
+    return {"deleted": deleted}
 
 
 @router.post("/sandbox", response_model=SandboxResponse)
-async def sandbox_mode(payload: SandboxRequest) -> SandboxResponse:
+async def sandbox_mode(payload: SandboxRequest, response: Response) -> SandboxResponse:
     """
     Sandbox mode endpoint - uses LangChain agent with RAG + persistent MCP tools.
     
@@ -47,17 +177,64 @@ async def sandbox_mode(payload: SandboxRequest) -> SandboxResponse:
     if payload.history:
         history = [{"role": msg.role, "content": msg.content} for msg in payload.history]
     
-    result = await service.process(
-        prompt=payload.prompt,
-        namespace=payload.namespace,
-        history=history
-    )
+    timer = RequestTimer("llm_sandbox")
+    with timer.activate():
+        result = await service.process(
+            prompt=payload.prompt,
+            namespace=payload.namespace,
+            history=history
+        )
+    _publish_timings(timer, response)
     
     return SandboxResponse(
         output=result.text,
         model=result.model,
         latency_ms=result.latency_ms,
         tools_used=result.tools_used,
-        rag_context=result.rag_context
+        rag_context=result.rag_context,
+        timings=timer.to_dict(),
     )
 
+
+@router.post("/sandbox/stream")
+async def stream_sandbox(payload: SandboxRequest) -> StreamingResponse:
+    """
+    Streaming variant of /sandbox using Server-Sent Events.
+
+    Emits `rag_retrieved`, `tool_call`, `tool_result` and `token` events as
+    the LangChain agent runs (`error` if it fails), then a final `done`
+    event with the model, latency, `tools_used` and `rag_context`.
+    """
+    service = get_sandbox_service()
+    history = None
+    if payload.history:
+        history = [{"role": msg.role, "content": msg.content} for msg in payload.history]
+
+    async def event_source() -> AsyncIterator[str]:
+        timer = RequestTimer("llm_sandbox_stream")
+        with timer.activate():
+            try:
+                async for event in service.stream(payload.prompt, payload.namespace, history):
+                    if event.type == "done":
+                        timer.root.end()
+                        yield _sse("done", {
+                            "model": event.result.model,
+                            "latency_ms": event.result.latency_ms,
+                            "tools_used": event.result.tools_used,
+                            "rag_context": event.result.rag_context,
+                            "timings": timer.to_dict(),
+                        })
+                    else:
+                        yield _sse(event.type, event.data)
+            except Exception:
+                yield _stream_error(timer.root.name)
+        logger.info(
+            f"{timer.root.name} took {timer.root.duration_ms:.0f}ms",
+            extra={"event": "request_timings", "timings": timer.to_dict()},
+        )
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
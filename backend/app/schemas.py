@@ -45,12 +45,22 @@ class LLMRequest(BaseModel):
     context: list[Insight] | None = None
     history: list[ChatMessage] | None = None
     travel_intent: dict[str, Any] | None = None
+    strategy: Literal["iterative", "plan"] = "iterative"
+    deadline_seconds: float | None = Field(default=None, gt=0, le=300)
+    # Server-side conversation; when known, history need not be sent
+    conversation_id: str | None = Field(default=None, max_length=64)
+    # Without a conversation_id: store this exchange as a new conversation
+    start_conversation: bool = False
 
 
 class LLMResponse(BaseModel):
     output: str
     model: str
     latency_ms: float | None = None
+    cached: bool = False
+    cache_similarity: float | None = None
+    conversation_id: str | None = None
+    timings: dict[str, Any] | None = None
 
 
 class HealthResponse(BaseModel):
@@ -70,4 +80,5 @@ class SandboxResponse(BaseModel):
     latency_ms: float
     tools_used: list[str]
     rag_context: list[dict[str, Any]]
+    timings: dict[str, Any] | None = None
 
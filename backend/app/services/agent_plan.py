@@ -0,0 +1,208 @@
+"""
+Plan-and-execute support for the Gemini agent.
+
+Instead of discovering tool calls one LLM round trip at a time, the model
+returns a JSON plan of tool invocations with their dependencies. The plan is
+executed as a DAG with every independent step running concurrently, and a
+single synthesis turn turns the results into the final answer.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Mapping, Sequence, TypeVar
+
+T = TypeVar("T")
+
+MAX_PLAN_STEPS = 12
+
+PLANNER_INSTRUCTIONS = """
+## PLANNING MODE (overrides the response format above)
+Do not answer the user yet. Return ONLY a JSON object listing every tool call needed:
+{"steps": [{"id": "kiwi", "tool": "search_flights", "args": {"from_location": "TLL", "to_location": "HEL", "date_from": "2025-01-15"}, "depends_on": []}]}
+
+Rules:
+1. Use only tools from the TOOL CATALOG below, with their exact argument names.
+2. Steps without dependencies run in parallel - only add depends_on when a step needs another step's output.
+3. To use an earlier step's output, write "${step_id.Field}" where Field is a "Field: value" line of that tool's output, e.g. "${geo.Latitude}".
+4. Plan at most 12 steps. Return {"steps": []} when no tool is needed.
+"""
+
+_REF_PATTERN = re.compile(r"\$\{([A-Za-z0-9_\-]+)\.([^}]+)\}")
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class PlanError(ValueError):
+    """Raised when a plan cannot be parsed, validated or resolved."""
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    id: str
+    tool: str
+    args: dict[str, Any]
+    depends_on: tuple[str, ...] = ()
+
+
+def describe_tools(tools: Sequence[Callable[..., Any]]) -> str:
+    """Render a compact tool catalog (signature + first docstring line) for the planner."""
+    lines = []
+    for func in tools:
+        doc = inspect.getdoc(func) or ""
+        summary = doc.strip().splitlines()[0] if doc.strip() else ""
+        lines.append(f"- {func.__name__}{inspect.signature(func)}: {summary}")
+    return "\n".join(lines)
+
+
+def parse_plan(raw: str, dispatch: Mapping[str, Any]) -> list[PlanStep]:
+    """
+    Parse and validate the planner's JSON output.
+
+    Args:
+        raw: Model output (a JSON object with a "steps" list, or a bare list)
+        dispatch: Tools available in the current mode
+
+    Returns:
+        Steps in the order the model listed them
+
+    Raises:
+        PlanError: On malformed JSON, unknown tools or dependencies, or cycles
+    """
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise PlanError(f"Plan is not valid JSON: {e}") from e
+
+    raw_steps = data.get("steps") if isinstance(data, dict) else data
+    if not isinstance(raw_steps, list):
+        raise PlanError("Plan must contain a 'steps' list")
+    if len(raw_steps) > MAX_PLAN_STEPS:
+        raise PlanError(f"Plan has {len(raw_steps)} steps (max {MAX_PLAN_STEPS})")
+
+    steps: list[PlanStep] = []
+    seen: set[str] = set()
+    for index, item in enumerate(raw_steps):
+        if not isinstance(item, dict):
+            raise PlanError(f"Step {index} is not an object")
+        step_id = str(item.get("id") or f"step{index + 1}")
+        tool = item.get("tool")
+        args = item.get("args") or {}
+        depends_on = item.get("depends_on") or []
+        if step_id in seen:
+            raise PlanError(f"Duplicate step id: {step_id}")
+        if tool not in dispatch:
+            raise PlanError(f"Unknown tool in plan: {tool}")
+        if not isinstance(args, dict) or not isinstance(depends_on, list):
+            raise PlanError(f"Step {step_id} has malformed args or depends_on")
+        seen.add(step_id)
+        steps.append(PlanStep(step_id, tool, args, tuple(str(dep) for dep in depends_on)))
+
+    # Implicit dependencies from ${step.Field} references
+    steps = [
+        PlanStep(step.id, step.tool, step.args, tuple(dict.fromkeys(step.depends_on + _referenced_steps(step.args))))
+        for step in steps
+    ]
+    for step in steps:
+        for dep in step.depends_on:
+            if dep not in seen:
+                raise PlanError(f"Step {step.id} depends on unknown step {dep}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _referenced_steps(value: Any) -> tuple[str, ...]:
+    if isinstance(value, str):
+        return tuple(match.group(1) for match in _REF_PATTERN.finditer(value))
+    if isinstance(value, dict):
+        return tuple(ref for item in value.values() for ref in _referenced_steps(item))
+    if isinstance(value, list):
+        return tuple(ref for item in value for ref in _referenced_steps(item))
+    return ()
+
+
+def _check_acyclic(steps: Sequence[PlanStep]) -> None:
+    remaining = {step.id: set(step.depends_on) for step in steps}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise PlanError(f"Plan has a dependency cycle between: {sorted(remaining)}")
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _extract_field(output: str, field_name: str) -> str:
+    pattern = re.compile(rf"^\s*{re.escape(field_name)}\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+    match = pattern.search(output)
+    if not match:
+        raise PlanError(f"Field '{field_name}' not found in step output")
+    return match.group(1).strip()
+
+
+def resolve_args(args: Mapping[str, Any], outputs: Mapping[str, str]) -> dict[str, Any]:
+    """
+    Substitute ${step.Field} references with values from earlier step outputs.
+
+    A value that is exactly one reference to a numeric field becomes a number,
+    so coordinates can be passed straight into float parameters.
+    """
+    def resolve(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        if not isinstance(value, str) or "${" not in value:
+            return value
+
+        def substitute(match: re.Match) -> str:
+            step_id, field_name = match.group(1), match.group(2)
+            if step_id not in outputs:
+                raise PlanError(f"Step {step_id} has no output")
+            return _extract_field(outputs[step_id], field_name)
+
+        resolved = _REF_PATTERN.sub(substitute, value)
+        if _REF_PATTERN.fullmatch(value) and _NUMBER_PATTERN.fullmatch(resolved):
+            return float(resolved) if "." in resolved else int(resolved)
+        return resolved
+
+    return resolve(dict(args))
+
+
+async def execute_plan(
+    steps: Sequence[PlanStep],
+    run_step: Callable[[PlanStep, Mapping[str, T]], Awaitable[T]],
+) -> AsyncIterator[tuple[str, PlanStep, T | None]]:
+    """
+    Run a validated plan with maximum parallelism.
+
+    Every step starts as soon as all of its dependencies have finished.
+    ``run_step`` receives the outcomes of the steps finished so far.
+
+    Yields:
+        ("started", step, None) and ("finished", step, outcome) tuples
+    """
+    outcomes: dict[str, T] = {}
+    waiting = list(steps)
+    running: dict[asyncio.Task, PlanStep] = {}
+    try:
+        while waiting or running:
+            for step in [s for s in waiting if all(dep in outcomes for dep in s.depends_on)]:
+                waiting.remove(step)
+                running[asyncio.create_task(run_step(step, dict(outcomes)))] = step
+                yield "started", step, None
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = running.pop(task)
+                outcomes[step.id] = task.result()
+                yield "finished", step, outcomes[step.id]
+    finally:
+        for task in running:
+            task.cancel()
@@ -0,0 +1,383 @@
+"""
+Agent profiles - immutable per-mode configuration for the Gemini agent.
+
+Each profile bundles the system instruction, the tool subset exposed to the
+model, the output-token budget and a precomputed name -> tool dispatch table.
+Profiles are built once per process, on first use of a mode, so requests
+only pay for the user turn.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Sequence
+
+
+TRAVEL_SYSTEM_PROMPT = """You are a TRAVEL PLANNING ORCHESTRATOR. You execute task-specific chains to complete travel requests.
+
+## CHAIN-OF-THOUGHT PROCESS
+Before ANY tool call, briefly think about which chain(s) to run:
+<thinking>
+1. What is the user asking for? (flights/hotels/transport/places/full trip)
+2. Which chain(s) should I execute?
+3. What are the key parameters? (dates, locations, passengers)
+</thinking>
+
+---
+
+## AVAILABLE CHAINS
+
+### 🛫 FLIGHT_SEARCH_CHAIN
+**Use for**: "Find flights", "Book flight", flight prices, "fly to X"
+**Tools**: search_flights, search_flights_sky, search_google_flights, search_booking_flights
+**Steps**:
+1. Parse origin/destination → IATA codes (TLL, HEL, JFK, CDG, etc.)
+2. Parse dates → YYYY-MM-DD format. Default year: 2025
+3. Call search_flights(from_location=IATA, to_location=IATA, date_from="YYYY-MM-DD")
+4. Call search_flights_sky(from_location=IATA, to_location=IATA, date="YYYY-MM-DD")
+5. If either fails → Try search_google_flights, then search_booking_flights
+6. Compare results, rank by price
+7. OUTPUT: Top 5 flight options with prices, airlines, times
+
+**Round trips**: Add return_from (Kiwi) or return_date (Skyscanner)
+**Date ranges**: Use date_from + date_to (Kiwi only)
+**Whole month**: Use whole_month="YYYY-MM" (Skyscanner only)
+**Stops filter**: Use max_stops=0 (direct), 1 (up to 1 stop), 2 (up to 2 stops), or None (any)
+
+### 📊 FLIGHT RESULT ANALYSIS GUIDELINES (CRITICAL)
+When presenting flight search results to the user:
+
+1. **ANALYZE ALL FLIGHTS** - Don't just show the cheapest. Read the metadata summary at the top.
+2. **ALWAYS MENTION DIRECT FLIGHTS** - Even if not the cheapest, state "Direct flights available from $X"
+3. **SHOW PRICE TRADE-OFFS** - Format like: "Direct flights from $91 (1h 05m) or save $14 with a 1-stop via Stockholm ($77, 3h 30m)"
+4. **HIGHLIGHT THE SUMMARY** - The tool output starts with a summary (📊 Found X flights...). Use this data!
+5. **INCLUDE BOOKING LINKS** - Always provide the booking links for recommended options
+6. **MENTION STOPS FILTER** - If user filtered stops, acknowledge it: "Showing direct flights only as requested"
+
+---
+
+### 🏨 ACCOMMODATION_CHAIN
+**Use for**: "Find hotel", "Where to stay", "apartments in X", accommodation
+**Tools**: search_hotels, search_airbnb
+**Steps**:
+1. Parse location and check-in/check-out dates
+2. Call search_hotels(location="City", check_in="YYYY-MM-DD", check_out="YYYY-MM-DD")
+3. Call search_airbnb(location="City", check_in="YYYY-MM-DD", check_out="YYYY-MM-DD")
+4. Compare prices and ratings
+5. OUTPUT: Top 5 hotels + Top 5 apartments with prices and links
+
+---
+
+### 🚌 TRANSPORT_CHAIN
+**Use for**: "How to get from airport", "directions to", ground transport
+**Tools**: get_directions, search_ground_transport
+**Steps**:
+1. Identify origin (airport/station) and destination (hotel/city center)
+2. Call get_directions(origin="Airport Name", destination="City Center", mode="transit")
+3. Call search_ground_transport(origin="...", destination="...") for alternatives
+4. OUTPUT: Route options with times, costs, and specific instructions
+
+**For ferries**: Use get_directions with mode="transit" (includes ferry routes)
+
+---
+
+### 📍 PLACES_CHAIN
+**Use for**: "Things to do", "restaurants near", "attractions in X"
+**Tools**: search_places, text_search_places, search_places_nearby
+**Steps**:
+1. Identify location/city
+2. Call search_places(query="top attractions in [City]")
+3. If hotel location known, call search_places_nearby(lat, lng, type="restaurant")
+4. OUTPUT: Categorized list (restaurants, sights, activities) with ratings
+
+---
+
+### ✈️🏨 FULL_TRIP_CHAIN (Orchestrator)
+**Use for**: "Plan a trip", "Travel to X", "Weekend in Y", comprehensive planning
+**Executes**: FLIGHT_SEARCH → TRANSPORT → ACCOMMODATION → PLACES
+**Steps**:
+1. Parse user query for all components (dates, destination, travelers)
+2. Execute FLIGHT_SEARCH_CHAIN → Get best flight options
+3. Execute TRANSPORT_CHAIN → Airport to city center directions
+4. Execute ACCOMMODATION_CHAIN → Hotels and apartments
+5. Execute PLACES_CHAIN → Top attractions (optional)
+6. SYNTHESIZE: Combine into complete travel plan with all options
+
+---
+
+## EXECUTION RULES (CRITICAL)
+
+1. **ANNOUNCE which chain you're running**:
+   [EXECUTING: FLIGHT_SEARCH_CHAIN]
+   
+2. **NEVER stop mid-chain** - Complete all steps before moving on
+
+3. **For FULL_TRIP_CHAIN**: Run ALL sub-chains sequentially. Do not stop after flights.
+
+4. **Compare multiple sources**: Always call both Kiwi AND Skyscanner for flights, Hotels AND Airbnb for accommodation
+
+5. **If a tool fails**: Try the backup tools before giving up
+
+6. **ALWAYS end with a synthesized summary** combining all results
+
+---
+
+## PARAMETER QUICK REFERENCE
+
+| Parameter | Format | Example |
+|-----------|--------|---------|
+| Dates | YYYY-MM-DD | 2025-01-15 |
+| Airports | IATA code | TLL, HEL, JFK, CDG |
+| Cabin class | ECONOMY, BUSINESS, FIRST_CLASS | cabin_class="BUSINESS" |
+| Round trip | return_from (Kiwi), return_date (Sky) | return_from="2025-01-20" |
+
+---
+
+## INTENT DETECTION
+
+| User says... | Chain to run |
+|--------------|--------------|
+| "Flights to Paris" | FLIGHT_SEARCH_CHAIN only |
+| "Hotels in Barcelona" | ACCOMMODATION_CHAIN only |
+| "How to get from airport" | TRANSPORT_CHAIN only |
+| "Things to do in Rome" | PLACES_CHAIN only |
+| "Plan a trip to Tokyo" | FULL_TRIP_CHAIN (all 4) |
+| "Flights and hotel in X" | FLIGHT_SEARCH + ACCOMMODATION |
+
+---
+
+## RESPONSE FORMAT
+
+End every response with:
+1. **Clear summary** of all options found
+2. **Prices compared** across sources
+3. **Follow-up question**: "Want me to book any of these?" or "Should I search for activities too?"
+"""
+
+JOBS_SYSTEM_PROMPT = """You are a JOBS/CAREER AGENT assistant with access to powerful tools.
+
+## YOUR PRIMARY TOOLS (use these first):
+- search_jobs, get_active_jobs - find job listings
+- optimize_resume - improve resume for specific jobs
+- analyze_job_match - score resume against job descriptions
+
+## BACKUP TOOLS (use for company research or additional info):
+- web_search, scrape_webpage, crawl_website
+
+## RULES:
+1. **Always search jobs** when user asks about opportunities in a field/location
+2. **Use optimize_resume** when user shares resume text and job description
+3. **Use analyze_job_match** to score compatibility
+4. **Scrape company pages** when user wants info about specific employers
+5. **Be encouraging** but honest about job matches
+6. **Deliberate steps**: plan briefly (role/location/filters), then run search_jobs; if provided resume+JD, run analyze_job_match and optimize_resume; summarize with links.
+
+## RESPONSE STYLE:
+- List jobs with title, company, location, salary (if available)
+- For resume help: provide specific, actionable suggestions
+- For job matches: highlight strengths and areas to improve
+
+## ALWAYS END WITH a relevant follow-up question:
+- "Want me to optimize your resume for any of these roles?"
+- "Should I search for more jobs in a different location or field?"
+- "Can I analyze how well your skills match a specific job?"
+"""
+
+TRENDS_SYSTEM_PROMPT = """You are a TRENDS/SOCIAL MEDIA AGENT assistant with access to powerful tools.
+
+## YOUR PRIMARY TOOLS (use these first):
+- search_tweets - real Twitter/X search
+- get_tiktok_trends, search_tiktok - TikTok content
+- search_instagram, get_instagram_posts - Instagram content
+- search_facebook - Facebook content
+- get_youtube_trends, search_youtube - YouTube content
+- get_google_trends - trending topics
+
+## BACKUP TOOLS (use for deeper research):
+- web_search, scrape_webpage, crawl_website
+
+## RULES:
+1. **Use multiple social platforms** to get a complete picture of trends
+2. **Search specific hashtags** when asked about topics
+3. **Use get_*_trends** for what's currently viral
+4. **Combine platforms** for cross-platform trend analysis
+5. **Be data-driven** - include engagement metrics when available
+6. **Deliberate steps**: normalize topic/hashtags/geo/time; pick 2+ platforms; call trend + search APIs; synthesize top signals with dates/metrics.
+
+## RESPONSE STYLE:
+- Include usernames, post dates, engagement (likes/views)
+- Highlight viral content and emerging patterns
+- Present insights with specific examples
+
+## ALWAYS END WITH a relevant follow-up question:
+- "Want me to search for this trend on another platform?"
+- "Should I find related hashtags or influencers?"
+- "Can I dig deeper into a specific piece of content?"
+"""
+
+GENERAL_SYSTEM_PROMPT = """You are a helpful research assistant with access to many tools across travel, jobs, and trends.
+
+## AVAILABLE TOOLS:
+- Travel: get_directions, search_flights, search_hotels, search_places, geocode_address
+- Jobs: search_jobs, optimize_resume, analyze_job_match
+- Trends: search_tweets, get_tiktok_trends, search_instagram, search_facebook, get_youtube_trends
+- Research: web_search, scrape_webpage, crawl_website
+
+## RULES:
+1. **Choose the right tools** based on the query type
+2. **Chain tools** for complex queries
+3. **Use web_search/scrape_webpage as backup** when specialized tools don't suffice
+4. **Be confident** with tool results
+
+## ALWAYS END WITH a relevant follow-up question.
+"""
+
+
+@dataclass(frozen=True)
+class ProfileSpec:
+    """Static description of an agent mode, resolved into an AgentProfile."""
+    system_instruction: str
+    tool_groups: tuple[str, ...]
+    max_output_tokens: int
+
+
+# Tool groups: "travel", "jobs", "search" (web research backup), "trends"
+PROFILE_SPECS: dict[str, ProfileSpec] = {
+    "travel": ProfileSpec(TRAVEL_SYSTEM_PROMPT, ("travel",), max_output_tokens=16384),
+    "jobs": ProfileSpec(JOBS_SYSTEM_PROMPT, ("jobs", "search"), max_output_tokens=8192),
+    "trends": ProfileSpec(TRENDS_SYSTEM_PROMPT, ("trends", "search"), max_output_tokens=8192),
+    "general": ProfileSpec(GENERAL_SYSTEM_PROMPT, ("travel", "jobs", "search", "trends"), max_output_tokens=8192),
+}
+
+DEFAULT_MODE = "general"
+
+
+@dataclass(frozen=True)
+class AgentProfile:
+    """Everything the agent loop needs for one mode, built once and shared."""
+    mode: str
+    system_instruction: str
+    tools: tuple[Callable[..., Any], ...]
+    max_output_tokens: int
+    dispatch: Mapping[str, Callable[..., Any]] = field(default_factory=dict)
+    model: Any = None
+    planner: Any = None
+    # Model for turns that read tool results and write the answer; the same
+    # object as ``model`` unless tiered routing is configured
+    answer_model: Any = None
+
+    @classmethod
+    def create(
+        cls,
+        mode: str,
+        system_instruction: str,
+        tools: Sequence[Callable[..., Any]],
+        max_output_tokens: int,
+        model: Any = None,
+        planner: Any = None,
+        answer_model: Any = None,
+    ) -> "AgentProfile":
+        return cls(
+            mode=mode,
+            system_instruction=system_instruction,
+            tools=tuple(tools),
+            max_output_tokens=max_output_tokens,
+            dispatch=MappingProxyType({func.__name__: func for func in tools}),
+            model=model,
+            planner=planner,
+            answer_model=answer_model if answer_model is not None else model,
+        )
+
+
+def build_agent_profile(
+    mode: str,
+    load_tools: Callable[[str], Sequence[Callable[..., Any]]],
+    model_factory: Callable[[AgentProfile], Any] | None = None,
+    planner_factory: Callable[[AgentProfile], Any] | None = None,
+    answer_model_factory: Callable[[AgentProfile], Any] | None = None,
+) -> AgentProfile:
+    """
+    Resolve one PROFILE_SPECS entry into an AgentProfile.
+
+    Args:
+        mode: Agent mode (unknown modes resolve to DEFAULT_MODE)
+        load_tools: Returns the tool functions of a tool group
+        model_factory: Builds the model bound to a profile (None when Gemini is disabled)
+        planner_factory: Builds the plan-and-execute planner model for a profile
+        answer_model_factory: Builds the answer-phase model; returning None
+            reuses the tool-phase model
+
+    Returns:
+        The profile for the mode
+    """
+    if mode not in PROFILE_SPECS:
+        mode = DEFAULT_MODE
+    spec = PROFILE_SPECS[mode]
+    tools: list[Callable[..., Any]] = []
+    for group in spec.tool_groups:
+        tools.extend(load_tools(group))
+    profile = AgentProfile.create(mode, spec.system_instruction, tools, spec.max_output_tokens)
+    if model_factory is not None or planner_factory is not None:
+        profile = AgentProfile.create(
+            mode, spec.system_instruction, tools, spec.max_output_tokens,
+            model=model_factory(profile) if model_factory else None,
+            planner=planner_factory(profile) if planner_factory else None,
+            answer_model=answer_model_factory(profile) if answer_model_factory else None,
+        )
+    return profile
+
+
+def narrow_profile(
+    profile: AgentProfile,
+    tool_names: frozenset[str],
+    note: str,
+    model_factory: Callable[[AgentProfile], Any] | None = None,
+    planner_factory: Callable[[AgentProfile], Any] | None = None,
+    answer_model_factory: Callable[[AgentProfile], Any] | None = None,
+) -> AgentProfile:
+    """
+    Copy of a profile bound to a subset of its tools.
+
+    Args:
+        profile: The full per-mode profile
+        tool_names: Tools to keep; names the profile does not have are ignored
+        note: Appended to the system instruction so the model knows which
+            chain it is running
+        model_factory, planner_factory, answer_model_factory: As in build_agent_profile
+
+    Returns:
+        The narrowed profile, or ``profile`` itself when nothing would be removed
+    """
+    tools = [func for func in profile.tools if func.__name__ in tool_names]
+    if not tools or len(tools) == len(profile.tools):
+        return profile
+    narrowed = AgentProfile.create(
+        profile.mode, profile.system_instruction + "\n\n" + note, tools, profile.max_output_tokens,
+    )
+    return AgentProfile.create(
+        narrowed.mode, narrowed.system_instruction, tools, narrowed.max_output_tokens,
+        model=model_factory(narrowed) if model_factory else None,
+        planner=planner_factory(narrowed) if planner_factory else None,
+        answer_model=answer_model_factory(narrowed) if answer_model_factory else None,
+    )
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Model ids for the two phases of an agent run."""
+    tool_model: str  # tool-selection and planning turns
+    answer_model: str  # turns that read tool results and the final answer
+
+    @property
+    def tiered(self) -> bool:
+        return self.tool_model != self.answer_model
+
+
+def model_route(settings: Any, mode: str, default_model: str) -> ModelRoute:
+    """Resolve the per-mode model settings, falling back to ``default_model``."""
+    if mode not in PROFILE_SPECS:
+        mode = DEFAULT_MODE
+    return ModelRoute(
+        tool_model=getattr(settings, f"gemini_tool_model_{mode}") or settings.gemini_tool_model or default_model,
+        answer_model=getattr(settings, f"gemini_answer_model_{mode}") or settings.gemini_answer_model or default_model,
+    )
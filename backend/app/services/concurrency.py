@@ -0,0 +1,72 @@
+"""
+Concurrency limiting for outbound model calls.
+
+A process-wide semaphore caps in-flight calls so a burst of chats queues up
+in a predictable way instead of all requests slowing each other down. Queue
+depth and wait times are tracked for the status endpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+
+class LimiterBusyError(RuntimeError):
+    """Raised when a caller waited longer than the queue timeout for a slot."""
+
+
+class ConcurrencyLimiter:
+    """Semaphore with queue-depth and wait-time metrics."""
+
+    def __init__(self, name: str, max_concurrency: int, queue_timeout: float | None = None) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_calls = 0
+        self.rejected = 0
+        self._total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of the block."""
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LimiterBusyError(
+                f"{self.name}: no slot free after {self.queue_timeout:.0f}s "
+                f"({self.in_flight} in flight, {self.waiting - 1} queued)"
+            ) from None
+        finally:
+            self.waiting -= 1
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.total_calls += 1
+        self._total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "total_calls": self.total_calls,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._total_wait_ms / self.total_calls, 1) if self.total_calls else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
@@ -0,0 +1,256 @@
+"""
+Server-side conversations for /api/llm/prompt.
+
+Without them every request carries the whole chat again and the agent starts
+from zero: old flight listings are resent, and results the model already has
+must be searched for again. A Conversation keeps the chat turns and the
+compacted tool results of the last answer under a conversation id, so clients
+send only the new message.
+
+Conversations live in a bounded in-memory store with LRU and idle-TTL
+eviction. An optional backend (the SQL database) persists them, so they
+survive restarts and are shared by several workers; the memory store then
+acts as a write-through cache in front of it, and expired rows are purged
+from it on write, at most once per purge interval. Turns of one conversation
+are serialized by a per-id lock (per worker).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Protocol
+
+from .history import ChatTurn, normalize_turns
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationNotFoundError(KeyError):
+    """The conversation id is unknown or has expired."""
+
+
+@dataclass
+class Conversation:
+    id: str
+    mode: str
+    turns: list[ChatTurn] = field(default_factory=list)
+    # Compacted tool results behind the last answer, for follow-up questions
+    tool_results: list[str] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+    def add_exchange(self, prompt: str, answer: str, tool_results: list[str], max_turns: int) -> None:
+        self.turns += [ChatTurn("user", prompt), ChatTurn("model", answer)]
+        if len(self.turns) > max_turns:
+            # Drop whole exchanges so the history still starts on a user turn
+            self.turns = self.turns[len(self.turns) - max_turns + (max_turns % 2):]
+        if tool_results:
+            self.tool_results = tool_results
+        self.updated_at = time.time()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "turns": [{"role": turn.role, "content": turn.content} for turn in self.turns],
+            "tool_results": self.tool_results,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Conversation":
+        return cls(
+            id=data["id"],
+            mode=data.get("mode", "general"),
+            turns=normalize_turns(data.get("turns")),
+            tool_results=list(data.get("tool_results") or []),
+            updated_at=data.get("updated_at", time.time()),
+        )
+
+
+class ConversationBackend(Protocol):
+    name: str
+
+    async def load(self, conversation_id: str) -> Conversation | None: ...
+
+    async def save(self, conversation: Conversation) -> None: ...
+
+    async def delete(self, conversation_id: str) -> bool: ...
+
+    async def purge(self, older_than: float) -> int: ...
+
+
+class DatabaseConversationBackend:
+    """Persist conversations in the app database (SQLite locally, DATABASE_URL otherwise)."""
+
+    name = "database"
+
+    async def load(self, conversation_id: str) -> Conversation | None:
+        from ..database import async_session_maker
+        from ..models import ConversationRecord
+
+        async with async_session_maker() as session:
+            record = await session.get(ConversationRecord, conversation_id)
+            return Conversation.from_dict(record.data) if record is not None else None
+
+    async def save(self, conversation: Conversation) -> None:
+        from ..database import async_session_maker
+        from ..models import ConversationRecord
+
+        async with async_session_maker() as session:
+            await session.merge(ConversationRecord(
+                id=conversation.id,
+                mode=conversation.mode,
+                data=conversation.to_dict(),
+                updated_at=conversation.updated_at,
+            ))
+            await session.commit()
+
+    async def delete(self, conversation_id: str) -> bool:
+        from ..database import async_session_maker
+        from ..models import ConversationRecord
+
+        async with async_session_maker() as session:
+            record = await session.get(ConversationRecord, conversation_id)
+            if record is None:
+                return False
+            await session.delete(record)
+            await session.commit()
+            return True
+
+    async def purge(self, older_than: float) -> int:
+        """Delete conversations last updated before ``older_than`` (unix time)."""
+        from sqlalchemy import delete
+
+        from ..database import async_session_maker
+        from ..models import ConversationRecord
+
+        async with async_session_maker() as session:
+            result = await session.execute(delete(ConversationRecord).where(ConversationRecord.updated_at < older_than))
+            await session.commit()
+            return result.rowcount or 0
+
+
+class ConversationStore:
+    """Bounded LRU/TTL store of conversations, optionally backed by persistent storage."""
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600.0,
+        max_turns: int = 100,
+        backend: ConversationBackend | None = None,
+        purge_interval_seconds: float = 300.0,
+    ) -> None:
+        self._entries: OrderedDict[str, Conversation] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self.max_turns = max_turns
+        self._backend = backend
+        self._purge_interval = purge_interval_seconds
+        self._last_purge = 0.0
+        # Held by the running turn (and waiters), dropped with the last of them
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.purged = 0
+
+    def _expired(self, conversation: Conversation) -> bool:
+        return time.time() - conversation.updated_at > self._ttl
+
+    def _remember(self, conversation: Conversation) -> None:
+        self._entries[conversation.id] = conversation
+        self._entries.move_to_end(conversation.id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def lock(self, conversation_id: str) -> asyncio.Lock:
+        """Lock serializing the turns of one conversation, so none is lost to a concurrent save."""
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = self._locks[conversation_id] = asyncio.Lock()
+        return lock
+
+    def create(self, mode: str, history: Iterable[Any] | None = None, conversation_id: str | None = None) -> Conversation:
+        """New conversation, optionally seeded with client-side history."""
+        return Conversation(id=conversation_id or uuid.uuid4().hex, mode=mode, turns=normalize_turns(history))
+
+    async def get(self, conversation_id: str) -> Conversation:
+        """Conversation by id; raises ConversationNotFoundError if unknown or expired."""
+        conversation = self._entries.get(conversation_id)
+        if conversation is None and self._backend is not None:
+            try:
+                conversation = await self._backend.load(conversation_id)
+            except Exception as e:
+                logger.warning(f"Conversation backend load failed: {e}")
+        if conversation is None or self._expired(conversation):
+            self._entries.pop(conversation_id, None)
+            self.misses += 1
+            raise ConversationNotFoundError(conversation_id)
+        self.hits += 1
+        self._remember(conversation)
+        return conversation
+
+    async def save(self, conversation: Conversation) -> None:
+        self._remember(conversation)
+        if self._backend is not None:
+            try:
+                await self._backend.save(conversation)
+            except Exception as e:
+                # The in-memory copy still serves this worker
+                logger.warning(f"Conversation backend save failed: {e}")
+        await self._purge_expired()
+
+    async def _purge_expired(self) -> None:
+        now = time.time()
+        if now - self._last_purge < self._purge_interval:
+            return
+        self._last_purge = now
+        expired = [conversation.id for conversation in self._entries.values() if self._expired(conversation)]
+        for conversation_id in expired:
+            del self._entries[conversation_id]
+        purged = len(expired)
+        if self._backend is not None:
+            try:
+                purged = await self._backend.purge(now - self._ttl)
+            except Exception as e:
+                logger.warning(f"Conversation backend purge failed: {e}")
+        if purged:
+            self.purged += purged
+            logger.info(f"Purged {purged} expired conversation(s)")
+
+    async def delete(self, conversation_id: str) -> bool:
+        """Forget a conversation; True if it existed (in the backend, when there is one)."""
+        deleted = self._entries.pop(conversation_id, None) is not None
+        if self._backend is not None:
+            try:
+                deleted = await self._backend.delete(conversation_id)
+            except Exception as e:
+                logger.warning(f"Conversation backend delete failed: {e}")
+        return deleted
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "purged": self.purged,
+            "backend": self._backend.name if self._backend else "memory",
+        }
+
+
+def build_conversation_store(settings: Any) -> ConversationStore:
+    backend = DatabaseConversationBackend() if settings.conversation_backend == "database" else None
+    return ConversationStore(
+        max_entries=settings.conversation_max_entries,
+        ttl_seconds=settings.conversation_ttl_seconds,
+        max_turns=settings.conversation_max_turns,
+        backend=backend,
+    )
@@ -0,0 +1,67 @@
+"""
+Per-request time budget for the agent loop.
+
+A Deadline is created when a request starts and handed to every RAG, tool and
+model call so none of them can outlive the request. Part of the budget is
+held back as a reserve for the final synthesis turn, so when tools or
+tool-calling turns run long the agent can still answer from the results it
+already has.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+# Never hold back more than this share of a short budget for synthesis
+MAX_RESERVE_FRACTION = 0.3
+
+
+class Deadline:
+    """Monotonic-clock deadline with a reserve for the final answer."""
+
+    def __init__(self, seconds: float, reserve: float = 0.0) -> None:
+        self.seconds = seconds
+        self.reserve = min(reserve, seconds * MAX_RESERVE_FRACTION)
+        self._expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the hard deadline."""
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def work_remaining(self) -> float:
+        """Seconds left for RAG, tools and tool-calling turns."""
+        return max(0.0, self.remaining() - self.reserve)
+
+    @property
+    def work_expired(self) -> bool:
+        return self.work_remaining() <= 0
+
+    def clamp(self, timeout: float | None) -> float:
+        """A timeout that also respects the work budget."""
+        budget = self.work_remaining()
+        return budget if timeout is None else min(timeout, budget)
+
+
+async def iterate_within(iterator: AsyncIterator[T], timeout: float) -> AsyncIterator[T]:
+    """Yield from an async iterator, raising asyncio.TimeoutError once ``timeout`` is spent.
+
+    The iterator is closed on timeout so it can release what it holds.
+    """
+    expires_at = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,368 @@
+"""
+Deterministic fast path for form-driven travel searches.
+
+When the travel form fully specifies a one-way or round-trip flight search
+and/or a hotel stay, and the prompt is just the form submission, the tool
+calls and the shape of the answer are already known. The searches run
+directly through the plan executor and the answer is rendered from a
+template (price comparison, direct vs connecting trade-off, links), skipping
+the Gemini round trips. Anything incomplete or free-form goes to the agent.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import TYPE_CHECKING, Any, Mapping
+from urllib.parse import quote_plus
+
+from .agent_plan import PlanStep
+from .prefetch import flight_calls_from_intent
+
+if TYPE_CHECKING:
+    from .llm import ToolOutcome
+
+# Prompts that only submit the form ("Use the travel form above" is the
+# frontend default); anything else is a free-form question for the agent
+_FORM_PROMPT = re.compile(
+    r"^(?:use the (?:travel )?form(?: above)?"
+    r"|(?:please )?(?:search|find|show(?: me)?|get)(?: me)?(?: the)?(?: cheapest| best)?"
+    r"(?: flights?| hotels?| stays?| options| results)?(?: and (?:hotels?|stays?))?(?: for me)?)?$"
+)
+
+PROVIDER_LABELS = {
+    "search_flights": "Kiwi.com",
+    "search_flights_sky": "Google Flights",
+    "search_hotels": "Booking.com",
+    "search_airbnb": "Airbnb",
+}
+
+MAX_ROWS = 5
+
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£"}
+_CURRENCY_CODE = re.compile(r"\b[A-Z]{3}\b")
+
+
+@dataclass
+class Offer:
+    source: str
+    price: float | None
+    stops: int | None = None
+    duration: str = ""
+    details: str = ""
+    link: str = ""
+    rating: float | None = None
+    price_text: str = ""  # as quoted, e.g. "80 USD/night"
+    link_label: str = "Book"
+    currency: str = "USD"
+    per_night: bool = False  # price is for one night rather than the whole stay
+
+
+def is_form_prompt(prompt: str) -> bool:
+    cleaned = re.sub(r"[^\w\s]", "", prompt).strip().lower()
+    # Every word of the pattern is optional: an empty prompt is not a form submission
+    return bool(cleaned) and bool(_FORM_PROMPT.match(cleaned))
+
+
+def direct_search_plan(intent: Mapping[str, Any] | None) -> list[PlanStep] | None:
+    """Tool plan for a fully specified intent, or None when the agent is needed."""
+    if not intent or intent.get("transportMode", "all") not in ("all", "flights"):
+        # Ground and sea routes need the agent's judgement
+        return None
+    steps: list[PlanStep] = []
+
+    if intent.get("from") or intent.get("to"):
+        trip_type = intent.get("tripType")
+        complete = (
+            trip_type == "one-way" and intent.get("departDate")
+            or trip_type == "round-trip" and intent.get("departDate") and intent.get("returnDate")
+        )
+        calls = flight_calls_from_intent(intent) if complete else []
+        if not calls:
+            return None
+        steps += [PlanStep(step_id, name, args) for step_id, (name, args) in zip(("kiwi", "sky"), calls)]
+
+    stay = intent.get("accommodations") or {}
+    if stay.get("enabled"):
+        city = (stay.get("city") or "").strip()
+        check_in, check_out = intent.get("departDate"), intent.get("returnDate")
+        if not (city and check_in and check_out):
+            return None
+        adults = int(intent.get("adults") or 1)
+        steps.append(PlanStep("geo", "geocode_address", {"address": city}))
+        steps.append(PlanStep("hotels", "search_hotels", {
+            "latitude": "${geo.Latitude}",
+            "longitude": "${geo.Longitude}",
+            "checkin_date": check_in,
+            "checkout_date": check_out,
+            "adults": adults,
+        }, depends_on=("geo",)))
+        airbnb = {
+            "location": city,
+            "check_in": check_in,
+            "check_out": check_out,
+            "adults": adults,
+            "children": int(intent.get("children") or 0),
+            "min_price": stay.get("priceMin"),
+            "max_price": stay.get("priceMax"),
+            "currency": intent.get("currency") or "USD",
+            "max_listings": min(int(stay.get("maxResults") or MAX_ROWS), 10),
+        }
+        steps.append(PlanStep("airbnb", "search_airbnb", {k: v for k, v in airbnb.items() if v is not None}))
+
+    return steps or None
+
+
+def _number(text: str | None) -> float | None:
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", text or "")
+    return float(match.group(0).replace(",", "")) if match else None
+
+
+def _currency(text: str | None) -> str:
+    """ISO code of a quoted price; the provider servers default to USD."""
+    match = _CURRENCY_CODE.search(text or "")
+    if match:
+        return match.group(0)
+    return next((code for code, symbol in CURRENCY_SYMBOLS.items() if symbol in (text or "")), "USD")
+
+
+_KIWI_LINE = re.compile(r"^✈️\s*(?P<price>[^|]+)\|\s*(?P<duration>[^|]*)\|\s*(?P<stops>.+)$")
+_SKY_LINE = re.compile(
+    r"^✈️\s*\$?(?P<price>[^|]+)\|\s*(?P<dep>.*?)\s*->\s*(?P<arr>[^|]*)\|\s*(?P<duration>[^|]*)\|\s*(?P<stops>\d+) stops"
+)
+
+
+def parse_flight_offers(tool: str, result: str) -> list[Offer]:
+    """Itineraries from the search_flights / search_flights_sky text output."""
+    source = PROVIDER_LABELS[tool]
+    offers: list[Offer] = []
+    if tool == "search_flights_sky":
+        for line in result.splitlines():
+            match = _SKY_LINE.match(line.strip())
+            if match:
+                offers.append(Offer(
+                    source, _number(match["price"]), int(match["stops"]), match["duration"].strip(),
+                    f"{match['dep'].strip()} → {match['arr'].strip()}",
+                    currency=_currency(line.split("|")[0]),
+                ))
+        return offers
+    for block in result.split("\n---"):
+        offer = None
+        for line in block.strip().splitlines():
+            match = _KIWI_LINE.match(line.strip())
+            if match:
+                stops = match["stops"].strip()
+                offer = Offer(
+                    source, _number(match["price"]), 0 if stops.lower() == "direct" else int(_number(stops) or 0),
+                    match["duration"].strip(), currency=_currency(match["price"]),
+                )
+                offers.append(offer)
+            elif offer and line.startswith("Route:"):
+                carriers = [segment.split(":")[0].strip() for segment in line[len("Route:"):].split(" | ")]
+                offer.details = ", ".join(dict.fromkeys(c for c in carriers if c and c != "N/A"))
+            elif offer and line.startswith("Link:"):
+                offer.link = line[len("Link:"):].strip()
+    return offers
+
+
+def parse_stay_offers(tool: str, result: str) -> list[Offer]:
+    """Listings from the search_hotels / search_airbnb text output."""
+    source = PROVIDER_LABELS[tool]
+    offers: list[Offer] = []
+    for block in result.split("---"):
+        fields: dict[str, str] = {}
+        for line in block.strip().splitlines():
+            if line.startswith(("Hotel:", "🏠")):
+                fields["name"] = line.split(":", 1)[1] if line.startswith("Hotel:") else line[1:]
+            elif ":" in line:
+                key, value = line.split(":", 1)
+                fields[key.strip().lower()] = value.strip()
+        if "name" not in fields:
+            continue
+        price = fields.get("price", "")
+        offers.append(Offer(
+            source,
+            _number(price),
+            details=fields["name"].strip(),
+            link=fields.get("link", ""),
+            rating=_number(fields.get("rating", "").split("|")[0]),
+            price_text=price,
+            currency=_currency(price),
+            # Airbnb quotes a night, Booking.com the whole stay
+            per_night=price.endswith("/night"),
+        ))
+    return offers
+
+
+def _money(value: float | None, currency: str) -> str:
+    if value is None:
+        return "n/a"
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    return f"{symbol}{value:,.0f}" if symbol else f"{value:,.0f} {currency}"
+
+
+def _stops(stops: int | None) -> str:
+    if stops is None:
+        return "?"
+    return "Direct" if stops == 0 else f"{stops} stop{'s' if stops > 1 else ''}"
+
+
+def _link(url: str, label: str = "Book") -> str:
+    return f"[{label}]({url})" if url else ""
+
+
+def _travellers(intent: Mapping[str, Any]) -> str:
+    parts = []
+    for key, label in (("adults", "adult"), ("children", "child"), ("infants", "infant")):
+        count = int(intent.get(key) or (1 if key == "adults" else 0))
+        if count:
+            plural = {"child": "children"}.get(label, label + "s") if count > 1 else label
+            parts.append(f"{count} {plural}")
+    return ", ".join(parts)
+
+
+def _failures(steps: list[PlanStep], outcomes: Mapping[str, "ToolOutcome"]) -> list[str]:
+    return [
+        f"_{PROVIDER_LABELS.get(step.tool, step.tool)} did not return results: {outcomes[step.id].result[:160]}_"
+        for step in steps
+        if step.id in outcomes and step.tool in PROVIDER_LABELS and outcomes[step.id].error
+    ]
+
+
+def _render_flights(intent: Mapping[str, Any], steps: list[PlanStep], outcomes: Mapping[str, "ToolOutcome"]) -> list[str] | None:
+    offers = [
+        offer
+        for step in steps
+        if not outcomes[step.id].error
+        for offer in parse_flight_offers(step.tool, outcomes[step.id].result)
+    ]
+    # Without exchange rates other currencies cannot be ranked against the requested one
+    currency = intent.get("currency") or "USD"
+    priced = sorted(
+        (offer for offer in offers if offer.price is not None),
+        key=lambda offer: (offer.currency != currency, offer.price),
+    )
+    if not priced:
+        return None
+    origin, destination = intent["from"].strip().upper(), intent["to"].strip().upper()
+    dates = intent["departDate"] + (f" → {intent['returnDate']}" if intent.get("tripType") == "round-trip" else "")
+    cabin = (intent.get("cabinClass") or "ECONOMY").replace("_", " ").lower()
+    lines = [
+        f"### ✈️ Flights {origin} → {destination}",
+        f"{dates} · {intent.get('tripType')} · {_travellers(intent)} · {cabin}",
+        "",
+    ]
+
+    # Google Flights results carry no deep links; point them at the same search
+    query = f"Flights from {origin} to {destination} on {intent['departDate']}"
+    search_url = "https://www.google.com/travel/flights?q=" + quote_plus(query)
+    for offer in priced:
+        if not offer.link and offer.source == PROVIDER_LABELS["search_flights_sky"]:
+            offer.link, offer.link_label = search_url, "Search"
+
+    cheapest = priced[0]
+    lines.append(
+        f"- **Best price:** {_money(cheapest.price, cheapest.currency)} with {cheapest.source} "
+        f"({_stops(cheapest.stops)}{', ' + cheapest.duration if cheapest.duration else ''}) {_link(cheapest.link, cheapest.link_label)}".rstrip()
+    )
+    comparable = [offer for offer in priced if offer.currency == cheapest.currency]
+    direct = [offer for offer in comparable if offer.stops == 0]
+    connecting = [offer for offer in comparable if offer.stops]
+    if intent.get("maxStops") == 0:
+        lines.append("- **Direct:** showing direct flights only, as requested.")
+    elif direct and connecting:
+        gap = direct[0].price - connecting[0].price
+        if gap > 0:
+            lines.append(
+                f"- **Direct vs connecting:** direct from {_money(direct[0].price, cheapest.currency)} "
+                f"({direct[0].duration or 'n/a'}), or save {_money(gap, cheapest.currency)} with "
+                f"{_stops(connecting[0].stops)} at {_money(connecting[0].price, cheapest.currency)} "
+                f"({connecting[0].duration or 'n/a'})."
+            )
+        else:
+            lines.append(
+                f"- **Direct vs connecting:** the cheapest option is direct, {_money(direct[0].price, cheapest.currency)}."
+            )
+    elif direct:
+        lines.append(f"- **Direct:** all options found are direct, from {_money(direct[0].price, cheapest.currency)}.")
+    else:
+        lines.append("- **Direct:** no direct flights found for these dates.")
+
+    lines += ["", "| # | Price | Stops | Duration | Details | Source | Link |", "|---|---|---|---|---|---|---|"]
+    for index, offer in enumerate(priced[:MAX_ROWS], 1):
+        lines.append(
+            f"| {index} | {_money(offer.price, offer.currency)} | {_stops(offer.stops)} | {offer.duration or 'n/a'} | "
+            f"{offer.details or '-'} | {offer.source} | {_link(offer.link, offer.link_label) or '-'} |"
+        )
+
+    by_provider = []
+    for step in steps:
+        found = [offer for offer in priced if offer.source == PROVIDER_LABELS[step.tool]]
+        if found:
+            results = "result" if len(found) == 1 else "results"
+            by_provider.append(f"{found[0].source}: {len(found)} {results} from {_money(found[0].price, found[0].currency)}")
+    lines += ["", "**By provider:** " + " · ".join(by_provider)]
+    lines += _failures(steps, outcomes)
+    return lines
+
+
+def _render_stays(intent: Mapping[str, Any], steps: list[PlanStep], outcomes: Mapping[str, "ToolOutcome"]) -> list[str] | None:
+    stay = intent.get("accommodations") or {}
+    min_rating = stay.get("minRating")
+    offers = [
+        offer
+        for step in steps
+        if step.tool in ("search_hotels", "search_airbnb") and not outcomes[step.id].error
+        for offer in parse_stay_offers(step.tool, outcomes[step.id].result)
+        if not (min_rating and offer.rating is not None and offer.rating < min_rating)
+    ]
+    if not offers:
+        return None
+    check_in, check_out = intent["departDate"], intent["returnDate"]
+    try:
+        nights = (date.fromisoformat(check_out) - date.fromisoformat(check_in)).days
+    except ValueError:
+        nights = None
+
+    def nightly(offer: Offer) -> float | None:
+        if offer.price is None or offer.per_night:
+            return offer.price
+        return offer.price / nights if nights else None
+
+    lines = [
+        f"### 🏨 Stays in {stay['city'].strip()}",
+        f"{check_in} → {check_out}" + (f" ({nights} nights)" if nights else "") + f" · {_travellers(intent)}",
+        "",
+        "| # | Name | Per night | Total | Rating | Source | Link |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    limit = int(stay.get("maxResults") or MAX_ROWS)
+    # Ranked by the price of a night in the requested currency; other currencies can't be compared and go last
+    currency = intent.get("currency") or "USD"
+    ranked = sorted(offers, key=lambda offer: (offer.currency != currency, nightly(offer) is None, nightly(offer) or 0))
+    for index, offer in enumerate(ranked[:limit], 1):
+        per_night = nightly(offer)
+        total = per_night * nights if per_night is not None and nights else None
+        price = _money(per_night, offer.currency) if per_night is not None else offer.price_text or "n/a"
+        lines.append(
+            f"| {index} | {offer.details} | {price} | {_money(total, offer.currency)} | "
+            f"{offer.rating if offer.rating is not None else '-'} | {offer.source} | {_link(offer.link) or '-'} |"
+        )
+    lines += _failures(steps, outcomes)
+    return lines
+
+
+def render_direct_answer(
+    intent: Mapping[str, Any], steps: list[PlanStep], outcomes: Mapping[str, "ToolOutcome"]
+) -> str | None:
+    """Markdown answer from the direct-search results, or None when a part came back empty."""
+    sections = []
+    flight_steps = [step for step in steps if step.tool in ("search_flights", "search_flights_sky")]
+    if flight_steps:
+        sections.append(_render_flights(intent, flight_steps, outcomes))
+    if any(step.id == "geo" for step in steps):
+        sections.append(_render_stays(intent, steps, outcomes))
+    if not sections or any(section is None for section in sections):
+        return None
+    body = "\n\n".join("\n".join(section) for section in sections)
+    return body + "\n\n_Prices are live provider quotes and may change at booking._"
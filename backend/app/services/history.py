@@ -0,0 +1,214 @@
+"""
+Token-budgeted conversation history.
+
+Clients resend the whole conversation on every request, including old turns
+full of flight listings. HistoryCompressor keeps the most recent turns
+verbatim and folds everything older into a rolling summary, so prompt size
+stops growing with the length of the session.
+
+Summaries are cached by a hash chain over the turns they cover. The next
+request of the same conversation shares that prefix, so it reuses the summary
+and only pays for a new one once the verbatim tail outgrows the budget.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for budget estimates (no tokenizer round trip)
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+SUMMARY_ACK = "Understood, I'll keep that in mind."
+
+# (previous summary or "", turns to fold in, word limit) -> new summary
+Summarizer = Callable[[str, list["ChatTurn"], int], Awaitable[str]]
+
+
+@dataclass(frozen=True)
+class ChatTurn:
+    role: str  # "user" or "model"
+    content: str
+
+
+@dataclass
+class CompressedHistory:
+    summary: str | None
+    turns: list[ChatTurn]
+    summarized_turns: int = 0
+
+
+def history_budgets(settings: Any) -> dict[str, int]:
+    return {
+        "travel": settings.history_token_budget_travel,
+        "jobs": settings.history_token_budget_jobs,
+        "trends": settings.history_token_budget_trends,
+        "general": settings.history_token_budget_general,
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def normalize_turns(history: Iterable[Any] | None) -> list[ChatTurn]:
+    """Accept ChatMessage models or {"role", "content"} dicts; "assistant" becomes "model"."""
+    turns = []
+    for message in history or []:
+        if isinstance(message, dict):
+            role, content = message.get("role", "user"), message.get("content", "")
+        else:
+            role, content = message.role, message.content
+        turns.append(ChatTurn("model" if role in ("model", "assistant") else "user", content or ""))
+    return turns
+
+
+def clip_turns(turns: list[ChatTurn], budget: int) -> list[ChatTurn]:
+    """Shorten oversized turns so the verbatim tail fits its budget."""
+    if sum(estimate_tokens(turn.content) for turn in turns) <= budget:
+        return turns
+    max_chars = max(200, budget * CHARS_PER_TOKEN // len(turns))
+    return [
+        ChatTurn(turn.role, turn.content[:max_chars] + " …[truncated]") if len(turn.content) > max_chars else turn
+        for turn in turns
+    ]
+
+
+def summarization_prompt(previous: str, turns: list[ChatTurn], max_words: int) -> str:
+    transcript = "\n".join(f"{turn.role.upper()}: {turn.content}" for turn in turns)
+    return (
+        f"Update the running summary of a conversation between a user and an assistant. "
+        f"Keep concrete facts the assistant may need later: places, dates, traveller counts, budgets, "
+        f"stated preferences, options the user picked or rejected and the best prices found. "
+        f"Drop raw listings and links. Answer with the summary only, at most {max_words} words.\n\n"
+        f"## Current summary\n{previous or '(none)'}\n\n## New turns\n{transcript}"
+    )
+
+
+def fallback_summary(previous: str, turns: list[ChatTurn], max_words: int) -> str:
+    """Extractive summary used when the model call fails: the start of each turn."""
+    lines = [previous] if previous else []
+    lines += [f"{turn.role}: {turn.content[:200]}" for turn in turns]
+    words = " ".join(lines).split()
+    return " ".join(words[-max_words:])
+
+
+class HistoryCompressor:
+    """Fit conversation history into a per-mode token budget."""
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        budgets: dict[str, int],
+        keep_turns: int = 6,
+        default_budget: int = 4000,
+        max_cached: int = 1000,
+        summary_timeout: float = 10.0,
+    ) -> None:
+        self._summarizer = summarizer
+        self._budgets = budgets
+        self._default_budget = default_budget
+        self.keep_turns = keep_turns
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._max_cached = max_cached
+        self._summary_timeout = summary_timeout
+        self.summaries_computed = 0
+        self.summaries_reused = 0
+
+    def budget_for(self, mode: str) -> int:
+        return self._budgets.get(mode, self._default_budget)
+
+    @staticmethod
+    def _chain(turns: list[ChatTurn]) -> list[str]:
+        """hashes[i] identifies turns[:i]."""
+        hashes = [""]
+        for turn in turns:
+            digest = hashlib.sha256(f"{hashes[-1]}\x00{turn.role}\x00{turn.content}".encode()).hexdigest()
+            hashes.append(digest)
+        return hashes
+
+    def _cached(self, key: str) -> str | None:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _remember(self, key: str, summary: str) -> None:
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self._max_cached:
+            self._summaries.popitem(last=False)
+
+    async def compress(self, history: Iterable[Any] | None, mode: str, timeout: float | None = None) -> CompressedHistory:
+        """Summary plus verbatim tail within the mode's budget.
+
+        ``timeout`` caps a summarization call below the default; on timeout or
+        error an extractive summary is used instead.
+        """
+        turns = normalize_turns(history)
+        budget = self.budget_for(mode)
+        if sum(estimate_tokens(turn.content) for turn in turns) <= budget:
+            return CompressedHistory(None, turns)
+
+        hashes = self._chain(turns)
+        summary_budget = budget // 4
+        tail_budget = budget - summary_budget
+
+        # Reuse the longest already-summarized prefix while the rest still fits
+        for boundary in range(len(turns) - 1, 0, -1):
+            summary = self._cached(hashes[boundary])
+            if summary is None:
+                continue
+            tail = turns[boundary:]
+            if sum(estimate_tokens(turn.content) for turn in tail) <= tail_budget:
+                self.summaries_reused += 1
+                return CompressedHistory(summary, tail, boundary)
+            previous_boundary, previous_summary = boundary, summary
+            break
+        else:
+            previous_boundary, previous_summary = 0, ""
+
+        # Keep the last turns verbatim, starting on a user turn, and drop
+        # verbatim turns from the front until the tail fits its share
+        boundary = max(previous_boundary, len(turns) - self.keep_turns)
+        while boundary < len(turns) - 1 and (
+            turns[boundary].role != "user"
+            or sum(estimate_tokens(turn.content) for turn in turns[boundary:]) > tail_budget
+        ):
+            boundary += 1
+
+        tail = clip_turns(turns[boundary:], tail_budget)
+        if boundary == previous_boundary:
+            return CompressedHistory(previous_summary or None, tail, boundary)
+
+        max_words = max(50, summary_budget * CHARS_PER_TOKEN // 6)
+        new_turns = turns[previous_boundary:boundary]
+        try:
+            summary = await asyncio.wait_for(
+                self._summarizer(previous_summary, new_turns, max_words),
+                timeout=self._summary_timeout if timeout is None else min(timeout, self._summary_timeout),
+            )
+        except Exception as e:
+            logger.warning(f"History summarization failed, using extractive summary: {e}")
+            summary = fallback_summary(previous_summary, new_turns, max_words)
+        self.summaries_computed += 1
+        self._remember(hashes[boundary], summary)
+        logger.info(
+            f"HISTORY: summarized {boundary} of {len(turns)} turns for mode={mode}",
+            extra={"event": "history_compressed", "mode": mode, "summarized_turns": boundary,
+                   "kept_turns": len(turns) - boundary},
+        )
+        return CompressedHistory(summary, tail, boundary)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cached_summaries": len(self._summaries),
+            "computed": self.summaries_computed,
+            "reused": self.summaries_reused,
+        }
@@ -1,79 +1,59 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import importlib.util
 import logging
 import os
-import sys
+import re
 import textwrap
+import threading
 import time
-from dataclasses import dataclass
-from pathlib import Path
-from typing import Iterable
-
-# Configure logging to file
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler(Path(__file__).parent.parent.parent / "llm_debug.log", mode='a'),
-        logging.StreamHandler()
-    ]
-)
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, AsyncIterator, Iterable, Mapping
+
+# Handlers, level and format are configured in app.logging_setup
 logger = logging.getLogger(__name__)
 
-# Add project root to path to allow importing mcp modules
-sys.path.append(str(Path(__file__).parents[3]))
-
-try:
-    import google.generativeai as genai
-    from google.generativeai.types import FunctionDeclaration
-except Exception:
-    genai = None
-
-# Import MCP Tools
-try:
-    from mcp_servers.jobs_server import get_active_jobs, search_jobs, optimize_resume, analyze_job_match
-    from mcp_servers.search_server import web_search, scrape_webpage, crawl_website
-    from mcp_servers.travel_server import (
-        search_flights, search_places, search_hotels, search_flights_sky,
-        search_ground_transport, search_ground_transport_backup, get_directions,
-        geocode_address, reverse_geocode, text_search_places, search_places_nearby,
-        search_airbnb, search_amadeus_flights, search_amadeus_hotels
-    )
-    from mcp_servers.trends_server import (
-        get_google_trends, get_youtube_trends, search_tweets, search_youtube,
-        get_tiktok_trends, search_tiktok, search_instagram, get_instagram_posts, search_facebook
-    )
-    
-    MCP_TOOLS = [
-        # Travel tools (search_flights=Kiwi, search_flights_sky=Skyscanner, search_amadeus_*=Amadeus - use for comparison)
-        search_flights, search_flights_sky, search_amadeus_flights, search_amadeus_hotels,
-        search_places, search_hotels, search_airbnb,
-        search_ground_transport, search_ground_transport_backup, get_directions,
-        geocode_address, reverse_geocode, text_search_places, search_places_nearby,
-        # Jobs tools
-        search_jobs, get_active_jobs, optimize_resume, analyze_job_match,
-        # Search & scraping tools (backup for all agents)
-        web_search, scrape_webpage, crawl_website,
-        # Trends tools
-        get_youtube_trends, search_youtube, get_google_trends, search_tweets,
-        get_tiktok_trends, search_tiktok, search_instagram, get_instagram_posts, search_facebook
-    ]
-except ImportError:
-    MCP_TOOLS = []
-    print("Warning: Could not import MCP tools. Ensure mcp module is in path.")
+# google.generativeai is imported on first use (see _load_genai) to keep
+# app startup fast; only check here that it is installed
+GENAI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+genai = None
+
+
+def _load_genai() -> Any:
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
 
 from ..config import Settings
+from ..logging_setup import log_payload
 from ..schemas import Domain, Insight
-
-# Import RAG service for context retrieval
-try:
-    from .rag_service import RAGService
-    RAG_AVAILABLE = True
-except ImportError as e:
-    RAGService = None
-    RAG_AVAILABLE = False
-    logger.warning(f"RAGService not available: {e}")
+from .agent_plan import PLANNER_INSTRUCTIONS, PlanError, PlanStep, describe_tools, execute_plan, parse_plan, resolve_args
+from .agent_profiles import DEFAULT_MODE, PROFILE_SPECS, AgentProfile, build_agent_profile, model_route, narrow_profile
+from .concurrency import ConcurrencyLimiter
+from .conversations import Conversation, ConversationNotFoundError, build_conversation_store
+from .deadline import Deadline, iterate_within
+from .direct_search import direct_search_plan, is_form_prompt, render_direct_answer
+from .history import SUMMARY_ACK, SUMMARY_PREFIX, ChatTurn, HistoryCompressor, history_budgets, summarization_prompt
+from .prefetch import ToolPrefetcher, flight_calls_from_intent
+from .query_router import RouteDecision, build_query_router
+from .response_cache import HashingEmbedder, SemanticResponseCache, dense_embedder
+from .tool_compaction import LINK_INSTRUCTIONS, ToolResultStore
+from .timing import span, start_span
+from .tool_registry import TOOL_PROVIDERS, load_tool_group
+
+# tool_config for turns that must answer in text (synthesis)
+NO_TOOL_CALLS = {"function_calling_config": {"mode": "NONE"}}
+
+# LLMResult.model for answers rendered by the direct-search fast path
+DIRECT_SEARCH_MODEL = "direct-search"
+
+# Modes whose tool set spans several chains; jobs and trends already are one
+ROUTED_MODES = ("travel", "general")
 
 
 @dataclass
@@ -82,18 +62,96 @@ class LLMResult:
     latency_ms: float | None
     model: str
     trace: str | None = None
+    cached: bool = False
+    cache_similarity: float | None = None
+    conversation_id: str | None = None
+    # Compacted results of this answer's tool calls, kept with the conversation
+    tool_results: list[str] = field(default_factory=list)
+
+
+@dataclass
+class AgentEvent:
+    """Progress event emitted by ``GeminiClient.stream``."""
+    type: str
+    data: dict[str, Any]
+    result: LLMResult | None = None
+
+
+@dataclass
+class ToolOutcome:
+    """Result of one tool invocation within an agent turn."""
+    name: str
+    args: dict[str, Any]
+    result: str
+    trace: list[str]
+    latency_ms: float
+    item_count: int = 0
+    error: bool = False
+    # Compacted form for the model, filled on first use
+    model_view: str | None = None
+
+
+@dataclass
+class _StreamDone:
+    """Marks the end of a streamed Gemini response."""
+    response: Any
+
+
+def _chunk_texts(chunk: Any) -> list[str]:
+    """Extract text parts from a streamed chunk, skipping function calls."""
+    if not chunk.candidates:
+        return []
+    return [
+        part.text for part in chunk.candidates[0].content.parts
+        if getattr(part, "text", "")
+    ]
 
 
 class GeminiClient:
     def __init__(self, settings: Settings) -> None:
         self.model_id = settings.gemini_model
         self._api_key = settings.gemini_api_key
-        self._enabled = bool(self._api_key and genai)
+        self._enabled = bool(self._api_key and GENAI_AVAILABLE)
+        self._tool_timeout = settings.tool_timeout_seconds
+        self._compact_results = settings.compact_tool_results
+        self._tool_result_max_chars = settings.tool_result_max_chars
+        self._prefetch_tools = settings.prefetch_tools
+        self._direct_search = settings.direct_search_enabled
+        self._deadlines = {
+            "travel": settings.agent_deadline_travel_seconds,
+            "jobs": settings.agent_deadline_jobs_seconds,
+            "trends": settings.agent_deadline_trends_seconds,
+            "general": settings.agent_deadline_general_seconds,
+        }
+        self._synthesis_reserve = settings.agent_synthesis_reserve_seconds
+        # Per-mode tool-phase and answer-phase models
+        self._routes = {mode: model_route(settings, mode, self.model_id) for mode in PROFILE_SPECS}
+        self.history = HistoryCompressor(
+            self._summarize_history, history_budgets(settings), keep_turns=settings.history_keep_turns
+        )
+        # Caps in-flight Gemini calls for this process; extra calls queue here
+        self.limiter = ConcurrencyLimiter(
+            "gemini", settings.gemini_max_concurrency, settings.gemini_queue_timeout_seconds
+        )
         self._model = None
+        self._sdk_ready = False
+        # Per-mode agent profiles: system instruction, tool subset, token budget
+        # and dispatch table are built once, on first use of each mode
+        self._profiles: dict[str, AgentProfile] = {}
+        # Free-text prompts bind only the tools of the chain(s) they need;
+        # narrowed profiles are cached per (mode, chains)
+        self.router = build_query_router(settings)
+        self._chain_profiles: dict[tuple[str, tuple[str, ...]], AgentProfile] = {}
+        # Building a profile imports tool modules and the SDK: requests build
+        # in a worker thread, one build per profile at a time (per-key
+        # asyncio locks), and the thread lock keeps warmup from building the
+        # same profile alongside them
+        self._build_lock = threading.Lock()
+        self._build_locks: dict[Any, asyncio.Lock] = {}
         
         # Debug logging
         logger.info(f"GEMINI_API_KEY loaded: {bool(self._api_key)}")
-        logger.info(f"google-generativeai imported: {bool(genai)}")
+        logger.info(f"google-generativeai installed: {GENAI_AVAILABLE}")
         logger.info(f"Gemini enabled: {self._enabled}")
         
         # Propagate settings to os.environ for MCP tools
@@ -109,27 +167,158 @@ class GeminiClient:
         if settings.supabase_key: os.environ["SUPABASE_KEY"] = settings.supabase_key
         if settings.together_api_key: os.environ["TOGETHER_API_KEY"] = settings.together_api_key
 
-        if self._enabled:
-            genai.configure(api_key=self._api_key)
-            # Initialize model with tools and max output tokens
-            self._model = genai.GenerativeModel(
-                self.model_id,
-                tools=MCP_TOOLS,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=65536  # Maximum for gemini-2.5-pro
-                )
-            )
-        
         # Initialize RAG service for context retrieval
         self.rag_service = None
         self._rag_enabled = False
-        if RAG_AVAILABLE:
-            try:
-                self.rag_service = RAGService()
-                self._rag_enabled = True
-                logger.info("RAG service initialized successfully")
-            except Exception as e:
-                logger.warning(f"RAG service initialization failed: {e}")
+        try:
+            from .rag_service import RAGService
+            self.rag_service = RAGService()
+            self._rag_enabled = True
+            logger.info("RAG service initialized successfully")
+        except ImportError as e:
+            logger.warning(f"RAGService not available: {e}")
+        except Exception as e:
+            logger.warning(f"RAG service initialization failed: {e}")
+
+        self.response_cache = self._build_response_cache(settings)
+        self.conversations = build_conversation_store(settings)
+
+    def _build_response_cache(self, settings: Settings) -> SemanticResponseCache | None:
+        if not settings.response_cache_enabled:
+            return None
+        embedder = HashingEmbedder()
+        if settings.response_cache_embedder == "together":
+            if self._rag_enabled:
+                embedder = dense_embedder(self.rag_service.embed)
+            else:
+                logger.warning("Response cache: RAG embeddings unavailable, using local embedder")
+        return SemanticResponseCache(
+            embedder,
+            threshold=settings.response_cache_threshold,
+            ttl_by_mode={
+                "travel": settings.response_cache_ttl_travel_seconds,
+                "jobs": settings.response_cache_ttl_jobs_seconds,
+                "trends": settings.response_cache_ttl_trends_seconds,
+                "general": settings.response_cache_ttl_general_seconds,
+            },
+            max_entries=settings.response_cache_max_entries,
+        )
+
+    def _ensure_sdk(self) -> None:
+        """Import and configure the Gemini SDK on first use."""
+        if self._sdk_ready or not self._enabled:
+            return
+        try:
+            _load_genai().configure(api_key=self._api_key)
+        except Exception as e:
+            logger.error(f"google-generativeai failed to load, disabling Gemini: {e}")
+            self._enabled = False
+            return
+        # Text-only model for summaries
+        self._model = genai.GenerativeModel(self.model_id)
+        self._sdk_ready = True
+
+    def _build_profile_model(self, profile: AgentProfile) -> Any:
+        return self._build_chat_model(profile, self._routes[profile.mode].tool_model)
+
+    def _build_answer_model(self, profile: AgentProfile) -> Any:
+        """Separate answer-phase model, or None to reuse the tool-phase one."""
+        route = self._routes[profile.mode]
+        return self._build_chat_model(profile, route.answer_model) if route.tiered else None
+
+    def _build_chat_model(self, profile: AgentProfile, model_id: str) -> Any:
+        return genai.GenerativeModel(
+            model_id,
+            tools=list(profile.tools) or None,
+            system_instruction=(
+                profile.system_instruction + "\n\n" + LINK_INSTRUCTIONS
+                if self._compact_results else profile.system_instruction
+            ),
+            generation_config=genai.types.GenerationConfig(
+                max_output_tokens=profile.max_output_tokens
+            )
+        )
+
+    def _build_planner_model(self, profile: AgentProfile) -> Any:
+        """JSON-only model that returns a tool plan instead of calling tools."""
+        return genai.GenerativeModel(
+            self._routes[profile.mode].tool_model,
+            system_instruction=(
+                profile.system_instruction
+                + PLANNER_INSTRUCTIONS
+                + "\n## TOOL CATALOG\n"
+                + describe_tools(profile.tools)
+            ),
+            generation_config=genai.types.GenerationConfig(
+                response_mime_type="application/json"
+            )
+        )
+
+    def profile_for(self, mode: str) -> AgentProfile:
+        """The mode's profile, built on first use. Blocking; requests use ``get_profile``."""
+        if mode not in PROFILE_SPECS:
+            mode = DEFAULT_MODE
+        profile = self._profiles.get(mode)
+        if profile is None:
+            with self._build_lock:
+                profile = self._profiles.get(mode)
+                if profile is None:
+                    self._ensure_sdk()
+                    profile = build_agent_profile(
+                        mode,
+                        load_tool_group,
+                        self._build_profile_model if self._enabled else None,
+                        self._build_planner_model if self._enabled else None,
+                        self._build_answer_model if self._enabled else None,
+                    )
+                    self._profiles[mode] = profile
+        return profile
+
+    async def get_profile(self, mode: str) -> AgentProfile:
+        """``profile_for`` without blocking the event loop on a first build."""
+        if mode not in PROFILE_SPECS:
+            mode = DEFAULT_MODE
+        profile = self._profiles.get(mode)
+        if profile is None:
+            async with self._build_locks.setdefault(mode, asyncio.Lock()):
+                profile = self._profiles.get(mode) or await asyncio.to_thread(self.profile_for, mode)
+        return profile
+
+    async def chain_profile(self, profile: AgentProfile, decision: RouteDecision) -> AgentProfile:
+        """The profile narrowed to a routing decision's tools (``profile`` when nothing narrows)."""
+        if not decision.chains or not self._sdk_ready:
+            return profile
+        key = (profile.mode, decision.chains)
+        narrowed = self._chain_profiles.get(key)
+        if narrowed is None:
+            async with self._build_locks.setdefault(key, asyncio.Lock()):
+                narrowed = self._chain_profiles.get(key)
+                if narrowed is None:
+                    narrowed = await asyncio.to_thread(self._build_chain_profile, profile, decision)
+                    self._chain_profiles[key] = narrowed
+        return narrowed
+
+    def _build_chain_profile(self, profile: AgentProfile, decision: RouteDecision) -> AgentProfile:
+        with self._build_lock:
+            return narrow_profile(
+                profile,
+                decision.tools,
+                f"## ROUTED REQUEST: {' + '.join(decision.chains)}\n"
+                "Only the tools for this request are available in this turn; run the matching chain(s).",
+                self._build_profile_model,
+                self._build_planner_model,
+                self._build_answer_model,
+            )
+
+    def warm_up(self) -> None:
+        """Import the SDK and tool modules and build every profile.
+
+        Blocking; run in a worker thread after the app reports ready.
+        """
+        started = time.perf_counter()
+        for mode in PROFILE_SPECS:
+            self.profile_for(mode)
+        logger.info(f"Agent warmup finished in {(time.perf_counter() - started) * 1000:.0f}ms")
 
     async def summarize(self, domain: Domain, insights: Iterable[Insight], prompt: str | None) -> LLMResult:
         context = "\n".join(
@@ -145,20 +334,119 @@ class GeminiClient:
             base_prompt += f"\nUser prompt: {prompt}"
         base_prompt += f"\nContext:\n{context}"
 
+        self._ensure_sdk()
         if not self._enabled:
             fallback = self._build_fallback_summary(domain, insights, prompt)
             return LLMResult(text=fallback, latency_ms=None, model="mock-gemini", trace="mock")
 
-        loop = asyncio.get_running_loop()
         start = time.perf_counter()
         # Summarization typically doesn't need tools, but we can enable them if needed.
         # For now, keeping it text-only for speed unless prompt implies research.
-        response = await loop.run_in_executor(None, lambda: self._model.generate_content(base_prompt))
+        async with self.limiter.slot():
+            response = await self._model.generate_content_async(base_prompt)
         latency_ms = (time.perf_counter() - start) * 1000
         text = response.text if hasattr(response, "text") else str(response)
         return LLMResult(text=text, latency_ms=latency_ms, model=self.model_id)
 
-    async def respond(self, prompt: str, context: Iterable[Insight] | None = None, history: Iterable[Any] | None = None, mode: str = "general", travel_intent: dict | None = None) -> LLMResult:
+    async def respond(self, prompt: str, context: Iterable[Insight] | None = None, history: Iterable[Any] | None = None, mode: str = "general", travel_intent: dict | None = None, strategy: str = "iterative", deadline_seconds: float | None = None, conversation_id: str | None = None, start_conversation: bool = False) -> LLMResult:
+        result: LLMResult | None = None
+        async for event in self.stream(prompt, context, history, mode, travel_intent, strategy=strategy, deadline_seconds=deadline_seconds, conversation_id=conversation_id, start_conversation=start_conversation, stream_tokens=False):
+            if event.type == "done":
+                result = event.result
+        return result
+
+    async def stream(
+        self,
+        prompt: str,
+        context: Iterable[Insight] | None = None,
+        history: Iterable[Any] | None = None,
+        mode: str = "general",
+        travel_intent: dict | None = None,
+        strategy: str = "iterative",
+        deadline_seconds: float | None = None,
+        conversation_id: str | None = None,
+        stream_tokens: bool = True,
+        start_conversation: bool = False,
+    ) -> AsyncIterator[AgentEvent]:
+        """Run the agent loop, yielding progress events as they happen.
+
+        The last event is always ``done`` and carries the final LLMResult.
+        With ``stream_tokens`` the model output is yielded as ``token`` events
+        while Gemini is still generating. ``strategy="plan"`` asks the model
+        for a tool-call plan up front, runs it as a parallel DAG and then
+        makes a single synthesis call.
+
+        Prompts without history or context are answered from the semantic
+        response cache when a similar one was seen recently in the same mode
+        with the same travel_intent. In travel mode, flight searches fully
+        determined by travel_intent are started in parallel with the first
+        Gemini call and handed to the model's matching tool calls. A form
+        submission whose travel_intent fully specifies the search skips the
+        model: the searches run directly and the answer is rendered from a
+        template (``model`` is "direct-search").
+
+        The whole run is bounded by ``deadline_seconds`` (default: the
+        per-mode deadline). RAG, tool and model calls get whatever is left of
+        it; once the budget for tool work is spent, stragglers are cancelled
+        and a final synthesis turn answers from the results that arrived.
+
+        Runs with a ``conversation_id``, or with ``start_conversation``,
+        belong to a server-side conversation: with a known id its stored turns
+        replace ``history`` and the tool results behind the previous answer
+        are offered to the model again. An unknown or expired id is recreated
+        from ``history`` when one is sent and raises
+        ConversationNotFoundError otherwise. Turns of one conversation run one
+        at a time, and the ``done`` result carries the conversation id for the
+        next request. Other runs only use ``history`` and store nothing.
+        """
+        # A new conversation gets a fresh id: nothing else can be using it
+        lock = self.conversations.lock(conversation_id) if conversation_id is not None else contextlib.nullcontext()
+        async with lock:
+            conversation = await self._resolve_conversation(conversation_id, history, mode)
+            persist = conversation_id is not None or start_conversation
+            prefetcher = ToolPrefetcher()
+            try:
+                async for event in self._run_agent(
+                    prompt, context, conversation.turns, mode, travel_intent, strategy, deadline_seconds, stream_tokens,
+                    prefetcher, conversation.tool_results,
+                ):
+                    if event.type == "done" and persist:
+                        result = event.result
+                        conversation.add_exchange(prompt, result.text, result.tool_results, self.conversations.max_turns)
+                        await self.conversations.save(conversation)
+                        result.conversation_id = conversation.id
+                    yield event
+            finally:
+                unused = prefetcher.cancel_unclaimed()
+                if unused:
+                    logger.info(f"PREFETCH: {unused} unused call(s) cancelled")
+
+    async def _resolve_conversation(self, conversation_id: str | None, history: Iterable[Any] | None, mode: str) -> Conversation:
+        if conversation_id is None:
+            return self.conversations.create(mode, history)
+        try:
+            return await self.conversations.get(conversation_id)
+        except ConversationNotFoundError:
+            if not history:
+                raise
+            logger.info(f"Conversation {conversation_id} expired, restoring it from client history")
+            return self.conversations.create(mode, history, conversation_id)
+
+    async def _run_agent(
+        self,
+        prompt: str,
+        context: Iterable[Insight] | None,
+        history: Iterable[Any] | None,
+        mode: str,
+        travel_intent: dict | None,
+        strategy: str,
+        deadline_seconds: float | None,
+        stream_tokens: bool,
+        prefetcher: ToolPrefetcher,
+        previous_results: list[str] | None = None,
+    ) -> AsyncIterator[AgentEvent]:
+        yield AgentEvent("started", {"mode": mode})
+
         combined_prompt = prompt
         if travel_intent and mode == "travel":
             combined_prompt = (
@@ -171,20 +459,119 @@ class GeminiClient:
             combined_prompt += "\n\nContext:\n" + "\n".join(
                 f"- {item.title}: {item.description}" for item in context
             )
+        # Full tool payloads stay here; the model only sees compacted results
+        result_store = ToolResultStore(max_chars=self._tool_result_max_chars)
+        if previous_results:
+            # Links go back to short ids so the answer's [L3] references expand again
+            combined_prompt += (
+                "\n\n## RESULTS FROM THE PREVIOUS ANSWER (reuse them instead of searching again)\n\n"
+                + "\n\n".join(result_store.shorten_urls(result) for result in previous_results)
+            )
         if not self._enabled:
-            return LLMResult(
-                text="Gemini disabled. Install a key and restart the API.",
+            text = "Gemini disabled. Install a key and restart the API."
+            if stream_tokens:
+                yield AgentEvent("token", {"text": text})
+            yield AgentEvent("done", {}, result=LLMResult(
+                text=text,
                 latency_ms=None,
                 model="mock-gemini",
                 trace="mock",
-            )
+            ))
+            return
         
+        start = time.perf_counter()
+        deadline = Deadline(
+            deadline_seconds or self._deadlines.get(mode, self._deadlines[DEFAULT_MODE]),
+            reserve=self._synthesis_reserve,
+        )
+
+        # Follow-ups depend on the conversation, so only stateless prompts are cached
+        cacheable = self.response_cache is not None and not history and not context
+        if cacheable:
+            with span("cache_lookup") as lookup_span:
+                try:
+                    hit = await self.response_cache.lookup(mode, prompt, travel_intent)
+                except Exception as e:
+                    logger.warning(f"Response cache lookup failed: {e}")
+                    hit = None
+                lookup_span.set(hit=hit is not None)
+            if hit is not None:
+                latency_ms = (time.perf_counter() - start) * 1000
+                logger.info(
+                    f"Response cache hit (similarity {hit.similarity:.3f})",
+                    extra={"event": "llm_cache_hit", "mode": mode, "similarity": round(hit.similarity, 4),
+                           "cached_prompt": hit.prompt},
+                )
+                cached: LLMResult = hit.value
+                yield AgentEvent("cache_hit", {"similarity": round(hit.similarity, 4)})
+                if stream_tokens:
+                    yield AgentEvent("token", {"text": cached.text})
+                yield AgentEvent("done", {}, result=LLMResult(
+                    text=cached.text,
+                    latency_ms=latency_ms,
+                    model=cached.model,
+                    trace=cached.trace,
+                    cached=True,
+                    cache_similarity=hit.similarity,
+                ))
+                return
+
+        profile = await self.get_profile(mode)
+        logger.debug(f"Using agent mode: {profile.mode}")
+
+        # Form submissions that fully specify the search skip the model
+        direct_steps = (
+            direct_search_plan(travel_intent)
+            if self._direct_search and mode == "travel" and is_form_prompt(prompt) else None
+        )
+        if direct_steps:
+            direct = None
+            async for event in self._run_direct_search(profile, direct_steps, travel_intent, prefetcher, deadline, start):
+                if isinstance(event, AgentEvent):
+                    yield event
+                else:
+                    direct = event
+            if direct is not None:
+                if stream_tokens:
+                    yield AgentEvent("token", {"text": direct.text})
+                if cacheable:
+                    try:
+                        await self.response_cache.store(mode, prompt, direct, travel_intent)
+                    except Exception as e:
+                        logger.warning(f"Response cache store failed: {e}")
+                yield AgentEvent("done", {}, result=direct)
+                return
+
+        # Start the flight searches the intent already pins down; they run
+        # while RAG retrieval and the first model turn are in progress
+        if self._prefetch_tools and mode == "travel":
+            for name, args in flight_calls_from_intent(travel_intent):
+                if prefetcher.start(name, args, profile.dispatch, partial(self._run_tool_call, tool_map=profile.dispatch, timeout=deadline.clamp(self._tool_timeout))):
+                    yield AgentEvent("tool_prefetched", {"name": name, "args": args})
+
+        # Bind only the chain(s) the prompt and the travel form need;
+        # whole-trip and broad requests keep every tool
+        decision = None
+        if self.router is not None and profile.mode in ROUTED_MODES:
+            decision = self.router.route(prompt, travel_intent)
+            routed = await self.chain_profile(profile, decision)
+            if routed is not profile:
+                yield AgentEvent("routed", {
+                    "chains": list(decision.chains), "source": decision.source, "tools": len(routed.tools),
+                })
+                profile = routed
+            log_payload(logger, "prompt", prompt, mode=profile.mode, route=list(decision.chains))
+
         # Retrieve RAG context for API parameter guidance
         rag_context = ""
         if self._rag_enabled and mode in ["travel", "jobs", "trends"]:
             try:
                 # Search RAG for relevant parameter docs
-                rag_docs = await self.rag_service.search(prompt, mode, top_k=3)
+                with span("rag", namespace=mode) as rag_span:
+                    rag_docs = await asyncio.wait_for(
+                        self.rag_service.search(prompt, mode, top_k=3), timeout=deadline.clamp(None)
+                    )
+                    rag_span.set(docs=len(rag_docs or []))
                 if rag_docs:
                     rag_context = "\n\n## API PARAMETER GUIDANCE (from RAG database)\n"
                     rag_context += "Use this information to format tool parameters correctly:\n\n"
@@ -193,6 +580,11 @@ class GeminiClient:
                         for doc in rag_docs
                     ])
                     logger.info(f"RAG: Retrieved {len(rag_docs)} docs for mode={mode}")
+                yield AgentEvent("rag_retrieved", {
+                    "count": len(rag_docs or []),
+                    "titles": [doc.get("title", "Untitled") for doc in rag_docs or []],
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+                })
             except Exception as e:
                 logger.warning(f"RAG search failed: {e}")
                 rag_context = ""
@@ -201,261 +593,124 @@ class GeminiClient:
         if rag_context:
             combined_prompt = rag_context + "\n\n---\n\n" + combined_prompt
         
-        start = time.perf_counter()
-        
-        # Convert history to Gemini format if provided
+        # Convert history to Gemini format, older turns folded into a summary
         chat_history = []
         if history:
-            for msg in history:
-                chat_history.append({
-                    "role": msg.role,
-                    "parts": [msg.content]
-                })
+            compressed = await self.history.compress(history, profile.mode, timeout=deadline.clamp(None))
+            if compressed.summary:
+                chat_history.append({"role": "user", "parts": [SUMMARY_PREFIX + compressed.summary]})
+                chat_history.append({"role": "model", "parts": [SUMMARY_ACK]})
+            for turn in compressed.turns:
+                chat_history.append({"role": turn.role, "parts": [turn.content]})
 
         # Manual function calling loop (async-compatible)
-        # Disable automatic function calling since our tools are async
-        chat = self._model.start_chat(history=chat_history)
-        
-        # Build tool name -> function mapping
-        tool_map = {func.__name__: func for func in MCP_TOOLS}
-        logger.info(f"Available tools: {list(tool_map.keys())}")
-        
-        # Agent-specific system prompts
-        SYSTEM_PROMPTS = {
-            "travel": """You are a TRAVEL PLANNING ORCHESTRATOR. You execute task-specific chains to complete travel requests.
-
-## CHAIN-OF-THOUGHT PROCESS
-Before ANY tool call, briefly think about which chain(s) to run:
-<thinking>
-1. What is the user asking for? (flights/hotels/transport/places/full trip)
-2. Which chain(s) should I execute?
-3. What are the key parameters? (dates, locations, passengers)
-</thinking>
-
----
-
-## AVAILABLE CHAINS
-
-### 🛫 FLIGHT_SEARCH_CHAIN
-**Use for**: "Find flights", "Book flight", flight prices, "fly to X"
-**Tools**: search_flights, search_flights_sky, search_google_flights, search_booking_flights
-**Steps**:
-1. Parse origin/destination → IATA codes (TLL, HEL, JFK, CDG, etc.)
-2. Parse dates → YYYY-MM-DD format. Default year: 2025
-3. Call search_flights(from_location=IATA, to_location=IATA, date_from="YYYY-MM-DD")
-4. Call search_flights_sky(from_location=IATA, to_location=IATA, date="YYYY-MM-DD")
-5. If either fails → Try search_google_flights, then search_booking_flights
-6. Compare results, rank by price
-7. OUTPUT: Top 5 flight options with prices, airlines, times
-
-**Round trips**: Add return_from (Kiwi) or return_date (Skyscanner)
-**Date ranges**: Use date_from + date_to (Kiwi only)
-**Whole month**: Use whole_month="YYYY-MM" (Skyscanner only)
-**Stops filter**: Use max_stops=0 (direct), 1 (up to 1 stop), 2 (up to 2 stops), or None (any)
-
-### 📊 FLIGHT RESULT ANALYSIS GUIDELINES (CRITICAL)
-When presenting flight search results to the user:
-
-1. **ANALYZE ALL FLIGHTS** - Don't just show the cheapest. Read the metadata summary at the top.
-2. **ALWAYS MENTION DIRECT FLIGHTS** - Even if not the cheapest, state "Direct flights available from $X"
-3. **SHOW PRICE TRADE-OFFS** - Format like: "Direct flights from $91 (1h 05m) or save $14 with a 1-stop via Stockholm ($77, 3h 30m)"
-4. **HIGHLIGHT THE SUMMARY** - The tool output starts with a summary (📊 Found X flights...). Use this data!
-5. **INCLUDE BOOKING LINKS** - Always provide the booking links for recommended options
-6. **MENTION STOPS FILTER** - If user filtered stops, acknowledge it: "Showing direct flights only as requested"
-
----
-
-### 🏨 ACCOMMODATION_CHAIN
-**Use for**: "Find hotel", "Where to stay", "apartments in X", accommodation
-**Tools**: search_hotels, search_airbnb
-**Steps**:
-1. Parse location and check-in/check-out dates
-2. Call search_hotels(location="City", check_in="YYYY-MM-DD", check_out="YYYY-MM-DD")
-3. Call search_airbnb(location="City", check_in="YYYY-MM-DD", check_out="YYYY-MM-DD")
-4. Compare prices and ratings
-5. OUTPUT: Top 5 hotels + Top 5 apartments with prices and links
-
----
-
-### 🚌 TRANSPORT_CHAIN
-**Use for**: "How to get from airport", "directions to", ground transport
-**Tools**: get_directions, search_ground_transport
-**Steps**:
-1. Identify origin (airport/station) and destination (hotel/city center)
-2. Call get_directions(origin="Airport Name", destination="City Center", mode="transit")
-3. Call search_ground_transport(origin="...", destination="...") for alternatives
-4. OUTPUT: Route options with times, costs, and specific instructions
-
-**For ferries**: Use get_directions with mode="transit" (includes ferry routes)
-
----
-
-### 📍 PLACES_CHAIN
-**Use for**: "Things to do", "restaurants near", "attractions in X"
-**Tools**: search_places, text_search_places, search_places_nearby
-**Steps**:
-1. Identify location/city
-2. Call search_places(query="top attractions in [City]")
-3. If hotel location known, call search_places_nearby(lat, lng, type="restaurant")
-4. OUTPUT: Categorized list (restaurants, sights, activities) with ratings
-
----
-
-### ✈️🏨 FULL_TRIP_CHAIN (Orchestrator)
-**Use for**: "Plan a trip", "Travel to X", "Weekend in Y", comprehensive planning
-**Executes**: FLIGHT_SEARCH → TRANSPORT → ACCOMMODATION → PLACES
-**Steps**:
-1. Parse user query for all components (dates, destination, travelers)
-2. Execute FLIGHT_SEARCH_CHAIN → Get best flight options
-3. Execute TRANSPORT_CHAIN → Airport to city center directions
-4. Execute ACCOMMODATION_CHAIN → Hotels and apartments
-5. Execute PLACES_CHAIN → Top attractions (optional)
-6. SYNTHESIZE: Combine into complete travel plan with all options
-
----
-
-## EXECUTION RULES (CRITICAL)
-
-1. **ANNOUNCE which chain you're running**:
-   [EXECUTING: FLIGHT_SEARCH_CHAIN]
-   
-2. **NEVER stop mid-chain** - Complete all steps before moving on
-
-3. **For FULL_TRIP_CHAIN**: Run ALL sub-chains sequentially. Do not stop after flights.
-
-4. **Compare multiple sources**: Always call both Kiwi AND Skyscanner for flights, Hotels AND Airbnb for accommodation
-
-5. **If a tool fails**: Try the backup tools before giving up
-
-6. **ALWAYS end with a synthesized summary** combining all results
-
----
-
-## PARAMETER QUICK REFERENCE
-
-| Parameter | Format | Example |
-|-----------|--------|---------|
-| Dates | YYYY-MM-DD | 2025-01-15 |
-| Airports | IATA code | TLL, HEL, JFK, CDG |
-| Cabin class | ECONOMY, BUSINESS, FIRST_CLASS | cabin_class="BUSINESS" |
-| Round trip | return_from (Kiwi), return_date (Sky) | return_from="2025-01-20" |
-
----
-
-## INTENT DETECTION
-
-| User says... | Chain to run |
-|--------------|--------------|
-| "Flights to Paris" | FLIGHT_SEARCH_CHAIN only |
-| "Hotels in Barcelona" | ACCOMMODATION_CHAIN only |
-| "How to get from airport" | TRANSPORT_CHAIN only |
-| "Things to do in Rome" | PLACES_CHAIN only |
-| "Plan a trip to Tokyo" | FULL_TRIP_CHAIN (all 4) |
-| "Flights and hotel in X" | FLIGHT_SEARCH + ACCOMMODATION |
-
----
-
-## RESPONSE FORMAT
-
-End every response with:
-1. **Clear summary** of all options found
-2. **Prices compared** across sources
-3. **Follow-up question**: "Want me to book any of these?" or "Should I search for activities too?"
-""",
-            
-            "jobs": """You are a JOBS/CAREER AGENT assistant with access to powerful tools.
-
-## YOUR PRIMARY TOOLS (use these first):
-- search_jobs, get_active_jobs - find job listings
-- optimize_resume - improve resume for specific jobs
-- analyze_job_match - score resume against job descriptions
-
-## BACKUP TOOLS (use for company research or additional info):
-- web_search, scrape_webpage, crawl_website
-
-## RULES:
-1. **Always search jobs** when user asks about opportunities in a field/location
-2. **Use optimize_resume** when user shares resume text and job description
-3. **Use analyze_job_match** to score compatibility
-4. **Scrape company pages** when user wants info about specific employers
-5. **Be encouraging** but honest about job matches
-6. **Deliberate steps**: plan briefly (role/location/filters), then run search_jobs; if provided resume+JD, run analyze_job_match and optimize_resume; summarize with links.
-
-## RESPONSE STYLE:
-- List jobs with title, company, location, salary (if available)
-- For resume help: provide specific, actionable suggestions
-- For job matches: highlight strengths and areas to improve
-
-## ALWAYS END WITH a relevant follow-up question:
-- "Want me to optimize your resume for any of these roles?"
-- "Should I search for more jobs in a different location or field?"
-- "Can I analyze how well your skills match a specific job?"
-""",
-            
-            "trends": """You are a TRENDS/SOCIAL MEDIA AGENT assistant with access to powerful tools.
-
-## YOUR PRIMARY TOOLS (use these first):
-- search_tweets - real Twitter/X search
-- get_tiktok_trends, search_tiktok - TikTok content
-- search_instagram, get_instagram_posts - Instagram content
-- search_facebook - Facebook content
-- get_youtube_trends, search_youtube - YouTube content
-- get_google_trends - trending topics
-
-## BACKUP TOOLS (use for deeper research):
-- web_search, scrape_webpage, crawl_website
-
-## RULES:
-1. **Use multiple social platforms** to get a complete picture of trends
-2. **Search specific hashtags** when asked about topics
-3. **Use get_*_trends** for what's currently viral
-4. **Combine platforms** for cross-platform trend analysis
-5. **Be data-driven** - include engagement metrics when available
-6. **Deliberate steps**: normalize topic/hashtags/geo/time; pick 2+ platforms; call trend + search APIs; synthesize top signals with dates/metrics.
-
-## RESPONSE STYLE:
-- Include usernames, post dates, engagement (likes/views)
-- Highlight viral content and emerging patterns
-- Present insights with specific examples
-
-## ALWAYS END WITH a relevant follow-up question:
-- "Want me to search for this trend on another platform?"
-- "Should I find related hashtags or influencers?"
-- "Can I dig deeper into a specific piece of content?"
-""",
-
-            "general": """You are a helpful research assistant with access to many tools across travel, jobs, and trends.
-
-## AVAILABLE TOOLS:
-- Travel: get_directions, search_flights, search_hotels, search_places, geocode_address
-- Jobs: search_jobs, optimize_resume, analyze_job_match
-- Trends: search_tweets, get_tiktok_trends, search_instagram, search_facebook, get_youtube_trends
-- Research: web_search, scrape_webpage, crawl_website
-
-## RULES:
-1. **Choose the right tools** based on the query type
-2. **Chain tools** for complex queries
-3. **Use web_search/scrape_webpage as backup** when specialized tools don't suffice
-4. **Be confident** with tool results
-
-## ALWAYS END WITH a relevant follow-up question.
-"""
-        }
-        
-        # Select system prompt based on mode
-        system_prompt = SYSTEM_PROMPTS.get(mode, SYSTEM_PROMPTS["general"])
-        logger.info(f"Using agent mode: {mode}")
+        # Disable automatic function calling since our tools are async.
+        # Tool selection runs on the tool-phase model; turns that read tool
+        # results move to the answer-phase model (see _switch_to_answer_model)
+        route = self._routes.get(profile.mode) or self._routes[DEFAULT_MODE]
+        chat = profile.model.start_chat(history=chat_history)
+        turn_model = route.tool_model
         
         trace_log = []
-        response = await asyncio.get_running_loop().run_in_executor(
-            None, lambda: chat.send_message(system_prompt + combined_prompt)
-        )
+        tool_errors = 0
+        # Every finished tool outcome, for a forced synthesis at the deadline
+        collected: list[tuple[str, ToolOutcome]] = []
+        pending_message: Any = combined_prompt
+        send_kwargs: dict[str, Any] = {}
         
         # Loop to handle function calls
         max_iterations = 5  # Prevent infinite loops
         iteration = 0
-        
-        while iteration < max_iterations:
+
+        if strategy == "plan":
+            steps = await self._make_plan(profile, chat_history, combined_prompt, deadline)
+            if steps is not None:
+                yield AgentEvent("plan", {"steps": [
+                    {"id": step.id, "tool": step.tool, "depends_on": list(step.depends_on)}
+                    for step in steps
+                ]})
+                trace_log.append(f"Plan: {len(steps)} steps")
+                outcomes: dict[str, ToolOutcome] = {}
+                async for kind, step, outcome in execute_plan(steps, partial(self._run_plan_step, profile, prefetcher, deadline)):
+                    if kind == "started":
+                        yield AgentEvent("tool_started", {"name": step.tool, "args": step.args, "step": step.id})
+                        continue
+                    outcomes[step.id] = outcome
+                    yield AgentEvent("tool_finished", {
+                        "name": outcome.name,
+                        "step": step.id,
+                        "latency_ms": round(outcome.latency_ms, 1),
+                        "item_count": outcome.item_count,
+                        "error": outcome.error,
+                    })
+                for step in steps:
+                    trace_log.extend(outcomes[step.id].trace)
+                    tool_errors += outcomes[step.id].error
+                    collected.append((step.id, outcomes[step.id]))
+                # Single synthesis turn on the answer model: tool calling
+                # disabled, no further iterations
+                chat = profile.answer_model.start_chat(history=chat_history)
+                turn_model = route.answer_model
+                pending_message = self._build_synthesis_message(combined_prompt, collected, result_store)
+                send_kwargs = {"tool_config": NO_TOOL_CALLS}
+                max_iterations = 0
+
+        response = None
+        timed_out = False
+        force_synthesis = False
+        while True:
+            final_turn = iteration >= max_iterations
+            if not final_turn and (force_synthesis or deadline.work_expired):
+                # Out of time for tool work: answer from what has arrived,
+                # on a fresh chat so no unanswered function call is pending
+                logger.warning(
+                    f"Deadline reached after {deadline.seconds - deadline.remaining():.1f}s, forcing synthesis",
+                    extra={"event": "deadline_reached", "mode": profile.mode, "tool_results": len(collected)},
+                )
+                yield AgentEvent("deadline_reached", {"tool_results": len(collected)})
+                # The reserve is short, so this answer uses the faster tool-phase model
+                chat = profile.model.start_chat(history=chat_history)
+                turn_model = route.tool_model
+                pending_message = self._build_synthesis_message(combined_prompt, collected, result_store, out_of_time=True)
+                send_kwargs = {"tool_config": NO_TOOL_CALLS}
+                max_iterations = iteration
+                final_turn = True
+
+            # Send the prompt (or the previous turn's function responses);
+            # only the final turn may use the synthesis reserve
+            turn_timeout = deadline.remaining() if final_turn else deadline.work_remaining()
+            turn_span = start_span("llm_turn", turn=iteration + 1, model=turn_model, final=final_turn)
+            try:
+                if stream_tokens:
+                    turn = self._send_message_stream(chat, pending_message, **send_kwargs)
+                    async for chunk in iterate_within(turn, turn_timeout):
+                        if isinstance(chunk, _StreamDone):
+                            response = chunk.response
+                            continue
+                        for text in _chunk_texts(chunk):
+                            text = result_store.expand_stream(text)
+                            if text:
+                                yield AgentEvent("token", {"text": text})
+                    tail = result_store.flush_stream()
+                    if tail:
+                        yield AgentEvent("token", {"text": tail})
+                else:
+                    response = await asyncio.wait_for(
+                        self._send_message(chat, pending_message, **send_kwargs), timeout=turn_timeout
+                    )
+            except asyncio.TimeoutError:
+                turn_span.end(status="timeout")
+                result_store.flush_stream()
+                if final_turn:
+                    timed_out = True
+                    break
+                # A tool-calling turn overran; the loop head forces synthesis
+                force_synthesis = True
+                continue
+            turn_span.end(status="ok")
+
+            if final_turn:
+                break
             iteration += 1
             
             # Check if response contains function calls
@@ -471,61 +726,326 @@ End every response with:
                 # No more function calls, we have the final response
                 break
             
-            # Process each function call
-            function_responses = []
-            for fc in function_calls:
-                func_name = fc.name
+            # Execute every function call from this turn concurrently and
+            # report each one as it finishes; responses keep the call order
+            tasks: dict[asyncio.Task, int] = {}
+            for index, fc in enumerate(function_calls):
                 func_args = dict(fc.args) if fc.args else {}
-                
-                logger.info(f"TOOL CALL: {func_name}({func_args})")
-                trace_log.append(f"Called: {func_name}({func_args})")
-                
-                if func_name in tool_map:
-                    try:
-                        # Call the async function
-                        result = await tool_map[func_name](**func_args)
-                        result_str = str(result)
-                        
-                        # Parse result for structured logging
-                        is_error = result_str.startswith("Error") or result_str.startswith("No ")
-                        line_count = result_str.count("\n---") if "---" in result_str else 0
-                        
-                        # Extract any price mentions
-                        import re
-                        prices = re.findall(r'\$[\d,]+(?:\.\d{2})?|\d+\s*(?:USD|EUR|GBP)', result_str)
-                        price_summary = f", prices: {prices[:3]}" if prices else ""
-                        
-                        logger.info(f"TOOL RESULT: {func_name} - count={line_count}, error={is_error}{price_summary}")
-                        logger.debug(f"TOOL RESULT FULL: {func_name}: {result_str[:1000]}...")
-                        trace_log.append(f"Result: {line_count} items{price_summary}")
-                    except Exception as e:
-                        result = f"Error calling {func_name}: {str(e)}"
-                        logger.error(f"TOOL ERROR: {func_name}: {e}")
-                        trace_log.append(f"Error: {str(e)}")
+                task = prefetcher.claim(fc.name, func_args, profile.dispatch)
+                yield AgentEvent("tool_started", {
+                    "name": fc.name,
+                    "args": func_args,
+                    "prefetched": task is not None,
+                })
+                if task is not None:
+                    logger.info(f"PREFETCH: reusing {fc.name}", extra={"event": "prefetch_hit", "tool": fc.name})
                 else:
-                    result = f"Unknown function: {func_name}"
-                    trace_log.append(f"Unknown: {func_name}")
-                
-                # Build function response
+                    task = asyncio.create_task(self._run_tool_call(
+                        fc.name, func_args, profile.dispatch, timeout=deadline.clamp(self._tool_timeout)
+                    ))
+                tasks[task] = index
+
+            outcomes: list[ToolOutcome | None] = [None] * len(function_calls)
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=deadline.work_remaining(), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        break
+                    for task in done:
+                        outcome = task.result()
+                        outcomes[tasks[task]] = outcome
+                        yield AgentEvent("tool_finished", {
+                            "name": outcome.name,
+                            "latency_ms": round(outcome.latency_ms, 1),
+                            "item_count": outcome.item_count,
+                            "error": outcome.error,
+                        })
+            finally:
+                # Deadline reached or client went away mid-turn: don't leave
+                # provider calls running
+                for task in pending:
+                    task.cancel()
+            force_synthesis = bool(pending)
+
+            function_responses = []
+            for index, outcome in enumerate(outcomes):
+                if outcome is None:
+                    fc = function_calls[index]
+                    reason = f"Cancelled {fc.name}: request deadline reached"
+                    outcome = ToolOutcome(fc.name, dict(fc.args) if fc.args else {}, reason, [reason], 0.0, error=True)
+                collected.append((f"call{len(collected) + 1}", outcome))
+                trace_log.extend(outcome.trace)
+                tool_errors += outcome.error
                 function_responses.append(
-                    genai.protos.Part(
+                    _load_genai().protos.Part(
                         function_response=genai.protos.FunctionResponse(
-                            name=func_name,
-                            response={"result": str(result)}
+                            name=outcome.name,
+                            response={"result": self._model_view(outcome, result_store)}
                         )
                     )
                 )
             
-            # Send function responses back to the model
-            response = await asyncio.get_running_loop().run_in_executor(
-                None, lambda: chat.send_message(function_responses)
-            )
+            # Send function responses back to the model on the next pass
+            pending_message = function_responses
+            if route.tiered and turn_model != route.answer_model:
+                # Reading results and writing the answer is the strong model's
+                # job; it keeps the tools and may still call more
+                chat = profile.answer_model.start_chat(history=chat.history)
+                turn_model = route.answer_model
         
         latency_ms = (time.perf_counter() - start) * 1000
-        text = response.text if hasattr(response, "text") else str(response)
+        if timed_out or response is None:
+            text = self._build_deadline_fallback(collected)
+            if stream_tokens:
+                yield AgentEvent("token", {"text": text})
+        else:
+            text = response.text if hasattr(response, "text") else str(response)
+            text = result_store.expand_links(text)
         trace = " | ".join(trace_log) if trace_log else None
-        logger.info(f"Final response (latency: {latency_ms:.0f}ms): {text[:200]}...")
-        return LLMResult(text=text, latency_ms=latency_ms, model=self.model_id, trace=trace)
+        logger.info(
+            f"Final response (latency: {latency_ms:.0f}ms)",
+            extra={"event": "llm_response", "mode": profile.mode, "latency_ms": round(latency_ms, 1),
+                   "tool_calls": sum(1 for entry in trace_log if entry.startswith("Called:")),
+                   "tools": [outcome.name for _, outcome in collected],
+                   "route": list(decision.chains) if decision else None,
+                   "chars": len(text), "deadline_s": deadline.seconds, "timed_out": timed_out},
+        )
+        log_payload(logger, "final_response", text, mode=profile.mode)
+        result = LLMResult(
+            text=text, latency_ms=latency_ms, model=turn_model, trace=trace,
+            tool_results=self._conversation_results(collected, result_store),
+        )
+        # Answers built on failed tool calls are not worth replaying
+        if cacheable and text.strip() and not tool_errors and not timed_out:
+            try:
+                await self.response_cache.store(mode, prompt, result, travel_intent)
+            except Exception as e:
+                logger.warning(f"Response cache store failed: {e}")
+        yield AgentEvent("done", {}, result=result)
+
+    async def _run_direct_search(
+        self,
+        profile: AgentProfile,
+        steps: list[PlanStep],
+        travel_intent: dict,
+        prefetcher: ToolPrefetcher,
+        deadline: Deadline,
+        start: float,
+    ) -> AsyncIterator[AgentEvent | LLMResult]:
+        """Run a direct-search plan and render its answer.
+
+        Yields tool progress events and then the LLMResult, or no result when
+        a search came back empty and the agent should take over.
+        """
+        outcomes: dict[str, ToolOutcome] = {}
+        async for kind, step, outcome in execute_plan(steps, partial(self._run_plan_step, profile, prefetcher, deadline)):
+            if kind == "started":
+                yield AgentEvent("tool_started", {"name": step.tool, "args": step.args, "step": step.id})
+                continue
+            outcomes[step.id] = outcome
+            yield AgentEvent("tool_finished", {
+                "name": outcome.name,
+                "step": step.id,
+                "latency_ms": round(outcome.latency_ms, 1),
+                "item_count": outcome.item_count,
+                "error": outcome.error,
+            })
+        text = render_direct_answer(travel_intent, steps, outcomes)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if text is None:
+            logger.info(
+                "Direct search found nothing to render, handing over to the agent",
+                extra={"event": "direct_search_fallback", "steps": [step.tool for step in steps]},
+            )
+            return
+        logger.info(
+            f"Direct search answered without the model (latency: {latency_ms:.0f}ms)",
+            extra={"event": "direct_search", "latency_ms": round(latency_ms, 1),
+                   "steps": [step.tool for step in steps]},
+        )
+        result_store = ToolResultStore(max_chars=self._tool_result_max_chars)
+        collected = [(step.id, outcomes[step.id]) for step in steps]
+        yield LLMResult(
+            text=text,
+            latency_ms=latency_ms,
+            model=DIRECT_SEARCH_MODEL,
+            trace=" | ".join(entry for _, outcome in collected for entry in outcome.trace) or None,
+            tool_results=self._conversation_results(collected, result_store),
+        )
+
+    def _conversation_results(self, outcomes: list[tuple[str, ToolOutcome]], store: ToolResultStore) -> list[str]:
+        """Compacted successful results, links expanded, to keep with the conversation."""
+        return [
+            store.expand_links(
+                f"{outcome.name}({outcome.args}):\n{self._model_view(outcome, store)[:self._tool_result_max_chars]}"
+            )
+            for _, outcome in outcomes if not outcome.error
+        ]
+
+    async def _summarize_history(self, previous: str, turns: list[ChatTurn], max_words: int) -> str:
+        response = await self._generate(self._model, summarization_prompt(previous, turns, max_words), "llm_history_summary")
+        return response.text.strip()
+
+    async def _make_plan(self, profile: AgentProfile, chat_history: list[dict], prompt: str, deadline: Deadline) -> list[PlanStep] | None:
+        """Ask the planner model for a tool plan; None means fall back to the iterative loop."""
+        contents = chat_history + [{"role": "user", "parts": [prompt]}]
+        try:
+            response = await asyncio.wait_for(
+                self._generate(profile.planner, contents, "llm_plan"), timeout=deadline.clamp(None)
+            )
+            steps = parse_plan(response.text, profile.dispatch)
+        except Exception as e:
+            logger.warning(f"Planning failed for mode={profile.mode}, using iterative loop: {e}")
+            return None
+        logger.info(
+            f"PLAN: {len(steps)} steps",
+            extra={"event": "plan", "steps": [(step.id, step.tool, step.depends_on) for step in steps]},
+        )
+        return steps
+
+    async def _run_plan_step(self, profile: AgentProfile, prefetcher: ToolPrefetcher, deadline: Deadline, step: PlanStep, finished: Mapping[str, ToolOutcome]) -> ToolOutcome:
+        failed = [dep for dep in step.depends_on if finished[dep].error]
+        if failed:
+            reason = f"Skipped {step.tool}: dependency {', '.join(failed)} failed"
+            return ToolOutcome(step.tool, step.args, reason, [reason], 0.0, error=True)
+        try:
+            args = resolve_args(step.args, {step_id: outcome.result for step_id, outcome in finished.items()})
+        except PlanError as e:
+            reason = f"Skipped {step.tool}: {e}"
+            return ToolOutcome(step.tool, step.args, reason, [reason], 0.0, error=True)
+        prefetched = prefetcher.claim(step.tool, args, profile.dispatch)
+        if prefetched is not None:
+            return await prefetched
+        return await self._run_tool_call(step.tool, args, profile.dispatch, timeout=deadline.clamp(self._tool_timeout))
+
+    def _model_view(self, outcome: ToolOutcome, store: ToolResultStore) -> str:
+        """What the model sees of a tool result: compacted unless disabled or errored."""
+        if not self._compact_results or outcome.error:
+            return outcome.result
+        if outcome.model_view is None:
+            outcome.model_view = store.compact(outcome.name, outcome.result)
+        return outcome.model_view
+
+    def _build_synthesis_message(self, prompt: str, outcomes: list[tuple[str, ToolOutcome]], store: ToolResultStore, out_of_time: bool = False) -> str:
+        sections = [
+            f"### {label}: {outcome.name}({outcome.args})\n{self._model_view(outcome, store)}"
+            for label, outcome in outcomes
+        ]
+        if out_of_time:
+            instruction = (
+                "The time budget for this request is used up. Using only these results, write the "
+                "final answer now and say briefly which searches did not finish. Do not call any tools."
+            )
+        else:
+            instruction = "Using these results, write the final answer now. Do not call any tools."
+        return (
+            prompt
+            + "\n\n## TOOL RESULTS (already executed for this request)\n\n"
+            + "\n\n".join(sections or ["No tools were needed." if not out_of_time else "No tool finished in time."])
+            + "\n\n"
+            + instruction
+        )
+
+    def _build_deadline_fallback(self, outcomes: list[tuple[str, ToolOutcome]]) -> str:
+        """Answer without the model when even the synthesis turn ran out of time."""
+        finished = [outcome for _, outcome in outcomes if not outcome.error]
+        if not finished:
+            return "Sorry, I ran out of time before any search finished. Please try again or narrow the request."
+        sections = [f"### {outcome.name}\n{outcome.result[:1500]}" for outcome in finished]
+        return "I ran out of time before I could write a full answer. Raw results so far:\n\n" + "\n\n".join(sections)
+
+    async def _send_message(self, chat: Any, content: Any, **send_kwargs: Any) -> Any:
+        async with self.limiter.slot():
+            return await chat.send_message_async(content, **send_kwargs)
+
+    async def _generate(self, model: Any, contents: Any, span_name: str = "llm_generate") -> Any:
+        with span(span_name, model=getattr(model, "model_name", self.model_id)):
+            async with self.limiter.slot():
+                return await model.generate_content_async(contents)
+
+    async def _send_message_stream(self, chat: Any, content: Any, **send_kwargs: Any) -> AsyncIterator[Any]:
+        """Stream one chat turn through the SDK's async API.
+
+        Yields response chunks as Gemini produces them, followed by a
+        ``_StreamDone`` wrapping the fully aggregated response. The
+        concurrency slot is held until the stream is exhausted.
+        """
+        async with self.limiter.slot():
+            response = await chat.send_message_async(content, stream=True, **send_kwargs)
+            async for chunk in response:
+                yield chunk
+        yield _StreamDone(response)
+
+    async def _run_tool_call(self, func_name: str, func_args: dict[str, Any], tool_map: Mapping[str, Any], timeout: float | None = None) -> ToolOutcome:
+        """Execute a single tool call with a timeout (default: ``tool_timeout_seconds``).
+
+        Errors are captured into the result string so one failing provider
+        never aborts the other calls of the same turn.
+        """
+        with span(f"tool:{func_name}", provider=TOOL_PROVIDERS.get(func_name, "local")) as tool_span:
+            outcome = await self._execute_tool_call(func_name, func_args, tool_map, timeout)
+            if not outcome.error:
+                status = "ok"
+            elif outcome.trace[-1].startswith("Timeout"):
+                status = "timeout"
+            else:
+                status = "error"
+            tool_span.set(status=status, bytes=len(outcome.result.encode()), items=outcome.item_count)
+            return outcome
+
+    async def _execute_tool_call(self, func_name: str, func_args: dict[str, Any], tool_map: Mapping[str, Any], timeout: float | None) -> ToolOutcome:
+        call_trace = [f"Called: {func_name}({func_args})"]
+        logger.info(f"TOOL CALL: {func_name}", extra={"event": "tool_call", "tool": func_name, "tool_args": func_args})
+
+        if func_name not in tool_map:
+            call_trace.append(f"Unknown: {func_name}")
+            return ToolOutcome(func_name, func_args, f"Unknown function: {func_name}", call_trace, 0.0, error=True)
+
+        timeout = self._tool_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                tool_map[func_name](**func_args), timeout=timeout
+            )
+            result_str = str(result)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"TOOL TIMEOUT: {func_name} after {timeout:.1f}s",
+                extra={"event": "tool_result", "tool": func_name, "status": "timeout"},
+            )
+            call_trace.append(f"Timeout: {func_name} after {timeout:.1f}s")
+            result_str = f"Error calling {func_name}: timed out after {timeout:.1f}s"
+            return ToolOutcome(func_name, func_args, result_str, call_trace, (time.perf_counter() - started) * 1000, error=True)
+        except Exception as e:
+            logger.error(
+                f"TOOL ERROR: {func_name}: {e}",
+                extra={"event": "tool_result", "tool": func_name, "status": "error"},
+            )
+            call_trace.append(f"Error: {str(e)}")
+            result_str = f"Error calling {func_name}: {str(e)}"
+            return ToolOutcome(func_name, func_args, result_str, call_trace, (time.perf_counter() - started) * 1000, error=True)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        # Parse result for structured logging
+        is_error = result_str.startswith("Error") or result_str.startswith("No ")
+        line_count = result_str.count("\n---") if "---" in result_str else 0
+
+        # Extract any price mentions
+        prices = re.findall(r'\$[\d,]+(?:\.\d{2})?|\d+\s*(?:USD|EUR|GBP)', result_str)
+        price_summary = f", prices: {prices[:3]}" if prices else ""
+
+        logger.info(
+            f"TOOL RESULT: {func_name} - count={line_count}, error={is_error}, latency={elapsed_ms:.0f}ms{price_summary}",
+            extra={"event": "tool_result", "tool": func_name, "status": "error" if is_error else "ok",
+                   "latency_ms": round(elapsed_ms, 1), "items": line_count, "chars": len(result_str)},
+        )
+        log_payload(logger, f"tool_result {func_name}", result_str, tool=func_name)
+        call_trace.append(f"Result: {line_count} items{price_summary}")
+        return ToolOutcome(func_name, func_args, result_str, call_trace, elapsed_ms, item_count=line_count, error=is_error)
 
     def _build_fallback_summary(
         self, domain: Domain, insights: Iterable[Insight], prompt: str | None
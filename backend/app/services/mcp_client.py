@@ -1,13 +1,44 @@
 """
 Persistent MCP Client - Uses HTTP connection pooling for fast MCP tool calls.
 Replaces slow npx-based mcp-remote with direct httpx client.
+
+Each service gets its own connection pool to mcp.rapidapi.com, so a slow
+provider cannot take the connections another one needs. With HTTP/2 (the
+optional ``h2`` package) concurrent calls to a service share one
+multiplexed connection; idle connections are kept open between bursts and
+one per service is opened at startup.
+
+Read-only tools are retried on timeouts, 5xx and 429 with jittered backoff,
+and a circuit breaker per service fails calls fast while a provider is down.
+Identical concurrent calls (same service, tool and arguments) share one
+upstream request. Requests are paced by the RapidAPI rate limiter shared
+with the mcp_servers tools (one token bucket per API host, learned from the
+x-ratelimit-* response headers); calls queue for budget instead of failing
+with 429.
 """
 import asyncio
+import dataclasses
+import importlib.util
+import json
+import logging
 import os
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 import httpx
 from dataclasses import dataclass
 
+from ..config import get_settings
+from .resilience import CircuitBreaker, RetryPolicy, is_idempotent
+from .timing import span
+from .tool_catalog import get_tool_catalog
+from .tool_registry import ensure_project_root
+
+if TYPE_CHECKING:
+    from mcp_servers.rate_limit import RapidAPIRateLimiter
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 
 @dataclass
 class MCPToolResult:
@@ -15,6 +46,22 @@ class MCPToolResult:
     success: bool
     content: str
     error: Optional[str] = None
+    attempts: int = 1
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection limits for one service's pool."""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 120.0  # seconds an idle connection stays open
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
 
 
 class PersistentMCPClient:
@@ -33,25 +80,108 @@ class PersistentMCPClient:
         "google-flights2": "google-flights2.p.rapidapi.com",
     }
     
-    def __init__(self, rapidapi_key: str | None = None):
+    def __init__(
+        self,
+        rapidapi_key: str | None = None,
+        pools: Dict[str, PoolConfig] | None = None,
+        http2: bool = True,
+        timeout: float = 60.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        retry_policies: Dict[str, RetryPolicy] | None = None,
+        breaker_threshold: int = 5,
+        breaker_reset_seconds: float = 30.0,
+        rate_limiter: "RapidAPIRateLimiter | None" = None,
+    ):
         self._rapidapi_key: str | None = rapidapi_key or os.getenv("RAPIDAPI_KEY", "")
-        self._client: Optional[httpx.AsyncClient] = None
-        self._tool_cache: Dict[str, List[Dict]] = {}
+        self._pools: Dict[str, PoolConfig] = pools or {}
+        self._http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("MCP client: h2 is not installed, using HTTP/1.1")
+        self._timeout = timeout
+        self._transport = transport
+        # One client (connection pool) per service, created on first use
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._client_lock = asyncio.Lock()
+        self._retry_policies: Dict[str, RetryPolicy] = retry_policies or {}
+        self._breakers = {
+            service: CircuitBreaker(service, breaker_threshold, breaker_reset_seconds)
+            for service in self.API_HOSTS
+        }
+        self._retries: Dict[str, int] = dict.fromkeys(self.API_HOSTS, 0)
+        # Single-flight: in-progress calls by (service, tool, canonical args)
+        self._in_flight: Dict[tuple[str, str, str], asyncio.Future] = {}
+        self._calls: Dict[str, int] = dict.fromkeys(self.API_HOSTS, 0)
+        self._coalesced: Dict[str, int] = dict.fromkeys(self.API_HOSTS, 0)
+        self._rate_limiter = rate_limiter or get_rate_limiter()
     
-    async def _get_client(self) -> httpx.AsyncClient:
-        """Get or create persistent HTTP client"""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                timeout=60.0,
-                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    async def _get_client(self, service: str) -> httpx.AsyncClient:
+        """Get or create the persistent HTTP client for a service"""
+        client = self._clients.get(service)
+        if client is not None and not client.is_closed:
+            return client
+        async with self._client_lock:
+            client = self._clients.get(service)
+            if client is None or client.is_closed:
+                pool = self._pools.get(service, PoolConfig())
+                client = self._rate_limiter.install(httpx.AsyncClient(
+                    http2=self._http2,
+                    timeout=httpx.Timeout(self._timeout, connect=10.0),
+                    limits=pool.limits(),
+                    transport=self._transport,
+                ))
+                self._clients[service] = client
+            return client
+
+    async def warm_up(self, connections: int = 1) -> None:
+        """Open connections to every service's pool ahead of the first call.
+
+        Args:
+            connections: Concurrent requests per service; with HTTP/2 they
+                share a single multiplexed connection
+        """
+        async def warm(service: str) -> None:
+            client = await self._get_client(service)
+            results = await asyncio.gather(
+                *(client.head(self.MCP_BASE_URL) for _ in range(connections)),
+                return_exceptions=True,
             )
-        return self._client
+            failed = [r for r in results if isinstance(r, Exception)]
+            if failed:
+                logger.warning(f"MCP warmup for {service} failed: {failed[0]}")
+
+        await asyncio.gather(*(warm(service) for service in self.API_HOSTS))
+
+    def stats(self) -> Dict[str, Any]:
+        """Transport settings, per-service pool limits and remaining RapidAPI budget."""
+        limits = self._rate_limiter.stats()["hosts"]
+        services = {}
+        for service, api_host in self.API_HOSTS.items():
+            pool = self._pools.get(service, PoolConfig())
+            client = self._clients.get(service)
+            services[service] = {
+                "max_connections": pool.max_connections,
+                "max_keepalive_connections": pool.max_keepalive_connections,
+                "keepalive_expiry": pool.keepalive_expiry,
+                "open": client is not None and not client.is_closed,
+                "retries": self._retries[service],
+                "calls": self._calls[service],
+                "coalesced": self._coalesced[service],
+                "breaker": self._breakers[service].stats(),
+                "rate_limit": limits.get(api_host),
+            }
+        return {
+            "http2": self._http2,
+            "in_flight": len(self._in_flight),
+            "calls_saved": sum(self._coalesced.values()),
+            "services": services,
+        }
     
     async def close(self):
-        """Close the HTTP client"""
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
-            self._client = None
+        """Close every service's HTTP client"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            if not client.is_closed:
+                await client.aclose()
     
     def _get_headers(self, api_host: str) -> Dict[str, str]:
         """Get headers for RapidAPI MCP request"""
@@ -61,25 +191,18 @@ class PersistentMCPClient:
             "x-api-host": api_host,
         }
     
-    async def list_tools(self, service: str) -> List[Dict]:
+    async def fetch_tools(self, service: str) -> List[Dict]:
         """
-        List available tools for a service.
-        
-        Args:
-            service: One of 'flights-sky', 'booking', 'google-flights2'
-        
-        Returns:
-            List of tool definitions with name, description, inputSchema
+        Fetch a service's tool definitions from the MCP gateway (uncached).
+
+        The tool catalog's fetcher for RapidAPI servers; callers want
+        ``list_tools``.
         """
-        if service in self._tool_cache:
-            return self._tool_cache[service]
-        
         api_host = self.API_HOSTS.get(service)
         if not api_host:
             return []
-        
-        client = await self._get_client()
-        
+
+        client = await self._get_client(service)
         try:
             response = await client.post(
                 f"{self.MCP_BASE_URL}/tools/list",
@@ -87,23 +210,37 @@ class PersistentMCPClient:
                 json={}
             )
             response.raise_for_status()
-            data = response.json()
-            
-            tools = data.get("tools", [])
-            self._tool_cache[service] = tools
-            return tools
-            
+            return response.json().get("tools", [])
         except (httpx.RequestError, httpx.HTTPStatusError) as e:
-            print(f"Error listing tools for {service}: {e}")
+            logger.warning(f"Error listing tools for {service}: {e}")
             return []
-        except Exception:
-            raise
+
+    async def list_tools(self, service: str) -> List[Dict]:
+        """
+        List available tools for a service.
+
+        Served from the tool catalog, which caches schemas with a TTL and a
+        disk snapshot.
+        
+        Args:
+            service: One of 'flights-sky', 'booking', 'google-flights2'
+        
+        Returns:
+            List of tool definitions with name, description, inputSchema
+        """
+        catalog = get_tool_catalog()
+        server = catalog.server_for_service(service)
+        entry = await catalog.get(server) if server else None
+        if entry is None:
+            return []
+        return [tool.model_dump(include={"name", "description", "inputSchema"}) for tool in entry.tools]
     
     async def call_tool(
         self, 
         service: str, 
         tool_name: str, 
-        arguments: Dict[str, Any]
+        arguments: Dict[str, Any],
+        idempotent: bool | None = None,
     ) -> MCPToolResult:
         """
         Call an MCP tool on a remote service.
@@ -112,10 +249,58 @@ class PersistentMCPClient:
             service: One of 'flights-sky', 'booking', 'google-flights2'
             tool_name: Name of the tool to call
             arguments: Tool arguments as a dictionary
+            idempotent: Whether failed calls may be retried; by default
+                read-only tool names (search*, get*, list*, ...) are
         
         Returns:
             MCPToolResult with success status and content
         """
+        if idempotent is None:
+            idempotent = is_idempotent(tool_name)
+        with span(f"mcp:{service}/{tool_name}", provider=service) as call_span:
+            known = service in self.API_HOSTS
+            if known:
+                self._calls[service] += 1
+            if not (idempotent and known):
+                result = await self._call_tool(service, tool_name, arguments, idempotent)
+            else:
+                result, shared = await self._single_flight(service, tool_name, arguments)
+                if shared:
+                    call_span.set(coalesced=True)
+            call_span.set(
+                status="ok" if result.success else "error",
+                bytes=len(result.content.encode()),
+                attempts=result.attempts,
+            )
+            return result
+
+    async def _single_flight(
+        self,
+        service: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+    ) -> tuple[MCPToolResult, bool]:
+        """Join an identical in-progress call or start one; True when joined."""
+        key = (service, tool_name, canonical_arguments(arguments))
+        flight = self._in_flight.get(key)
+        shared = flight is not None
+        if shared:
+            self._coalesced[service] += 1
+        else:
+            flight = asyncio.ensure_future(self._call_tool(service, tool_name, arguments, True))
+            self._in_flight[key] = flight
+            flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded: a caller that times out must not cancel the call for the others
+        result = await asyncio.shield(flight)
+        return dataclasses.replace(result), shared
+
+    async def _call_tool(
+        self,
+        service: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        idempotent: bool | None = None,
+    ) -> MCPToolResult:
         api_host = self.API_HOSTS.get(service)
         if not api_host:
             return MCPToolResult(
@@ -123,8 +308,48 @@ class PersistentMCPClient:
                 content="",
                 error=f"Unknown service: {service}"
             )
-        
-        client = await self._get_client()
+
+        breaker = self._breakers[service]
+        policy = self._retry_policies.get(service, RetryPolicy())
+        if idempotent is None:
+            idempotent = is_idempotent(tool_name)
+        max_attempts = policy.max_attempts if idempotent else 1
+
+        attempt = 0
+        result: MCPToolResult | None = None
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                return result or MCPToolResult(
+                    success=False,
+                    content="",
+                    error=f"{service} is unavailable (circuit open, retrying in {breaker.retry_in():.0f}s)",
+                    attempts=0,
+                )
+            result, retry_after = await self._attempt(service, api_host, tool_name, arguments, breaker, policy)
+            result.attempts = attempt
+            if result.success or retry_after is None or attempt >= max_attempts:
+                return result
+            self._retries[service] += 1
+            delay = policy.delay(attempt, retry_after or None)
+            logger.info(
+                f"Retrying {service}/{tool_name} in {delay:.2f}s after: {result.error}",
+                extra={"event": "mcp_retry", "service": service, "tool": tool_name, "attempt": attempt},
+            )
+            await asyncio.sleep(delay)
+
+    async def _attempt(
+        self,
+        service: str,
+        api_host: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        breaker: CircuitBreaker,
+        policy: RetryPolicy,
+    ) -> tuple[MCPToolResult, float | None]:
+        """One request. The float is None when the failure is not retryable,
+        else the server's Retry-After in seconds (0 when it sent none)."""
+        client = await self._get_client(service)
         
         try:
             response = await client.post(
@@ -135,6 +360,21 @@ class PersistentMCPClient:
                     "arguments": arguments
                 }
             )
+        except _rate_limit_exceeded() as e:
+            # Already queued for the longest allowed wait; the provider is fine
+            return MCPToolResult(success=False, content="", error=str(e)), None
+        except httpx.TransportError as e:
+            # Timeouts, refused and reset connections: the provider is struggling
+            breaker.record_failure()
+            return MCPToolResult(success=False, content="", error=f"{type(e).__name__}: {e}"), 0.0
+
+        # 4xx (including 429 quota errors) means the service is up
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        try:
             response.raise_for_status()
             data = response.json()
             
@@ -149,31 +389,115 @@ class PersistentMCPClient:
             return MCPToolResult(
                 success=True,
                 content="\n".join(content_parts) if content_parts else str(data)
-            )
+            ), None
             
         except httpx.HTTPStatusError as e:
+            retry_after = None
+            if e.response.status_code in policy.retry_statuses:
+                retry_after = _retry_after_seconds(e.response)
             return MCPToolResult(
                 success=False,
                 content="",
                 error=f"HTTP {e.response.status_code}: {e.response.text[:200]}"
-            )
+            ), retry_after
         except Exception as e:
             return MCPToolResult(
                 success=False,
                 content="",
                 error=str(e)
-            )
+            ), None
+
+
+def canonical_arguments(arguments: Dict[str, Any]) -> str:
+    """Order-independent form of tool arguments, for the single-flight key."""
+    return json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _retry_after_seconds(response: httpx.Response) -> float:
+    """Retry-After in seconds, 0 when absent or not a number of seconds."""
+    try:
+        return max(0.0, float(response.headers.get("retry-after", 0)))
+    except ValueError:
+        return 0.0
 
 
 # Singleton instance for connection reuse
 _mcp_client: Optional[PersistentMCPClient] = None
 
 
+def pool_configs(settings: Any) -> Dict[str, PoolConfig]:
+    """Per-service pool limits: a service setting overrides the all-services one."""
+    pools = {}
+    for service in PersistentMCPClient.API_HOSTS:
+        max_connections = (
+            getattr(settings, f"mcp_max_connections_{service.replace('-', '_')}")
+            or settings.mcp_max_connections
+        )
+        pools[service] = PoolConfig(
+            max_connections=max_connections,
+            max_keepalive_connections=min(settings.mcp_max_keepalive_connections, max_connections),
+            keepalive_expiry=settings.mcp_keepalive_expiry_seconds,
+        )
+    return pools
+
+
+def retry_policies(settings: Any) -> Dict[str, RetryPolicy]:
+    """Per-service retry policies: a service setting overrides the all-services one."""
+    return {
+        service: RetryPolicy(
+            max_attempts=(
+                getattr(settings, f"mcp_retry_attempts_{service.replace('-', '_')}")
+                or settings.mcp_retry_attempts
+            ),
+            base_delay=settings.mcp_retry_base_delay_seconds,
+            max_delay=settings.mcp_retry_max_delay_seconds,
+        )
+        for service in PersistentMCPClient.API_HOSTS
+    }
+
+
+def get_rate_limiter() -> "RapidAPIRateLimiter":
+    """The RapidAPI limiter shared with the mcp_servers tools, imported on first use."""
+    ensure_project_root()
+    from mcp_servers.rate_limit import get_rate_limiter as shared_rate_limiter
+
+    return shared_rate_limiter()
+
+
+def _rate_limit_exceeded() -> type[Exception]:
+    ensure_project_root()
+    from mcp_servers.rate_limit import RateLimitExceeded
+
+    return RateLimitExceeded
+
+
+def configure_rate_limiter(settings: Any) -> "RapidAPIRateLimiter":
+    """Apply the RapidAPI rate limit settings to the process-wide limiter."""
+    limiter = get_rate_limiter()
+    limiter.configure(
+        rate=settings.rapidapi_rate_per_second,
+        burst=settings.rapidapi_burst,
+        max_wait=settings.rapidapi_max_wait_seconds,
+        quota_cooldown=settings.rapidapi_quota_cooldown_seconds,
+    )
+    return limiter
+
+
 def get_mcp_client() -> PersistentMCPClient:
     """Get singleton MCP client instance"""
     global _mcp_client
     if _mcp_client is None:
-        _mcp_client = PersistentMCPClient()
+        settings = get_settings()
+        _mcp_client = PersistentMCPClient(
+            settings.rapidapi_key,
+            pools=pool_configs(settings),
+            http2=settings.mcp_http2,
+            timeout=settings.mcp_timeout_seconds,
+            retry_policies=retry_policies(settings),
+            breaker_threshold=settings.mcp_breaker_failure_threshold,
+            breaker_reset_seconds=settings.mcp_breaker_reset_seconds,
+            rate_limiter=configure_rate_limiter(settings),
+        )
     return _mcp_client
 
 
@@ -0,0 +1,157 @@
+"""
+Speculative tool prefetch from a structured travel_intent.
+
+When the request already names origin, destination and dates, the flight
+searches the model is going to ask for are obvious. They are started in
+parallel with the first Gemini call; if the model then requests the same tool
+with matching arguments it gets the in-flight (or finished) task instead of a
+new provider call.
+"""
+from __future__ import annotations
+
+import asyncio
+import calendar
+import inspect
+import json
+import logging
+from typing import Any, Callable, Coroutine, Mapping
+
+logger = logging.getLogger(__name__)
+
+# Frontend cabin classes (Kiwi naming) -> Skyscanner naming
+SKY_CABIN_CLASSES = {
+    "ECONOMY": "economy",
+    "ECONOMY_PREMIUM": "premium_economy",
+    "BUSINESS": "business",
+    "FIRST_CLASS": "first",
+}
+
+
+def _month_bounds(month: str) -> tuple[str, str] | None:
+    try:
+        year, month_number = (int(part) for part in month.split("-")[:2])
+        last_day = calendar.monthrange(year, month_number)[1]
+    except (ValueError, calendar.IllegalMonthError):
+        return None
+    return f"{year:04d}-{month_number:02d}-01", f"{year:04d}-{month_number:02d}-{last_day:02d}"
+
+
+def flight_calls_from_intent(intent: Mapping[str, Any] | None) -> list[tuple[str, dict[str, Any]]]:
+    """Tool calls (Kiwi and Skyscanner) fully determined by a travel intent.
+
+    Returns an empty list unless the intent names a flight route and a date.
+    """
+    if not intent or intent.get("transportMode", "all") not in ("all", "flights"):
+        return []
+    origin = (intent.get("from") or "").strip()
+    destination = (intent.get("to") or "").strip()
+    if not origin or not destination:
+        return []
+
+    depart = intent.get("departDate") or intent.get("windowStart")
+    depart_until = intent.get("windowEnd")
+    whole_month = intent.get("wholeMonth") if intent.get("tripType") == "whole-month" else None
+    if whole_month and not depart:
+        bounds = _month_bounds(whole_month)
+        if bounds:
+            depart, depart_until = bounds
+    if not depart:
+        return []
+
+    cabin_class = intent.get("cabinClass") or "ECONOMY"
+    max_stops = intent.get("maxStops")
+    adults = int(intent.get("adults") or 1)
+    return_date = intent.get("returnDate") or intent.get("returnWindowStart")
+
+    kiwi = {
+        "from_location": origin,
+        "to_location": destination,
+        "date_from": depart,
+        "date_to": depart_until,
+        "return_from": return_date,
+        "return_to": intent.get("returnWindowEnd"),
+        "cabin_class": cabin_class,
+        "max_stops": max_stops,
+        "adults": adults,
+        "children": int(intent.get("children") or 0),
+        "infants": int(intent.get("infants") or 0),
+    }
+    sky = {
+        "from_location": origin,
+        "to_location": destination,
+        "date": None if whole_month else depart,
+        "whole_month": whole_month,
+        "return_date": return_date,
+        "cabin_class": SKY_CABIN_CLASSES.get(cabin_class, "economy"),
+        "adults": adults,
+        "max_stops": max_stops,
+    }
+    return [
+        ("search_flights", {k: v for k, v in kiwi.items() if v is not None}),
+        ("search_flights_sky", {k: v for k, v in sky.items() if v is not None}),
+    ]
+
+
+def _canonical_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip().upper()
+    if isinstance(value, float) and value.is_integer():
+        # Gemini sends every number as a float
+        return int(value)
+    return value
+
+
+def canonical_call(func: Callable[..., Any], args: Mapping[str, Any]) -> str | None:
+    """Key for a call with defaults applied, so omitted defaults still match."""
+    try:
+        bound = inspect.signature(func).bind(**args)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    return json.dumps(
+        {name: _canonical_value(value) for name, value in bound.arguments.items()},
+        sort_keys=True, default=str,
+    )
+
+
+class ToolPrefetcher:
+    """Speculatively started tool calls for one agent request."""
+
+    def __init__(self) -> None:
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+        self.used = 0
+
+    def start(
+        self,
+        name: str,
+        args: dict[str, Any],
+        tool_map: Mapping[str, Callable[..., Any]],
+        run: Callable[[str, dict[str, Any]], Coroutine[Any, Any, Any]],
+    ) -> bool:
+        """Start ``run(name, args)`` in the background unless the tool is unavailable."""
+        func = tool_map.get(name)
+        key = canonical_call(func, args) if func else None
+        if key is None or (name, key) in self._tasks:
+            return False
+        self._tasks[(name, key)] = asyncio.create_task(run(name, args))
+        logger.info(f"PREFETCH: {name}({args})", extra={"event": "prefetch_started", "tool": name})
+        return True
+
+    def claim(self, name: str, args: Mapping[str, Any], tool_map: Mapping[str, Callable[..., Any]]) -> asyncio.Task | None:
+        """Hand over a prefetched task if the model asked for the same call."""
+        if not self._tasks:
+            return None
+        func = tool_map.get(name)
+        key = canonical_call(func, args) if func else None
+        task = self._tasks.pop((name, key), None) if key else None
+        if task is not None:
+            self.used += 1
+        return task
+
+    def cancel_unclaimed(self) -> int:
+        """Cancel prefetches the model never asked for; returns how many."""
+        unclaimed = len(self._tasks)
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        return unclaimed
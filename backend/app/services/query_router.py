@@ -0,0 +1,228 @@
+"""
+Query router - local, CPU-only choice of the tool chain(s) a prompt needs.
+
+Travel and general agents expose 14-30 tools, and every tool declaration is
+sent with every model turn. Most prompts only need one chain ("hotels in
+Lisbon" never calls a flight search), so the router sorts each prompt into
+FLIGHT_SEARCH, ACCOMMODATION, TRANSPORT, PLACES, JOBS or TRENDS and the
+agent binds only that chain's tools for the turn.
+
+Keyword rules decide first; prompts no rule matches go to a small
+multinomial naive Bayes classifier trained on data/router/train.jsonl.
+In travel mode the form (travel_intent) adds the chains it asks for: the
+route by its transport mode and, when enabled, the stay; a prompt that names
+no chain of its own is about the form. Whole-trip requests, more than two
+chains and low-confidence predictions return no chains, and the agent keeps
+its full tool set. A decision takes tens of microseconds.
+
+The training prompts are hand-written, not sampled from traffic, so the
+classifier only gets prompts no rule covers and a conservative confidence
+floor. scripts/benchmark_query_router.py scores it on the held-out
+data/router/eval.jsonl and on prompts from JSON logs (labelled by the tools
+the unrouted agent called); run it against real logs before lowering
+query_router_min_confidence.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+CHAINS = ("FLIGHT_SEARCH", "ACCOMMODATION", "TRANSPORT", "PLACES", "JOBS", "TRENDS")
+
+# Chain -> tool names bound for the turn (names from tool_registry.TOOL_MODULES)
+CHAIN_TOOLS: dict[str, tuple[str, ...]] = {
+    "FLIGHT_SEARCH": ("search_flights", "search_flights_sky", "search_amadeus_flights"),
+    "ACCOMMODATION": ("search_hotels", "search_airbnb", "search_amadeus_hotels", "geocode_address"),
+    "TRANSPORT": (
+        "get_directions", "search_ground_transport", "search_ground_transport_backup", "geocode_address",
+    ),
+    "PLACES": (
+        "search_places", "text_search_places", "search_places_nearby", "geocode_address", "reverse_geocode",
+    ),
+    "JOBS": (
+        "search_jobs", "get_active_jobs", "optimize_resume", "analyze_job_match", "web_search", "scrape_webpage",
+    ),
+    "TRENDS": (
+        "get_youtube_trends", "search_youtube", "get_google_trends", "search_tweets", "get_tiktok_trends",
+        "search_tiktok", "search_instagram", "get_instagram_posts", "search_facebook", "web_search",
+    ),
+}
+
+TRAIN_PATH = Path(__file__).parents[2] / "data" / "router" / "train.jsonl"
+
+# Requests that span several chains; the full profile runs the whole-trip chain
+_FULL_TRIP = re.compile(
+    r"\b(plan(ning)? (a|an|my|our|the)\b|itinerar|trip to|weekend (in|at)|vacation|holiday|getaway|honeymoon)",
+    re.IGNORECASE,
+)
+
+_RULES: dict[str, re.Pattern[str]] = {
+    "FLIGHT_SEARCH": re.compile(
+        r"\b(flights?|fly(ing)?|plane|airfare|airlines?|nonstop|layover|(business|first|premium economy) class"
+        r"|premium economy|round[- ]trip|one[- ]way)\b",
+        re.IGNORECASE,
+    ),
+    "ACCOMMODATION": re.compile(
+        r"\b(hotels?|hostels?|airbnb|apartments?|accommodations?|lodging|guesthouses?|resorts?|villas?|motels?"
+        r"|b&b|(where|place|somewhere) to (stay|sleep)|check[- ]in|nights? (in|at))\b",
+        re.IGNORECASE,
+    ),
+    "TRANSPORT": re.compile(
+        r"\b(directions?|how (do i|to|can i|can we) get|get(ting)? (from|to)|ferry|ferries|trains?|bus(es)?"
+        r"|coach|metro|subway|transit|shuttle|taxi|drive|driving|transfer|car rental|public transport)\b",
+        re.IGNORECASE,
+    ),
+    "PLACES": re.compile(
+        r"\b(restaurants?|things to do|attractions?|museums?|galleries|caf(e|é)s?|coffee|bars?|pubs?|nightlife"
+        r"|sightseeing|landmarks?|what to see|to visit|worth visiting|where to eat|food|markets?|parks?"
+        r"|activities)\b",
+        re.IGNORECASE,
+    ),
+    "JOBS": re.compile(
+        r"\b(jobs?|hiring|resume|résumé|cv|vacanc(y|ies)|positions?|roles?|careers?|internships?|salar(y|ies)"
+        r"|openings|recruit(er|ing)?|job description)\b",
+        re.IGNORECASE,
+    ),
+    "TRENDS": re.compile(
+        r"\b(trend(s|ing)?|viral|tiktok|twitter|tweets?|instagram|youtube|facebook|hashtags?|social media"
+        r"|influencers?|memes?|search interest)\b",
+        re.IGNORECASE,
+    ),
+}
+
+# More chains than this and narrowing would save little; keep the full profile
+MAX_CHAINS = 2
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the in on at to for of from and or me my i we our is are be with this that what which how do can "
+    "any some find show please".split()
+)
+
+
+def features(text: str) -> list[str]:
+    """Unigram and bigram features of a prompt, stopwords dropped."""
+    tokens = [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over prompt features, with Laplace smoothing."""
+
+    def __init__(self, alpha: float = 1.0) -> None:
+        self.alpha = alpha
+        self.labels: tuple[str, ...] = ()
+        self._log_prior: dict[str, float] = {}
+        self._log_likelihood: dict[str, dict[str, float]] = {}
+        self._log_unseen: dict[str, float] = {}
+
+    def fit(self, examples: Iterable[tuple[str, str]]) -> "NaiveBayesClassifier":
+        """Train on (prompt, label) pairs."""
+        counts: dict[str, Counter[str]] = {}
+        documents: Counter[str] = Counter()
+        for prompt, label in examples:
+            counts.setdefault(label, Counter()).update(features(prompt))
+            documents[label] += 1
+        vocabulary = set().union(*counts.values()) if counts else set()
+        total_documents = sum(documents.values())
+        self.labels = tuple(sorted(counts))
+        for label, label_counts in counts.items():
+            denominator = sum(label_counts.values()) + self.alpha * (len(vocabulary) + 1)
+            self._log_prior[label] = math.log(documents[label] / total_documents)
+            self._log_likelihood[label] = {
+                feature: math.log((count + self.alpha) / denominator) for feature, count in label_counts.items()
+            }
+            self._log_unseen[label] = math.log(self.alpha / denominator)
+        return self
+
+    def predict(self, text: str) -> tuple[str | None, float]:
+        """Most likely label and its posterior probability (None for featureless text)."""
+        feats = [f for f in features(text) if any(f in table for table in self._log_likelihood.values())]
+        if not feats or not self.labels:
+            return None, 0.0
+        scores = {}
+        for label in self.labels:
+            table, unseen = self._log_likelihood[label], self._log_unseen[label]
+            scores[label] = self._log_prior[label] + sum(table.get(f, unseen) for f in feats)
+        best = max(scores, key=scores.__getitem__)
+        top = scores[best]
+        return best, 1.0 / sum(math.exp(score - top) for score in scores.values())
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Chains chosen for a prompt; no chains means the agent keeps every tool."""
+    chains: tuple[str, ...]
+    source: str  # rules, classifier, intent, full_trip, broad or uncertain
+    confidence: float = 1.0
+
+    @property
+    def tools(self) -> frozenset[str]:
+        return frozenset(name for chain in self.chains for name in CHAIN_TOOLS[chain])
+
+
+def intent_chains(intent: Mapping[str, Any] | None) -> tuple[str, ...]:
+    """Chains a travel form asks for; an empty form asks for none."""
+    if not intent:
+        return ()
+    wanted = set()
+    if intent.get("from") or intent.get("to"):
+        transport_mode = intent.get("transportMode", "all")
+        if transport_mode in ("all", "flights"):
+            wanted.add("FLIGHT_SEARCH")
+        if transport_mode != "flights":
+            wanted.add("TRANSPORT")
+    if (intent.get("accommodations") or {}).get("enabled"):
+        wanted.add("ACCOMMODATION")
+    return tuple(chain for chain in CHAINS if chain in wanted)
+
+
+class QueryRouter:
+    """Keyword rules first, the classifier for prompts no rule covers, plus the travel form's chains."""
+
+    def __init__(self, classifier: NaiveBayesClassifier, min_confidence: float = 0.6) -> None:
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+
+    def route(self, prompt: str, intent: Mapping[str, Any] | None = None) -> RouteDecision:
+        if _FULL_TRIP.search(prompt):
+            return RouteDecision((), "full_trip")
+        from_form = intent_chains(intent)
+        matched = tuple(chain for chain in CHAINS if _RULES[chain].search(prompt))
+        source, confidence = "rules", 1.0
+        if not matched:
+            label, confidence = self.classifier.predict(prompt)
+            if label is not None and confidence >= self.min_confidence:
+                matched, source = (label,), "classifier"
+            elif from_form:
+                source, confidence = "intent", 1.0
+            else:
+                return RouteDecision((), "uncertain", confidence)
+        chains = tuple(chain for chain in CHAINS if chain in matched or chain in from_form)
+        if len(chains) > MAX_CHAINS:
+            return RouteDecision((), "broad")
+        return RouteDecision(chains, source, confidence)
+
+
+def load_examples(path: Path = TRAIN_PATH) -> list[tuple[str, str]]:
+    """(prompt, chain) pairs from a JSONL file of {"prompt", "chain"} objects."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                examples.append((entry["prompt"], entry["chain"]))
+    return examples
+
+
+def build_query_router(settings: Any) -> QueryRouter | None:
+    """Router configured from Settings, or None when routing is disabled."""
+    if not settings.query_router_enabled:
+        return None
+    classifier = NaiveBayesClassifier().fit(load_examples())
+    return QueryRouter(classifier, min_confidence=settings.query_router_min_confidence)
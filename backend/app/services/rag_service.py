@@ -3,6 +3,8 @@ import httpx
 from typing import List, Dict, Optional
 from supabase import create_client, Client
 
+from .timing import span
+
 class RAGService:
     def __init__(self):
         self.supabase_url = os.getenv("SUPABASE_URL")
@@ -32,16 +34,19 @@ class RAGService:
     async def search(self, query: str, namespace: str, top_k: int = 5) -> List[Dict]:
         """Search for relevant documents in a namespace"""
         try:
-            query_embedding = await self.embed(query)
+            with span("rag_embed", provider="together"):
+                query_embedding = await self.embed(query)
             
-            result = self.supabase.rpc(
-                "search_rag",
-                {
-                    "query_embedding": query_embedding,
-                    "target_namespace": namespace,
-                    "match_count": top_k
-                }
-            ).execute()
+            with span("rag_query", provider="supabase") as query_span:
+                result = self.supabase.rpc(
+                    "search_rag",
+                    {
+                        "query_embedding": query_embedding,
+                        "target_namespace": namespace,
+                        "match_count": top_k
+                    }
+                ).execute()
+                query_span.set(docs=len(result.data or []))
             
             return result.data
         except Exception as e:
@@ -0,0 +1,113 @@
+"""
+Retry policies and circuit breakers for outbound provider calls.
+
+Transient failures (timeouts, 5xx, 429) of read-only tools are retried a
+bounded number of times with full-jitter exponential backoff, so the model
+gets a result instead of an error it would spend a turn on. A per-service
+circuit breaker opens after consecutive failures and fails calls fast until
+a cool-down has passed; then a single probe call decides whether it closes.
+"""
+from __future__ import annotations
+
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# Tool names that only read (search/lookup); anything else is never retried
+_IDEMPOTENT_TOOL = re.compile(r"^(search|get|list|find|lookup|fetch|check|auto)", re.IGNORECASE)
+
+
+def is_idempotent(tool_name: str) -> bool:
+    return bool(_IDEMPOTENT_TOOL.match(tool_name))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff."""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 4.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (1-based).
+
+        A server-provided Retry-After within ``max_delay`` is honoured.
+        """
+        if retry_after is not None and 0 <= retry_after <= self.max_delay:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures -> half-open after ``reset_timeout``."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.total_failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; counts the calls it turns away."""
+        if self.state == "open" and self.retry_in() == 0.0:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        # One probe at a time; a probe that never reported (cancelled by a
+        # caller's timeout) stops blocking after another reset_timeout
+        if self.state == "half_open" and (
+            not self._probe_in_flight or self._clock() - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_in_flight = True
+            self._probe_started = self._clock()
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self._opened_at = self._clock()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_s": round(self.retry_in(), 1),
+            "total_failures": self.total_failures,
+            "short_circuited": self.short_circuited,
+            "times_opened": self.times_opened,
+        }
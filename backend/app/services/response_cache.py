@@ -0,0 +1,265 @@
+"""
+Semantic response cache for the Gemini agent.
+
+Near-identical questions ("cheap flights TLL to HEL next weekend" asked in
+different words) are answered from a previous run instead of a full
+multi-tool Gemini loop. Entries are bucketed by mode, normalized
+travel_intent and the exact slots of the prompt (route in order, dates,
+numbers with their unit such as "2 adults"); only the remaining free text
+is compared by cosine similarity of embeddings, so a reversed route or a
+different date or party size never hits. Entries expire after a per-mode
+TTL (travel prices go stale in minutes, jobs and trends last longer).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Mapping
+
+SparseVector = dict[int, float]
+Embedder = Callable[[str], Awaitable[SparseVector]]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_MONTH = (
+    r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)"
+    r"(?:uary|ruary|ch|il|e|y|ust|tember|t|ober|ember)?\b\.?"
+)
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?\b"
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_MONTH_DAY = re.compile(rf"\b{_MONTH}\s+{_DAY}")
+_DAY_MONTH = re.compile(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH}")
+_MONTH_ONLY = re.compile(rf"\b{_MONTH}")
+_DATE_PATTERNS = [
+    _ISO_DATE,
+    _MONTH_DAY,
+    _DAY_MONTH,
+    _MONTH_ONLY,
+    re.compile(r"\b\d{1,2}[./]\d{1,2}(?:[./]\d{2,4})?\b"),
+    re.compile(
+        r"\b(?:(?:this|next|coming|last)\s+)?(?:today|tonight|tomorrow|weekend|week|month|year|"
+        r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"
+    ),
+]
+_NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+_NUMBER = re.compile(r"(\d+(?:[.,]\d+)?)\s*([a-z]+)?")
+_IATA_PAIR = re.compile(r"\b([a-z]{3})\s*[-–]\s*([a-z]{3})\b")
+# Words that introduce a place: "to" takes both neighbours (origin to destination)
+_PLACE_MARKERS = {"from", "in", "near", "at", "around"}
+_CONNECTORS = _PLACE_MARKERS | {"to", "on", "for", "of", "the", "a"}
+
+
+def _singular(word: str) -> str:
+    """Drop a plural "s": with only a few free-text words left, "flights" vs "flight" weighs a lot."""
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _normalize_date(pattern: re.Pattern, match: re.Match) -> str:
+    if pattern is _ISO_DATE:
+        return "-".join(f"{int(part):02d}" for part in match.groups())
+    if pattern is _MONTH_DAY:
+        return f"{match.group(1)} {int(match.group(2))}"
+    if pattern is _DAY_MONTH:
+        return f"{match.group(2)} {int(match.group(1))}"
+    if pattern is _MONTH_ONLY:
+        return match.group(1)
+    return " ".join(match.group(0).split())
+
+
+def prompt_slots(prompt: str) -> tuple[str, str]:
+    """Split a prompt into an exact slot signature and the free text around it.
+
+    The signature holds the route words in order, the dates and the numbers
+    with the word after them; the free text is what is left, for embedding.
+    """
+    text = f" {prompt.lower()} ".replace("→", " to ").replace("->", " to ")
+
+    dates = []
+    for pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            dates.append((match.start(), _normalize_date(pattern, match)))
+        text = pattern.sub(" ", text)
+    dates.sort()
+
+    text = _IATA_PAIR.sub(r"\1 to \2", text)
+    text = " ".join(_NUMBER_WORDS.get(word, word) for word in text.split())
+    numbers = sorted(
+        f"{amount.replace(',', '.')} {unit or ''}".strip() for amount, unit in _NUMBER.findall(text)
+    )
+    text = _NUMBER.sub(" ", text)
+
+    tokens = _TOKEN_PATTERN.findall(text)
+    route: list[str] = []
+    for index, token in enumerate(tokens):
+        neighbours = []
+        if token == "to" and 0 < index < len(tokens) - 1:
+            neighbours = [tokens[index - 1], tokens[index + 1]]
+        elif token in _PLACE_MARKERS and index < len(tokens) - 1:
+            neighbours = [tokens[index + 1]]
+        route.extend(word for word in neighbours if word not in route and word not in _CONNECTORS)
+
+    free_text = " ".join(
+        _singular(token) for token in tokens if token not in route and token not in _CONNECTORS
+    )
+    signature = json.dumps({"route": route, "dates": [date for _, date in dates], "numbers": numbers})
+    return signature, free_text
+
+
+class HashingEmbedder:
+    """Local, dependency-free embedding: hashed word and character-trigram features.
+
+    Runs in microseconds, so a cache lookup never waits on a network call.
+    """
+
+    def __init__(self, dim: int = 1024) -> None:
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.dim
+
+    async def __call__(self, text: str) -> SparseVector:
+        vector: SparseVector = {}
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            features = [f"w:{token}"]
+            padded = f"#{token}#"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+            for feature in features:
+                index = self._bucket(feature)
+                vector[index] = vector.get(index, 0.0) + (2.0 if feature.startswith("w:") else 1.0)
+        return _normalize(vector)
+
+
+def dense_embedder(embed: Callable[[str], Awaitable[list[float]]]) -> Embedder:
+    """Adapt a remote dense embedder (e.g. RAGService.embed) to the cache's format."""
+    async def wrapped(text: str) -> SparseVector:
+        return _normalize({i: value for i, value in enumerate(await embed(text)) if value})
+    return wrapped
+
+
+def _normalize(vector: SparseVector) -> SparseVector:
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {i: value / norm for i, value in vector.items()} if norm else vector
+
+
+def cosine(a: SparseVector, b: SparseVector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(i, 0.0) for i, value in a.items())
+
+
+def normalize_intent(travel_intent: Mapping[str, Any] | None) -> str:
+    """Canonical, order-independent form of a structured travel intent."""
+    if not travel_intent:
+        return ""
+
+    def clean(value: Any) -> Any:
+        if isinstance(value, str):
+            return value.strip().lower()
+        if isinstance(value, Mapping):
+            return {str(k): clean(v) for k, v in value.items() if v not in (None, "", [], {})}
+        if isinstance(value, (list, tuple)):
+            return [clean(item) for item in value]
+        return value
+
+    return json.dumps(clean(travel_intent), sort_keys=True, default=str)
+
+
+@dataclass
+class CacheEntry:
+    prompt: str
+    vector: SparseVector
+    value: Any
+    expires_at: float
+
+
+@dataclass
+class CacheHit:
+    value: Any
+    similarity: float
+    prompt: str
+
+
+class SemanticResponseCache:
+    """In-process semantic cache with per-mode TTLs and a global entry cap."""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        threshold: float,
+        ttl_by_mode: Mapping[str, float],
+        max_entries: int = 1000,
+        default_ttl: float = 600.0,
+    ) -> None:
+        self._embedder = embedder
+        self.threshold = threshold
+        self._ttl_by_mode = dict(ttl_by_mode)
+        self._default_ttl = default_ttl
+        self._max_entries = max_entries
+        # (mode, intent, prompt slots) -> entries; insertion-ordered for oldest-first eviction
+        self._buckets: OrderedDict[tuple[str, str, str], list[CacheEntry]] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, mode: str) -> float:
+        return self._ttl_by_mode.get(mode, self._default_ttl)
+
+    async def lookup(self, mode: str, prompt: str, travel_intent: Mapping[str, Any] | None = None) -> CacheHit | None:
+        slots, free_text = prompt_slots(prompt)
+        key = (mode, normalize_intent(travel_intent), slots)
+        entries = self._buckets.get(key)
+        if not entries or self.ttl_for(mode) <= 0:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        live = [entry for entry in entries if entry.expires_at > now]
+        self._size -= len(entries) - len(live)
+        if live:
+            self._buckets[key] = live
+        else:
+            del self._buckets[key]
+            self.misses += 1
+            return None
+
+        vector = await self._embedder(free_text)
+        # Prompts that are all slots (no free text) match on the slots alone
+        similarity, best = max(
+            ((cosine(vector, entry.vector) if vector or entry.vector else 1.0, entry) for entry in live),
+            key=lambda scored: scored[0],
+        )
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CacheHit(value=best.value, similarity=similarity, prompt=best.prompt)
+
+    async def store(self, mode: str, prompt: str, value: Any, travel_intent: Mapping[str, Any] | None = None) -> None:
+        ttl = self.ttl_for(mode)
+        if ttl <= 0:
+            return
+        slots, free_text = prompt_slots(prompt)
+        key = (mode, normalize_intent(travel_intent), slots)
+        entry = CacheEntry(prompt, await self._embedder(free_text), value, time.monotonic() + ttl)
+        self._buckets.setdefault(key, []).append(entry)
+        self._buckets.move_to_end(key)
+        self._size += 1
+        while self._size > self._max_entries and self._buckets:
+            oldest_key = next(iter(self._buckets))
+            bucket = self._buckets[oldest_key]
+            bucket.pop(0)
+            self._size -= 1
+            if not bucket:
+                del self._buckets[oldest_key]
+
+    def stats(self) -> dict[str, Any]:
+        return {"entries": self._size, "hits": self.hits, "misses": self.misses, "threshold": self.threshold}
@@ -3,17 +3,38 @@ Sandbox LLM Service - LangChain-based agent with RAG + Remote MCP tools
 Uses persistent HTTP MCP client for fast tool calls.
 LangChain 1.x API with bind_tools() pattern.
 """
+import asyncio
+import logging
 import os
 import time
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from dataclasses import dataclass
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 
+from ..config import get_settings
+from ..logging_setup import request_id_var
+from .agent_profiles import DEFAULT_MODE, PROFILE_SPECS, ModelRoute, model_route
+from .history import SUMMARY_PREFIX, ChatTurn, HistoryCompressor, history_budgets, summarization_prompt
 from .mcp_client import get_mcp_client, PersistentMCPClient
 from .rag_service import RAGService
+from .timing import span, start_span
+
+logger = logging.getLogger(__name__)
+
+# Sandbox tool -> RapidAPI MCP service it calls
+TOOL_SERVICES = {
+    "search_flights_sky": "flights-sky",
+    "search_google_flights": "google-flights2",
+    "search_booking_hotels": "booking",
+}
+
+# Per-tool timeouts (seconds); other tools use settings.tool_timeout_seconds
+TOOL_TIMEOUTS = {
+    "search_booking_hotels": 30.0,
+}
 
 
 @dataclass
@@ -25,6 +46,14 @@ class SandboxResult:
     rag_context: List[Dict]
 
 
+@dataclass
+class SandboxEvent:
+    """Progress event emitted by ``LangChainSandboxService.stream``."""
+    type: str
+    data: Dict[str, Any]
+    result: Optional[SandboxResult] = None
+
+
 class LangChainSandboxService:
     """
     LangChain-based Sandbox service with:
@@ -39,15 +68,7 @@ class LangChainSandboxService:
         self._enabled = bool(gemini_api_key)
         
         # Initialize LangChain Gemini LLM
-        if self._enabled:
-            self.base_llm = ChatGoogleGenerativeAI(
-                model=model_id,
-                google_api_key=gemini_api_key,
-                max_output_tokens=8192,
-                temperature=0.7
-            )
-        else:
-            self.base_llm = None
+        self.base_llm = self._create_llm(model_id) if self._enabled else None
         
         # RAG service for context retrieval
         self.rag_service = RAGService()
@@ -55,14 +76,53 @@ class LangChainSandboxService:
         # MCP client for remote tools
         self.mcp_client = get_mcp_client()
         
-        # LangChain tools
+        # LangChain tools, indexed by name for dispatch
         self._tools = self._create_tools()
+        self._tool_map = {t.name: t for t in self._tools}
         
         # LLM with tools bound
         if self._enabled and self._tools:
             self.llm = self.base_llm.bind_tools(self._tools)
         else:
             self.llm = self.base_llm
+        # Tool-bound LLMs by model id, for tiered routing
+        self._llms = {model_id: self.llm}
+
+        # Per-namespace tool-phase / answer-phase models
+        settings = get_settings()
+        self._routes = {mode: model_route(settings, mode, model_id) for mode in PROFILE_SPECS}
+
+        # Keeps resent history within a token budget per namespace
+        self._tool_timeout = settings.tool_timeout_seconds
+        self._pipelined_rag = settings.sandbox_pipelined_rag
+        self.history = HistoryCompressor(
+            self._summarize_history, history_budgets(settings), keep_turns=settings.history_keep_turns
+        )
+
+    def _create_llm(self, model_id: str) -> ChatGoogleGenerativeAI:
+        return ChatGoogleGenerativeAI(
+            model=model_id,
+            google_api_key=self._api_key,
+            max_output_tokens=8192,
+            temperature=0.7
+        )
+
+    def _route(self, namespace: str) -> ModelRoute:
+        return self._routes.get(namespace, self._routes[DEFAULT_MODE])
+
+    def _llm_for(self, model_id: str) -> Any:
+        """Tool-bound LLM for a model id, created on first use."""
+        llm = self._llms.get(model_id)
+        if llm is None:
+            llm = self._create_llm(model_id)
+            if self._tools:
+                llm = llm.bind_tools(self._tools)
+            self._llms[model_id] = llm
+        return llm
+
+    async def _summarize_history(self, previous: str, turns: List[ChatTurn], max_words: int) -> str:
+        response = await self.base_llm.ainvoke([HumanMessage(content=summarization_prompt(previous, turns, max_words))])
+        return response.content.strip()
     
     def _create_tools(self) -> List:
         """Create LangChain tool functions for MCP integration"""
@@ -156,6 +216,38 @@ class LangChainSandboxService:
         
         return [search_flights_sky, search_google_flights, search_booking_hotels]
     
+    async def _run_tool(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        """Run one tool call with its timeout; failures become error ToolMessages."""
+        tool_name = tool_call.get("name", "")
+        tool_args = tool_call.get("args", {})
+        t = self._tool_map.get(tool_name)
+        if t is None:
+            content = f"Error - Tool not found: {tool_name}"
+        else:
+            timeout = TOOL_TIMEOUTS.get(tool_name, self._tool_timeout)
+            with span(f"tool:{tool_name}", provider=TOOL_SERVICES.get(tool_name)) as tool_span:
+                try:
+                    content = str(await asyncio.wait_for(t.ainvoke(tool_args), timeout=timeout))
+                    tool_span.set(status="ok", bytes=len(content.encode()))
+                except asyncio.TimeoutError:
+                    content = f"Error - {tool_name} timed out after {timeout:.0f}s"
+                    tool_span.set(status="timeout")
+                except Exception as e:
+                    content = f"Error - {e}"
+                    tool_span.set(status="error")
+        return ToolMessage(content=content, tool_call_id=tool_call.get("id") or tool_name, name=tool_name)
+
+    async def _retrieve_rag(self, prompt: str, namespace: str) -> List[Dict]:
+        try:
+            with span("rag", namespace=namespace) as rag_span:
+                rag_results = await self.rag_service.search(prompt, namespace=namespace, top_k=3)
+                rag_span.set(docs=len(rag_results or []))
+            return rag_results if rag_results else []
+        except Exception as e:
+            logger.warning(f"RAG search failed, answering without guidance: {e}",
+                           extra={"event": "rag_error", "namespace": namespace})
+            return []
+
     def _build_system_message(self, namespace: str, rag_context: List[Dict]) -> str:
         """Build system message with RAG context"""
         
@@ -199,105 +291,188 @@ Current namespace: {namespace}
         Returns:
             SandboxResult with response text, latency, and metadata
         """
+        result = None
+        async for event in self.stream(prompt, namespace, history, stream_tokens=False):
+            if event.type == "done":
+                result = event.result
+        return result
+
+    async def stream(
+        self,
+        prompt: str,
+        namespace: str = "travel",
+        history: Optional[List[Dict]] = None,
+        stream_tokens: bool = True,
+    ) -> AsyncIterator[SandboxEvent]:
+        """
+        Run the bind_tools loop, yielding progress events as they happen.
+
+        Emits ``rag_retrieved``, ``tool_call`` (when the model asks for a
+        tool), ``tool_result`` (as each call finishes) and, with
+        ``stream_tokens``, ``token`` events while the model generates via
+        ``astream``. A failure yields an ``error`` event. The last event is
+        always ``done`` and carries the SandboxResult, including
+        ``tools_used`` and ``rag_context``.
+        """
         if not self._enabled:
-            return SandboxResult(
+            yield SandboxEvent("done", {}, result=SandboxResult(
                 text="LLM service not configured",
                 latency_ms=0,
                 model=self.model_id,
                 tools_used=[],
                 rag_context=[]
-            )
+            ))
+            return
         
         start_time = time.time()
         tools_used = []
         
-        # Retrieve RAG context
+        # Retrieve RAG context. Pipelined: retrieval runs alongside the first
+        # model call and its tools, and only guides the turns after it; an
+        # answer given without tools skips it
         rag_context = []
-        try:
-            rag_results = await self.rag_service.search(prompt, namespace=namespace, limit=3)
-            rag_context = rag_results if rag_results else []
-        except Exception as e:
-            print(f"RAG search error: {e}")
-        
-        # Build messages
-        messages = [
-            SystemMessage(content=self._build_system_message(namespace, rag_context))
-        ]
+        rag_task = None
+        if self._pipelined_rag:
+            rag_task = asyncio.create_task(self._retrieve_rag(prompt, namespace))
+        else:
+            rag_context = await self._retrieve_rag(prompt, namespace)
+            yield self._rag_event(rag_context)
         
-        # Add history
+        # Build messages; the summary of older history rides in the system message
+        history_summary = ""
+        history_messages = []
         if history:
-            for msg in history:
-                if msg.get("role") == "user":
-                    messages.append(HumanMessage(content=msg.get("content", "")))
-                elif msg.get("role") == "assistant":
-                    messages.append(AIMessage(content=msg.get("content", "")))
+            compressed = await self.history.compress(history, namespace)
+            if compressed.summary:
+                history_summary = "\n" + SUMMARY_PREFIX + compressed.summary
+            for turn in compressed.turns:
+                if turn.role == "user":
+                    history_messages.append(HumanMessage(content=turn.content))
+                else:
+                    history_messages.append(AIMessage(content=turn.content))
         
-        # Add current prompt
-        messages.append(HumanMessage(content=prompt))
+        messages = [
+            SystemMessage(content=self._build_system_message(namespace, rag_context) + history_summary),
+            *history_messages,
+            HumanMessage(content=prompt),
+        ]
         
+        # Multi-turn tool execution: the first model call plus up to 5
+        # follow-ups; all tool calls of a turn run concurrently. The first
+        # turn picks tools on the tool-phase model; turns that read tool
+        # results run on the answer-phase model
+        MAX_ITERATIONS = 5
+        route = self._route(namespace)
+        turn_model = route.tool_model
+        response = None
+        turn = tool_turns = 0
         try:
-            # Invoke LLM with tools
-            response = await self.llm.ainvoke(messages)
-            
-            # Loop for multi-turn tool execution (max 5 iterations)
-            MAX_ITERATIONS = 5
-            for _ in range(MAX_ITERATIONS):
-                if not (hasattr(response, 'tool_calls') and response.tool_calls):
-                    break
-                    
-                tool_results = []
-                # Execute all tool calls from this turn
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call.get("name", "")
-                    tool_args = tool_call.get("args", {})
-                    tools_used.append(tool_name)
-                    
-                    # Find and execute the tool
-                    tool_found = False
-                    for t in self._tools:
-                        if t.name == tool_name:
-                            try:
-                                result = await t.ainvoke(tool_args)
-                                tool_results.append(f"[{tool_name}]: {result}")
-                            except Exception as e:
-                                tool_results.append(f"[{tool_name}]: Error - {e}")
-                            tool_found = True
-                            break
-                    if not tool_found:
-                        tool_results.append(f"[{tool_name}]: Error - Tool not found")
-                
-                # Append tool results to messages
-                if tool_results:
-                    messages.append(response)
-                    # Use standard string concatenation, not f-string
-                    messages.append(HumanMessage(content="Tool Results:\n" + "\n".join(tool_results)))
-                    
-                    # Get next response from LLM
-                    response = await self.base_llm.ainvoke(messages)
-                    response_text = response.content
-                else:
-                    response_text = response.content
+            while True:
+                turn += 1
+                llm = self._llm_for(turn_model)
+                # start_span rather than span(): the generator yields while it is open
+                turn_span = start_span("llm_turn", turn=turn, model=turn_model)
+                try:
+                    if stream_tokens:
+                        response = None
+                        async for chunk in llm.astream(messages):
+                            response = chunk if response is None else response + chunk
+                            if chunk.text:
+                                yield SandboxEvent("token", {"text": str(chunk.text)})
+                    else:
+                        response = await llm.ainvoke(messages)
+                finally:
+                    turn_span.end()
+
+                tool_calls = getattr(response, "tool_calls", None) or []
+                if rag_task is not None and not tool_calls:
+                    # Answered without tools; parameter guidance is not needed
+                    rag_task.cancel()
+                    rag_task = None
+                if not tool_calls or tool_turns == MAX_ITERATIONS:
                     break
-            
-            # Final response text (if loop finished or no tools called)
-            if not response_text:
-                response_text = response.content
+                tool_turns += 1
+
+                tools_used.extend(tool_call.get("name", "") for tool_call in tool_calls)
+                tasks: Dict[asyncio.Task, int] = {}
+                calls_started = time.time()
+                for index, tool_call in enumerate(tool_calls):
+                    yield SandboxEvent("tool_call", {
+                        "id": tool_call.get("id"),
+                        "name": tool_call.get("name", ""),
+                        "args": tool_call.get("args", {}),
+                    })
+                    tasks[asyncio.create_task(self._run_tool(tool_call))] = index
+
+                # Report each result as it lands; messages keep the call order
+                tool_messages: List[Optional[ToolMessage]] = [None] * len(tool_calls)
+                pending = set(tasks)
+                try:
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            message = task.result()
+                            tool_messages[tasks[task]] = message
+                            yield SandboxEvent("tool_result", {
+                                "id": message.tool_call_id,
+                                "name": message.name,
+                                "latency_ms": round((time.time() - calls_started) * 1000, 1),
+                                "chars": len(message.content),
+                                "error": message.content.startswith("Error"),
+                            })
+                finally:
+                    # Client went away mid-turn: don't leave provider calls running
+                    for task in pending:
+                        task.cancel()
+
+                # Results go back as ToolMessages bound to their tool_call ids
+                messages.append(response)
+                messages.extend(tool_messages)
+                turn_model = route.answer_model
+
+                if rag_task is not None:
+                    # Retrieval overlapped the first turn and its tools; the
+                    # guidance reaches the next turn, which re-plans any call
+                    # whose arguments came back as an error
+                    rag_context = await rag_task
+                    rag_task = None
+                    yield self._rag_event(rag_context)
+                    if rag_context:
+                        messages[0] = SystemMessage(
+                            content=self._build_system_message(namespace, rag_context) + history_summary
+                        )
+
+            response_text = response.content if response is not None else ""
             
         except Exception as e:
-            response_text = f"Error processing request: {str(e)}"
-            print(f"LLM error: {e}")
-            import traceback
-            traceback.print_exc()
+            # Provider errors can carry URLs and keys: they go to the log only
+            request_id = request_id_var.get()
+            response_text = f"Error processing request {request_id}"
+            logger.exception(f"Sandbox agent failed: {e}", extra={"event": "sandbox_error", "namespace": namespace})
+            yield SandboxEvent("error", {
+                "detail": "The agent failed; quote the request id when reporting it",
+                "request_id": request_id,
+            })
+        finally:
+            if rag_task is not None:
+                rag_task.cancel()
         
         latency_ms = (time.time() - start_time) * 1000
         
-        return SandboxResult(
+        yield SandboxEvent("done", {}, result=SandboxResult(
             text=response_text,
             latency_ms=latency_ms,
-            model=self.model_id,
+            model=turn_model,
             tools_used=tools_used,
             rag_context=rag_context
-        )
+        ))
+
+    @staticmethod
+    def _rag_event(rag_context: List[Dict]) -> SandboxEvent:
+        return SandboxEvent("rag_retrieved", {
+            "count": len(rag_context),
+            "titles": [doc.get("title", "Untitled") for doc in rag_context],
+        })
 
 
 # Factory function for dependency injection
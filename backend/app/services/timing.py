@@ -0,0 +1,141 @@
+"""
+Per-request timing tree.
+
+A RequestTimer is activated around one API request; any code running inside
+it (RAG, model turns, tool calls, MCP HTTP calls) records spans without the
+timer being passed around, the same way the request id is propagated. The
+tree is returned in the response, rendered as a ``Server-Timing`` header and
+written to the log.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+# Max entries in the Server-Timing header; the JSON tree is never truncated
+MAX_SERVER_TIMING_ENTRIES = 40
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float
+    duration_ms: float | None = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+    children: list["Span"] = field(default_factory=list)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def end(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+        if self.duration_ms is None:
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        entry: dict[str, Any] = {"name": self.name, "start_ms": self.start_ms, "duration_ms": self.duration_ms}
+        entry.update(self.attrs)
+        if self.children:
+            entry["children"] = [child.to_dict() for child in self.children]
+        return entry
+
+
+_active: ContextVar[tuple["RequestTimer", Span] | None] = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Root of a timing tree for one request."""
+
+    def __init__(self, name: str = "request") -> None:
+        self._origin = time.perf_counter()
+        self.root = Span(name, 0.0)
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self._origin) * 1000, 1)
+
+    @contextmanager
+    def activate(self) -> Iterator["RequestTimer"]:
+        token = _active.set((self, self.root))
+        try:
+            yield self
+        finally:
+            _reset(token)
+            self.root.end()
+
+    def to_dict(self) -> dict[str, Any]:
+        return self.root.to_dict()
+
+    def server_timing(self) -> str:
+        """Flattened spans as a Server-Timing header value."""
+        entries = []
+
+        def walk(span: Span) -> None:
+            if span.duration_ms is not None:
+                details = [str(span.attrs[key]) for key in ("provider", "status") if span.attrs.get(key)]
+                entry = f"{_metric_name(span.name)};dur={span.duration_ms}"
+                if details:
+                    entry += f';desc="{" ".join(details)}"'
+                entries.append(entry)
+            for child in span.children:
+                walk(child)
+
+        walk(self.root)
+        return ", ".join(entries[:MAX_SERVER_TIMING_ENTRIES])
+
+
+def _reset(token: Any) -> None:
+    try:
+        _active.reset(token)
+    except ValueError:
+        # An async generator closed from another context (client disconnect)
+        pass
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def start_span(name: str, **attrs: Any) -> Span:
+    """Open a span under the current one without making it current.
+
+    For code that yields while the span is open (the agent's event
+    generator); call ``end()`` when done. Outside a request timer the span is
+    detached and simply discarded.
+    """
+    active = _active.get()
+    if active is None:
+        return Span(name, 0.0, attrs=dict(attrs))
+    timer, parent = active
+    span = Span(name, timer._offset_ms(), attrs=dict(attrs))
+    parent.children.append(span)
+    return span
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span; nested spans go under it.
+
+    Sets ``status`` to "error" or "cancelled" if the block raises and no
+    status was recorded.
+    """
+    active = _active.get()
+    current = start_span(name, **attrs)
+    token = _active.set((active[0], current)) if active is not None else None
+    try:
+        yield current
+    except asyncio.CancelledError:
+        current.attrs.setdefault("status", "cancelled")
+        raise
+    except BaseException:
+        current.attrs.setdefault("status", "error")
+        raise
+    finally:
+        if token is not None:
+            _reset(token)
+        current.end()
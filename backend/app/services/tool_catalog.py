@@ -0,0 +1,391 @@
+"""
+Tool catalog - cached MCP tool schemas and the forms rendered from them.
+
+Fetching schemas is slow: one request to the RapidAPI MCP gateway for the
+RapidAPI servers (over the PersistentMCPClient's pooled connections), and
+starting the MCP server over stdio for the others, which takes tens of
+seconds. The catalog serves them from memory instead. It is loaded from a
+JSON snapshot on disk at startup (the format scripts/fetch_all_mcp_tools.py
+writes; by default a gitignored cache under data/cache/), refreshed in the
+background once a requested entry is older than the TTL, and written back
+after each refresh. DynamicForms are built once per refresh, so form
+requests take milliseconds.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from pydantic import BaseModel
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ROOT = Path(__file__).parents[2]
+
+
+def get_mcp_servers():
+    """Get MCP server configurations with properly loaded API keys."""
+    settings = get_settings()
+    rapidapi_key = settings.rapidapi_key or ""
+    google_maps_key = settings.google_maps_api_key or ""
+
+    return {
+        "rapidapi-sky": {
+            "command": "npx",
+            "args": ["-y", "mcp-remote", "https://mcp.rapidapi.com",
+                     "--header", "x-api-host: flights-sky.p.rapidapi.com",
+                     "--header", f"x-api-key: {rapidapi_key}"],
+            "category": "travel",
+            "service": "flights-sky",  # PersistentMCPClient service name
+        },
+        "rapidapi-google-flights2": {
+            "command": "npx",
+            "args": ["-y", "mcp-remote", "https://mcp.rapidapi.com",
+                     "--header", "x-api-host: google-flights2.p.rapidapi.com",
+                     "--header", f"x-api-key: {rapidapi_key}"],
+            "category": "travel",
+            "service": "google-flights2",  # PersistentMCPClient service name
+        },
+        "rapidapi-booking": {
+            "command": "npx",
+            "args": ["-y", "mcp-remote", "https://mcp.rapidapi.com",
+                     "--header", "x-api-host: booking-com.p.rapidapi.com",
+                     "--header", f"x-api-key: {rapidapi_key}"],
+            "category": "travel",
+            "service": "booking",  # PersistentMCPClient service name
+        },
+        "google-maps": {
+            "command": "npx",
+            "args": ["-y", "@modelcontextprotocol/server-google-maps"],
+            "env": {"GOOGLE_MAPS_API_KEY": google_maps_key},
+            "category": "travel"
+        }
+    }
+
+class ToolSchema(BaseModel):
+    name: str
+    description: Optional[str] = None
+    inputSchema: Optional[Dict[str, Any]] = None
+    server: str
+    category: str
+
+class FormField(BaseModel):
+    name: str
+    type: str  # text, number, date, select, boolean
+    label: str
+    required: bool = False
+    description: Optional[str] = None
+    default: Optional[Any] = None
+    options: Optional[List[str]] = None  # For select fields
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class DynamicForm(BaseModel):
+    toolName: str
+    serverName: str
+    description: Optional[str] = None
+    fields: List[FormField]
+
+def transform_schema_to_form(tool_name: str, server_name: str, description: str, input_schema: Dict) -> DynamicForm:
+    """Transform MCP input schema to form fields"""
+    fields = []
+    properties = input_schema.get("properties", {})
+    required = input_schema.get("required", [])
+
+    for prop_name, prop_def in properties.items():
+        field_type = "text"  # Default
+        options = None
+
+        # Determine field type from schema
+        json_type = prop_def.get("type", "string")
+
+        if json_type == "number" or json_type == "integer":
+            field_type = "number"
+        elif json_type == "boolean":
+            field_type = "boolean"
+        elif "enum" in prop_def:
+            field_type = "select"
+            options = prop_def["enum"]
+        elif "date" in prop_name.lower():
+            field_type = "date"
+
+        # Create human-readable label
+        label = prop_name.replace("_", " ").replace("-", " ").title()
+
+        field = FormField(
+            name=prop_name,
+            type=field_type,
+            label=label,
+            required=prop_name in required,
+            description=prop_def.get("description"),
+            default=prop_def.get("default"),
+            options=options,
+            min=prop_def.get("minimum"),
+            max=prop_def.get("maximum")
+        )
+        fields.append(field)
+
+    return DynamicForm(
+        toolName=tool_name,
+        serverName=server_name,
+        description=description,
+        fields=fields
+    )
+
+async def fetch_tools_from_server(server_name: str, config: Dict) -> List[ToolSchema]:
+    """Connect to MCP server and fetch tool schemas"""
+    tools = []
+
+    env = {**os.environ}
+    if "env" in config:
+        env.update(config["env"])
+
+    server_params = StdioServerParameters(
+        command=config["command"],
+        args=config["args"],
+        env=env
+    )
+
+    try:
+        async with stdio_client(server_params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                tools_result = await session.list_tools()
+
+                for tool in tools_result.tools:
+                    tools.append(ToolSchema(
+                        name=tool.name,
+                        description=tool.description,
+                        inputSchema=tool.inputSchema,
+                        server=server_name,
+                        category=config.get("category", "other")
+                    ))
+    except Exception as e:
+        logger.warning(f"Error fetching tools from {server_name}: {e}")
+
+    return tools
+
+
+async def fetch_tools(server_name: str, config: Dict) -> List[ToolSchema]:
+    """Fetch a server's tools: over HTTP for RapidAPI services, over stdio otherwise."""
+    service = config.get("service")
+    if not service:
+        return await fetch_tools_from_server(server_name, config)
+    from .mcp_client import get_mcp_client  # mcp_client reads the catalog too
+
+    return [
+        ToolSchema(
+            name=tool["name"],
+            description=tool.get("description"),
+            inputSchema=tool.get("inputSchema"),
+            server=server_name,
+            category=config.get("category", "other"),
+        )
+        for tool in await get_mcp_client().fetch_tools(service)
+    ]
+
+
+def build_form(tool: ToolSchema) -> DynamicForm:
+    """The form for a tool; tools without an input schema get no fields."""
+    if not tool.inputSchema:
+        return DynamicForm(toolName=tool.name, serverName=tool.server, description=tool.description, fields=[])
+    return transform_schema_to_form(tool.name, tool.server, tool.description, tool.inputSchema)
+
+
+@dataclass
+class CatalogEntry:
+    """One server's tools and their precomputed forms."""
+    server: str
+    tools: List[ToolSchema]
+    fetched_at: float  # wall-clock seconds; 0 for snapshots without a timestamp
+    forms: Dict[str, DynamicForm]
+
+    @classmethod
+    def build(cls, server: str, tools: List[ToolSchema], fetched_at: float) -> "CatalogEntry":
+        return cls(server, tools, fetched_at, {tool.name: build_form(tool) for tool in tools})
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        return {
+            "server": self.server,
+            "tools": [tool.model_dump() for tool in self.tools],
+            "count": len(self.tools),
+            "fetched_at": self.fetched_at,
+        }
+
+
+Fetcher = Callable[[str, Dict], Awaitable[List[ToolSchema]]]
+
+
+class ToolCatalog:
+    """Tool schemas per MCP server: snapshot-loaded, TTL-refreshed in the background."""
+
+    def __init__(
+        self,
+        servers: Callable[[], Dict[str, Dict]] = get_mcp_servers,
+        fetch: Fetcher = fetch_tools,
+        snapshot_path: Path | None = None,
+        ttl_seconds: float = 6 * 3600,
+        retry_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._servers = servers
+        self._fetch = fetch
+        self.snapshot_path = snapshot_path
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds  # wait after a failed fetch before trying again
+        self._clock = clock
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._failed_at: Dict[str, float] = {}
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+    def load_snapshot(self) -> int:
+        """Load entries from the snapshot file; returns how many servers it had."""
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return 0
+        try:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Tool catalog snapshot {self.snapshot_path} unreadable: {e}")
+            return 0
+        servers = self._servers()
+        for server, payload in data.items():
+            if server not in servers or not isinstance(payload, dict):
+                continue
+            tools = [ToolSchema(**tool) for tool in payload.get("tools", [])]
+            if tools:
+                self._entries[server] = CatalogEntry.build(server, tools, payload.get("fetched_at", 0.0))
+        logger.info(f"Tool catalog: loaded {len(self._entries)} servers from {self.snapshot_path.name}")
+        return len(self._entries)
+
+    def is_stale(self, server: str) -> bool:
+        entry = self._entries.get(server)
+        return entry is None or self._clock() - entry.fetched_at >= self.ttl_seconds
+
+    def _due(self, server: str) -> bool:
+        """Stale and not inside the back-off window of a failed fetch."""
+        return self.is_stale(server) and self._clock() - self._failed_at.get(server, 0.0) >= self.retry_seconds
+
+    async def get(self, server: str) -> CatalogEntry | None:
+        """Cached entry (a refresh starts in the background once it is stale).
+
+        Only a server that has never been fetched waits for the fetch.
+        """
+        entry = self._entries.get(server)
+        if entry is None:
+            return await self.refresh(server)
+        if self._due(server):
+            self._start_refresh(server)
+        return entry
+
+    def _start_refresh(self, server: str) -> asyncio.Task:
+        task = self._refreshing.get(server)
+        if task is None:
+            task = asyncio.create_task(self._refresh(server))
+            self._refreshing[server] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(server, None))
+        return task
+
+    async def refresh(self, server: str) -> CatalogEntry | None:
+        """Fetch a server's tools now; concurrent refreshes share one fetch."""
+        if server not in self._servers():
+            return None
+        return await asyncio.shield(self._start_refresh(server))
+
+    async def _refresh(self, server: str) -> CatalogEntry | None:
+        started = time.perf_counter()
+        try:
+            tools = await self._fetch(server, self._servers()[server])
+        except Exception as e:
+            logger.warning(f"Tool catalog: fetching {server} failed: {e}")
+            tools = []
+        if not tools:
+            self.failed_refreshes += 1
+            self._failed_at[server] = self._clock()
+            logger.warning(f"Tool catalog: no tools from {server}, keeping the cached copy")
+            return self._entries.get(server)
+        entry = CatalogEntry.build(server, tools, self._clock())
+        self._entries[server] = entry
+        self._failed_at.pop(server, None)
+        self.refreshes += 1
+        logger.info(
+            f"Tool catalog: refreshed {server} ({len(tools)} tools) in {time.perf_counter() - started:.1f}s",
+            extra={"event": "tool_catalog_refresh", "server": server, "tools": len(tools)},
+        )
+        await asyncio.to_thread(self._write_snapshot)
+        return entry
+
+    def _write_snapshot(self) -> None:
+        if self.snapshot_path is None:
+            return
+        data = {server: entry.to_snapshot() for server, entry in sorted(self._entries.items())}
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Tool catalog snapshot write failed: {e}")
+
+    async def run(self, check_interval: float = 60.0) -> None:
+        """Refresh stale servers, one at a time, until cancelled."""
+        while True:
+            for server in self._servers():
+                if self._due(server):
+                    await self.refresh(server)
+            await asyncio.sleep(check_interval)
+
+    def servers(self) -> Dict[str, Dict]:
+        return self._servers()
+
+    def server_for_service(self, service: str) -> str | None:
+        """Catalog server behind a PersistentMCPClient service name."""
+        return next((name for name, config in self._servers().items() if config.get("service") == service), None)
+
+    def entries(self) -> Dict[str, CatalogEntry]:
+        return dict(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "servers": {
+                server: {
+                    "tools": len(entry.tools),
+                    "age_s": round(now - entry.fetched_at, 1) if entry.fetched_at else None,
+                    "stale": self.is_stale(server),
+                }
+                for server, entry in self._entries.items()
+            },
+            "refreshing": sorted(self._refreshing),
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+        }
+
+
+_catalog: ToolCatalog | None = None
+
+
+def get_tool_catalog() -> ToolCatalog:
+    """Process-wide catalog, with its snapshot loaded on first use."""
+    global _catalog
+    if _catalog is None:
+        settings = get_settings()
+        snapshot_path = None
+        if settings.mcp_catalog_path:
+            snapshot_path = Path(settings.mcp_catalog_path)
+            if not snapshot_path.is_absolute():
+                snapshot_path = BACKEND_ROOT / snapshot_path
+        _catalog = ToolCatalog(snapshot_path=snapshot_path, ttl_seconds=settings.mcp_catalog_ttl_seconds)
+        _catalog.load_snapshot()
+    return _catalog
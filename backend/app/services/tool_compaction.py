@@ -0,0 +1,265 @@
+"""
+Tool-result compaction - shrink tool output before it is fed back to Gemini.
+
+Each tool can register a compactor that keeps only what the model needs to
+reason about (price, times, stops, carrier) and swaps long booking/image URLs
+for short link ids like [L3]. The id -> URL table stays server-side in a
+per-request ToolResultStore, which expands the ids in the final answer back
+into the original links.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable
+
+DEFAULT_MAX_CHARS = 6000
+
+LINK_INSTRUCTIONS = (
+    "Links in tool results are shortened to ids like [L3]. "
+    "Cite them exactly as written (e.g. \"Book: [L3]\"); they are expanded to full URLs automatically."
+)
+
+_URL_PATTERN = re.compile(r"https?://[^\s)\]>\"']+")
+_LINK_ID_PATTERN = re.compile(r"\[(L\d+)\]|\((L\d+)\)")
+# A trailing fragment that could still become a link id in the next chunk
+_PARTIAL_LINK_ID = re.compile(r"[\[(]L?\d*$")
+
+Compactor = Callable[[str, "ToolResultStore", int], str]
+
+TOOL_COMPACTORS: dict[str, Compactor] = {}
+
+
+def register_compactor(*tool_names: str) -> Callable[[Compactor], Compactor]:
+    """Register a compactor for one or more tool names."""
+    def decorator(func: Compactor) -> Compactor:
+        for name in tool_names:
+            TOOL_COMPACTORS[name] = func
+        return func
+    return decorator
+
+
+@dataclass
+class ToolResultStore:
+    """Per-request table of shortened links."""
+    max_chars: int = DEFAULT_MAX_CHARS
+    links: dict[str, str] = field(default_factory=dict)
+    _ids_by_url: dict[str, str] = field(default_factory=dict)
+    _stream_tail: str = ""
+
+    def shorten(self, url: str) -> str:
+        link_id = self._ids_by_url.get(url)
+        if link_id is None:
+            link_id = f"L{len(self.links) + 1}"
+            self._ids_by_url[url] = link_id
+            self.links[link_id] = url
+        return f"[{link_id}]"
+
+    def shorten_urls(self, text: str) -> str:
+        return _URL_PATTERN.sub(lambda match: self.shorten(match.group(0)), text)
+
+    def compact(self, tool_name: str, result: str) -> str:
+        """Return the compacted form of a tool result for the model."""
+        compactor = TOOL_COMPACTORS.get(tool_name, compact_default)
+        try:
+            return compactor(result, self, self.max_chars)
+        except Exception:
+            return compact_default(result, self, self.max_chars)
+
+    def expand_links(self, text: str) -> str:
+        """Replace [L3] / (L3) link ids in model output with the original URLs."""
+        def replace(match: re.Match) -> str:
+            link_id = match.group(1) or match.group(2)
+            url = self.links.get(link_id)
+            if url is None:
+                return match.group(0)
+            return url if match.group(1) else f"({url})"
+        return _LINK_ID_PATTERN.sub(replace, text)
+
+    def expand_stream(self, chunk: str) -> str:
+        """Expand link ids in streamed text, holding back a possibly split id."""
+        text = self._stream_tail + chunk
+        partial = _PARTIAL_LINK_ID.search(text)
+        if partial:
+            self._stream_tail = text[partial.start():]
+            text = text[:partial.start()]
+        else:
+            self._stream_tail = ""
+        return self.expand_links(text)
+
+    def flush_stream(self) -> str:
+        text, self._stream_tail = self._stream_tail, ""
+        return self.expand_links(text)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"\n...[truncated {len(text) - max_chars} chars]"
+
+
+def compact_default(result: str, store: ToolResultStore, max_chars: int) -> str:
+    """Generic compaction: drop image lines, shorten URLs, cap the length."""
+    lines = [line for line in result.splitlines() if not line.lstrip().startswith("Image:")]
+    return _truncate(store.shorten_urls("\n".join(lines)), max_chars)
+
+
+_KIWI_SEGMENT = re.compile(r"^(?P<carrier>.+?) (?P<code>\S*): (?P<src>.*?) \((?P<dep>[^)]*)\) -> (?P<dst>.*?) \((?P<arr>[^)]*)\)$")
+
+
+@register_compactor("search_flights")
+def compact_kiwi_flights(result: str, store: ToolResultStore, max_chars: int) -> str:
+    """One line per itinerary: price | duration | stops | carriers + times | link id."""
+    blocks = [block.strip() for block in result.split("\n---") if block.strip()]
+    if not blocks or not any(block.startswith("✈️") or "\n✈️" in block for block in blocks):
+        return compact_default(result, store, max_chars)
+
+    lines = []
+    for block in blocks:
+        header, itinerary = [], None
+        for line in block.splitlines():
+            if line.startswith("✈️"):
+                itinerary = [line.replace("✈️", "").strip()]
+            elif itinerary is None:
+                header.append(line)
+            elif line.startswith("Route:"):
+                segments = []
+                for segment in line[len("Route:"):].split(" | "):
+                    match = _KIWI_SEGMENT.match(segment.strip())
+                    if match:
+                        segments.append(
+                            f"{match['carrier']} {match['code']} {match['src']} {match['dep'][-5:]}"
+                            f"→{match['dst']} {match['arr'][-5:]}".strip()
+                        )
+                    elif segment.strip() and segment.strip() != "N/A":
+                        segments.append(segment.strip())
+                if segments:
+                    itinerary.append(" / ".join(segments))
+            elif line.startswith("Link:"):
+                url = line[len("Link:"):].strip()
+                if url:
+                    itinerary.append(store.shorten(url))
+        lines.extend(line for line in header if line.strip() and not set(line.strip()) <= {"-"})
+        if itinerary:
+            lines.append(" | ".join(itinerary))
+    return _truncate("\n".join(lines), max_chars)
+
+
+_SKY_OFFER = re.compile(
+    r"^✈️ (?P<price>\S+) \| (?P<dep>.*?) -> (?P<arr>.*?) \| (?P<duration>.*?) \| (?P<stops>\d+) stops$"
+)
+MAX_FLIGHT_OFFERS = 8
+
+
+_DATETIME = re.compile(r"^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2})")
+
+
+def _split_datetime(value: str) -> tuple[str | None, str]:
+    """("2025-01-15", "08:00") for "2025-01-15 08:00[:00]"; (None, value) otherwise."""
+    match = _DATETIME.match(value)
+    return (match.group(1), match.group(2)) if match else (None, value)
+
+
+def _days_between(start: str, end: str | None) -> int | str:
+    try:
+        return (date.fromisoformat(end) - date.fromisoformat(start)).days
+    except (TypeError, ValueError):
+        return "?"
+
+
+def _amount(price: str) -> float:
+    try:
+        return float(re.sub(r"[^\d.]", "", price))
+    except ValueError:
+        return float("inf")
+
+
+@register_compactor("search_flights_sky")
+def compact_sky_flights(result: str, store: ToolResultStore, max_chars: int) -> str:
+    """Cheapest distinct offers first, one short line each: price | times | duration | stops."""
+    offers, other = [], []
+    for line in result.splitlines():
+        match = _SKY_OFFER.match(line.strip())
+        if match:
+            offers.append(match)
+        elif line.strip():
+            other.append(line.strip())
+    if not offers:
+        return compact_default(result, store, max_chars)
+
+    # Departures on one day: state the date once and keep only times
+    dates = {_split_datetime(offer["dep"])[0] for offer in offers}
+    day = dates.pop() if len(dates) == 1 else None
+    if day:
+        other.append(f"All departures on {day}")
+
+    lines, seen = [], set()
+    for offer in sorted(offers, key=lambda match: _amount(match["price"])):
+        stops = "direct" if offer["stops"] == "0" else f"{offer['stops']} stop{'s' if offer['stops'] != '1' else ''}"
+        dep, arr = offer["dep"], offer["arr"]
+        if day:
+            dep = _split_datetime(dep)[1]
+            arr_day, arr_time = _split_datetime(arr)
+            arr = arr_time if arr_day == day else f"{arr_time} (+{_days_between(day, arr_day)}d)"
+        duration = offer["duration"].replace(" hr", "h").replace(" min", "m")
+        line = f"{offer['price']} | {dep}→{arr} | {duration} | {stops}"
+        if line not in seen:
+            seen.add(line)
+            lines.append(line)
+    shown = lines[:MAX_FLIGHT_OFFERS]
+    if len(lines) > len(shown):
+        shown.append(f"(+{len(lines) - len(shown)} pricier offers)")
+    return _truncate("\n".join(other + shown), max_chars)
+
+
+def _blocks(result: str) -> list[dict[str, str]]:
+    """``Key: value`` blocks separated by ``---``; a block's first line is kept under ``title``."""
+    blocks = []
+    for chunk in result.split("---"):
+        lines = [line.strip() for line in chunk.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+        block = {"title": lines[0]}
+        for line in lines:
+            key, sep, value = line.partition(": ")
+            if sep:
+                block.setdefault(key, value.strip())
+        blocks.append(block)
+    return blocks
+
+
+@register_compactor("search_hotels")
+def compact_booking_hotels(result: str, store: ToolResultStore, max_chars: int) -> str:
+    """One line per hotel: name | total price for the stay | link id."""
+    hotels = [block for block in _blocks(result) if "Hotel" in block]
+    if not hotels:
+        return compact_default(result, store, max_chars)
+    lines = ["Booking.com prices are totals for the whole stay"]
+    for hotel in hotels:
+        parts = [hotel["Hotel"], hotel.get("Price", "N/A")]
+        if hotel.get("Link"):
+            parts.append(store.shorten(hotel["Link"]))
+        lines.append(" | ".join(parts))
+    return _truncate("\n".join(lines), max_chars)
+
+
+@register_compactor("search_airbnb")
+def compact_airbnb(result: str, store: ToolResultStore, max_chars: int) -> str:
+    """One line per listing: name | nightly price | rating | link id; images dropped."""
+    listings = [block for block in _blocks(result) if block["title"].startswith("🏠")]
+    if not listings:
+        return compact_default(result, store, max_chars)
+    lines = []
+    guests = re.search(r"Guests: (\d+)", listings[0].get("Rating", ""))
+    if guests:
+        lines.append(f"Airbnb listings for {guests.group(1)} guests")
+    for listing in listings:
+        parts = [listing["title"].replace("🏠", "").strip(), listing.get("Price", "N/A")]
+        rating = listing.get("Rating", "").split(" | ")[0]
+        if rating and rating != "N/A":
+            parts.append(f"rating {rating}")
+        if listing.get("Link"):
+            parts.append(store.shorten(listing["Link"]))
+        lines.append(" | ".join(parts))
+    return _truncate("\n".join(lines), max_chars)
@@ -0,0 +1,109 @@
+"""
+Tool registry - lazy loading of the local MCP tool modules.
+
+Each mcp_servers module builds a FastMCP server when it is imported, so the
+modules are only imported when a mode that needs them is first used (or by
+the background warmup after startup) instead of at app import time.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Project root holds the mcp_servers package
+PROJECT_ROOT = Path(__file__).parents[3]
+
+# Tool group -> (module path, exported tool function names)
+TOOL_MODULES: dict[str, tuple[str, tuple[str, ...]]] = {
+    # Travel tools (search_flights=Kiwi, search_flights_sky=Skyscanner, search_amadeus_*=Amadeus - use for comparison)
+    "travel": ("mcp_servers.travel_server", (
+        "search_flights", "search_flights_sky", "search_amadeus_flights", "search_amadeus_hotels",
+        "search_places", "search_hotels", "search_airbnb",
+        "search_ground_transport", "search_ground_transport_backup", "get_directions",
+        "geocode_address", "reverse_geocode", "text_search_places", "search_places_nearby",
+    )),
+    "jobs": ("mcp_servers.jobs_server", (
+        "search_jobs", "get_active_jobs", "optimize_resume", "analyze_job_match",
+    )),
+    # Search & scraping tools (backup for all agents)
+    "search": ("mcp_servers.search_server", (
+        "web_search", "scrape_webpage", "crawl_website",
+    )),
+    "trends": ("mcp_servers.trends_server", (
+        "get_youtube_trends", "search_youtube", "get_google_trends", "search_tweets",
+        "get_tiktok_trends", "search_tiktok", "search_instagram", "get_instagram_posts", "search_facebook",
+    )),
+}
+
+# Tool name -> upstream provider, for timing and logs
+TOOL_PROVIDERS: dict[str, str] = {
+    "search_flights": "kiwi",
+    "search_flights_sky": "google-flights2",
+    "search_amadeus_flights": "amadeus",
+    "search_amadeus_hotels": "amadeus",
+    "search_places": "tripadvisor",
+    "search_hotels": "booking",
+    "search_airbnb": "apify",
+    "search_ground_transport": "google-search",
+    "search_ground_transport_backup": "kiwi",
+    "get_directions": "google-maps",
+    "geocode_address": "google-maps",
+    "reverse_geocode": "google-maps",
+    "text_search_places": "google-places",
+    "search_places_nearby": "google-places",
+    "search_jobs": "jsearch",
+    "get_active_jobs": "jsearch",
+    "optimize_resume": "resumeoptimizerpro",
+    "analyze_job_match": "resumeoptimizerpro",
+    "web_search": "google-search",
+    "scrape_webpage": "firecrawl",
+    "crawl_website": "firecrawl",
+    "get_youtube_trends": "youtube",
+    "search_youtube": "youtube",
+    "get_google_trends": "trendly",
+    "search_tweets": "x",
+    "get_tiktok_trends": "tiktok-scraper",
+    "search_tiktok": "tiktok-scraper",
+    "search_instagram": "instagram-scraper",
+    "get_instagram_posts": "instagram-scraper",
+    "search_facebook": "facebook-scraper",
+}
+
+_loaded: dict[str, list[Callable[..., Any]]] = {}
+# Warmup imports from a worker thread while requests may import on the loop
+_lock = threading.Lock()
+
+
+def ensure_project_root() -> None:
+    """Make the mcp_servers package importable."""
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.append(str(PROJECT_ROOT))
+
+
+def load_tool_group(group: str) -> list[Callable[..., Any]]:
+    """Import a tool group's module on first use and return its tool functions."""
+    if group in _loaded:
+        return _loaded[group]
+    with _lock:
+        if group in _loaded:
+            return _loaded[group]
+        module_path, names = TOOL_MODULES[group]
+        ensure_project_root()
+        try:
+            module = importlib.import_module(module_path)
+            tools = [getattr(module, name) for name in names]
+        except (ImportError, AttributeError) as e:
+            logger.warning(f"Could not import MCP tools from {module_path}: {e}")
+            tools = []
+        _loaded[group] = tools
+        return tools
+
+
+def load_tool_groups(groups: Iterable[str]) -> dict[str, list[Callable[..., Any]]]:
+    return {group: load_tool_group(group) for group in groups}
@@ -2,6 +2,7 @@
 Trip Planner Agent - LangGraph-based multi-step travel planning.
 Phase 1: Basic graph with flight + hotel search pipeline.
 """
+import asyncio
 import os
 import re
 from typing import TypedDict, List, Optional, Annotated
@@ -11,15 +12,24 @@ from datetime import datetime
 
 from langgraph.graph import StateGraph, END
 
-# Import existing tools (same pattern as llm.py)
-try:
-    from mcp_servers.travel_server import search_amadeus_flights, search_amadeus_hotels
-except ImportError:
-    # Fallback - tools will return errors
-    async def search_amadeus_flights(*args, **kwargs):
-        return "Error: Amadeus tools not available"
-    async def search_amadeus_hotels(*args, **kwargs):
+from .tool_registry import load_tool_group
+
+
+# Existing travel tools, imported on first use (same registry as llm.py)
+async def _call_travel_tool(name: str, **kwargs) -> str:
+    tools = await asyncio.to_thread(load_tool_group, "travel")
+    tool = next((t for t in tools if t.__name__ == name), None)
+    if tool is None:
         return "Error: Amadeus tools not available"
+    return await tool(**kwargs)
+
+
+async def search_amadeus_flights(**kwargs) -> str:
+    return await _call_travel_tool("search_amadeus_flights", **kwargs)
+
+
+async def search_amadeus_hotels(**kwargs) -> str:
+    return await _call_travel_tool("search_amadeus_hotels", **kwargs)
 
 
 # =============================================================================
@@ -0,0 +1,96 @@
+"""Benchmark tiered model routing: one model for every turn vs fast tool turns + strong answer.
+
+Runs the same prompts through GeminiClient under both configurations and
+reports end-to-end latency and the time spent in model turns (tool time is
+the same provider work in both runs, so it is reported separately). Needs
+GEMINI_API_KEY and the MCP keys in backend/.env.
+
+Usage:
+    python scripts/benchmark_model_routing.py [--runs 3] [--mode travel]
+        [--single gemini-1.5-pro] [--tool-model gemini-2.0-flash] [--answer-model gemini-1.5-pro]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import Settings  # noqa: E402
+from app.services.llm import GeminiClient  # noqa: E402
+from app.services.timing import RequestTimer  # noqa: E402
+
+PROMPTS = {
+    "travel": [
+        "Find flights from Tallinn to Helsinki on 2025-03-14 for 1 adult",
+        "Cheapest flights from London to Barcelona next Friday, direct if possible",
+        "Hotels in Lisbon from 2025-05-02 to 2025-05-05 for 2 adults",
+    ],
+    "jobs": [
+        "Remote senior Python developer jobs in Europe",
+        "Data engineer roles in Berlin posted this week",
+    ],
+    "trends": [
+        "What is trending in AI tooling this week?",
+    ],
+    "general": [
+        "Plan a weekend in Riga: flights from Tallinn and things to do",
+    ],
+}
+
+
+def span_total(tree: dict, prefix: str) -> float:
+    """Summed duration of spans whose name starts with prefix."""
+    total = (tree["duration_ms"] or 0.0) if tree["name"].startswith(prefix) else 0.0
+    return total + sum(span_total(child, prefix) for child in tree.get("children", []))
+
+
+async def run_config(label: str, settings: Settings, mode: str, runs: int) -> None:
+    client = GeminiClient(settings)
+    total, model_time, tool_time = [], [], []
+    for _ in range(runs):
+        for prompt in PROMPTS[mode]:
+            timer = RequestTimer(label)
+            with timer.activate():
+                await client.respond(prompt, mode=mode)
+            tree = timer.to_dict()
+            total.append(tree["duration_ms"])
+            model_time.append(span_total(tree, "llm_"))
+            tool_time.append(span_total(tree, "tool:"))
+    print(
+        f"{label:<36} total median {statistics.median(total):7.0f}ms (max {max(total):7.0f}ms) | "
+        f"model {statistics.median(model_time):7.0f}ms | tools {statistics.median(tool_time):7.0f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mode", choices=sorted(PROMPTS), default="travel")
+    parser.add_argument("--single", default=None, help="Model for every turn (default: GEMINI_MODEL)")
+    parser.add_argument("--tool-model", default="gemini-2.0-flash")
+    parser.add_argument("--answer-model", default=None, help="Default: the --single model")
+    args = parser.parse_args()
+
+    base = Settings(response_cache_enabled=False)
+    if not base.gemini_api_key:
+        sys.exit("GEMINI_API_KEY is not set")
+    single = args.single or base.gemini_model
+    answer = args.answer_model or single
+
+    print(f"🚦 Model routing benchmark ({args.runs} runs x {len(PROMPTS[args.mode])} {args.mode} prompts)")
+    await run_config(
+        f"single: {single}",
+        base.model_copy(update={"gemini_model": single}),
+        args.mode, args.runs,
+    )
+    await run_config(
+        f"tiered: {args.tool_model} -> {answer}",
+        base.model_copy(update={"gemini_model": single, "gemini_tool_model": args.tool_model, "gemini_answer_model": answer}),
+        args.mode, args.runs,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Offline accuracy and latency benchmark for the local query router.
+
+Scores QueryRouter.route against labelled prompts and times every decision.
+Prompts come from data/router/eval.jsonl ({"prompt", "chains"} per line,
+optionally the travel form as "intent"; none of them is in the training set)
+and/or from JSON logs (--log): with LOG_JSON=true and a payload sample rate
+above zero, each agent run logs a "PAYLOAD prompt" record and an
+llm_response record with the tools it called. The label of a logged prompt is
+the chain(s) those tools belong to, i.e. what the unrouted agent actually used.
+
+An empty prediction keeps the full tool set, so it is never wrong, only
+slower; "unsafe" counts routes that left out a chain the prompt needed.
+Rules decide most prompts, so the classifier is also scored on its own
+against every single-chain prompt.
+
+Usage:
+    python scripts/benchmark_query_router.py [--eval data/router/eval.jsonl]
+        [--log llm_debug.log ...] [--runs 200]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import Settings  # noqa: E402
+from app.services.query_router import CHAIN_TOOLS, build_query_router  # noqa: E402
+
+DEFAULT_EVAL = Path(__file__).parent.parent / "data" / "router" / "eval.jsonl"
+
+# Tools that belong to exactly one chain identify it; shared ones (geocoding,
+# web_search) say nothing on their own
+TOOL_CHAIN = {
+    tool: chain
+    for chain, tools in CHAIN_TOOLS.items()
+    for tool in tools
+    if sum(tool in other for other in CHAIN_TOOLS.values()) == 1
+}
+
+
+def load_eval(path: Path) -> list[tuple[str, dict | None, frozenset[str]]]:
+    with open(path, encoding="utf-8") as f:
+        return [
+            (entry["prompt"], entry.get("intent"), frozenset(entry["chains"]))
+            for entry in map(json.loads, filter(str.strip, f))
+        ]
+
+
+def load_logged(path: Path) -> list[tuple[str, dict | None, frozenset[str]]]:
+    """Prompts joined by request id with the tools their agent run called."""
+    prompts: dict[str, str] = {}
+    tools: dict[str, list[str]] = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # plain-text log lines
+            request_id = entry.get("request_id", "-")
+            if entry.get("msg") == "PAYLOAD prompt":
+                prompts[request_id] = entry["payload"]
+            elif entry.get("event") == "llm_response" and "tools" in entry:
+                tools[request_id] = entry["tools"]
+    labelled = []
+    for request_id, prompt in prompts.items():
+        if request_id not in tools:
+            continue
+        called = tools[request_id]
+        if any(all(name not in chain_tools for chain_tools in CHAIN_TOOLS.values()) for name in called):
+            chains = frozenset()  # used a tool outside every chain: needs the full profile
+        else:
+            chains = frozenset(TOOL_CHAIN[name] for name in called if name in TOOL_CHAIN)
+        labelled.append((prompt, None, chains))
+    return labelled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--eval", default=str(DEFAULT_EVAL), help="Labelled JSONL prompts ('' to skip)")
+    parser.add_argument("--log", type=Path, action="append", default=[], help="JSON log file (repeatable)")
+    parser.add_argument("--runs", type=int, default=200, help="Timed decisions per prompt")
+    args = parser.parse_args()
+
+    dataset = load_eval(Path(args.eval)) if args.eval else []
+    for path in args.log:
+        logged = load_logged(path)
+        print(f"📜 {path}: {len(logged)} logged prompts with tool calls")
+        dataset.extend(logged)
+    if not dataset:
+        sys.exit("No labelled prompts")
+
+    router = build_query_router(Settings(query_router_enabled=True))
+    exact = unsafe = fallback = 0
+    sources: dict[str, int] = {}
+    for prompt, intent, gold in dataset:
+        decision = router.route(prompt, intent)
+        predicted = frozenset(decision.chains)
+        sources[decision.source] = sources.get(decision.source, 0) + 1
+        exact += predicted == gold
+        if not predicted:
+            fallback += 1
+        elif not (gold and gold <= predicted):
+            unsafe += 1
+            print(f"  ✗ {sorted(gold) or 'full'} <- {sorted(predicted)} ({decision.source}): {prompt}")
+
+    single = [(prompt, next(iter(gold))) for prompt, _, gold in dataset if len(gold) == 1]
+    predictions = [(router.classifier.predict(prompt), gold) for prompt, gold in single]
+    confident = [(label, gold) for (label, confidence), gold in predictions if confidence >= router.min_confidence]
+
+    timings = []
+    for prompt, intent, _ in dataset:
+        for _ in range(args.runs):
+            started = time.perf_counter_ns()
+            router.route(prompt, intent)
+            timings.append((time.perf_counter_ns() - started) / 1000)
+    timings.sort()
+
+    total = len(dataset)
+    print(f"🧭 Query router on {total} prompts")
+    print(f"  exact match   {exact / total:6.1%}")
+    print(f"  unsafe routes {unsafe / total:6.1%} ({unsafe})")
+    print(f"  full profile  {fallback / total:6.1%} ({fallback})")
+    print(f"  sources       {', '.join(f'{k}={v}' for k, v in sorted(sources.items()))}")
+    if single:
+        right = sum(label == gold for (label, _), gold in predictions)
+        print(f"  classifier    {right / len(single):6.1%} top-1 on {len(single)} single-chain prompts, "
+              f"{len(confident)} confident ({sum(label != gold for label, gold in confident)} wrong)")
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(
+        f"  latency       median {statistics.median(timings):.1f}µs | p99 {p99:.1f}µs | max {timings[-1]:.1f}µs"
+        f" {'✅' if p99 < 1000 else '❌ over the 1ms budget'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
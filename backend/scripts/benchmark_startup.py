@@ -0,0 +1,80 @@
+"""Benchmark backend cold start: app import time and time to first /health response.
+
+Usage:
+    python scripts/benchmark_startup.py [--runs 5]
+"""
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def measure_import_ms() -> float:
+    """Import app.main in a fresh interpreter and return the import time."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_health_ms(timeout: float = 60.0) -> float:
+    """Start uvicorn and poll /health until it answers; return elapsed time."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0)
+                if response.status_code == 200:
+                    return (time.perf_counter() - started) * 1000
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<24} median {statistics.median(samples):8.0f}ms | "
+        f"min {min(samples):8.0f}ms | max {max(samples):8.0f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"🚀 Startup benchmark ({args.runs} runs)")
+    report("import app.main", [measure_import_ms() for _ in range(args.runs)])
+    report("time to first /health", [measure_first_health_ms() for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import pytest
+
+from app.config import Settings
+from app.services.agent_profiles import AgentProfile
+from app.services.llm import GeminiClient
+
+
+@pytest.fixture
+def make_client():
+    """Build a GeminiClient for tests; with a model, it serves ``mode`` from a test profile.
+
+    The response cache is off and the client behaves as if a Gemini key were
+    set unless overridden (``enabled=False`` gives the mock-response client).
+    """
+    def factory(model=None, tools=(), *, mode="general", enabled=True, planner=None, answer_model=None,
+                **settings) -> GeminiClient:
+        client = GeminiClient(Settings(**{"gemini_api_key": None, "response_cache_enabled": False, **settings}))
+        client._enabled = enabled
+        if model is not None:
+            client._profiles[mode] = AgentProfile.create(
+                mode, "test agent", list(tools), 1024, model=model, planner=planner, answer_model=answer_model,
+            )
+        return client
+    return factory
@@ -0,0 +1,55 @@
+"""Minimal stand-ins for the google-generativeai chat objects used in tests."""
+from types import SimpleNamespace
+
+
+class FakeResponse:
+    def __init__(self, parts):
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=parts))]
+
+    @property
+    def text(self):
+        return "".join(p.text for p in self.candidates[0].content.parts if getattr(p, "text", ""))
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        yield self
+
+
+def call(name, **args):
+    return SimpleNamespace(function_call=SimpleNamespace(name=name, args=args), text="")
+
+
+def text(value):
+    return SimpleNamespace(function_call=None, text=value)
+
+
+class FakeChat:
+    def __init__(self, script):
+        self.script = list(script)
+        self.sent = []
+        self.kwargs = []
+
+    async def send_message_async(self, content, stream=False, **kwargs):
+        self.sent.append(content)
+        self.kwargs.append(kwargs)
+        return self.script.pop(0)
+
+
+class FakeModel:
+    def __init__(self, script):
+        self.chat = FakeChat(script)
+
+    def start_chat(self, history=None):
+        return self.chat
+
+
+class FakePlanner:
+    def __init__(self, plan_json):
+        self.plan_json = plan_json
+        self.calls = 0
+
+    async def generate_content_async(self, contents):
+        self.calls += 1
+        return SimpleNamespace(text=self.plan_json)
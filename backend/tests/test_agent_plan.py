@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.agent_plan import PlanError, PlanStep, execute_plan, parse_plan, resolve_args
+from fakes import FakeModel, FakePlanner, FakeResponse, text
+
+
+DISPATCH = {"geocode_address": None, "search_places_nearby": None, "search_flights": None}
+
+
+def test_parse_plan_adds_dependencies_from_references():
+    raw = json.dumps({"steps": [
+        {"id": "geo", "tool": "geocode_address", "args": {"address": "Old Town, Tallinn"}},
+        {"id": "food", "tool": "search_places_nearby", "args": {
+            "latitude": "${geo.Latitude}", "longitude": "${geo.Longitude}", "place_type": "restaurant",
+        }},
+    ]})
+
+    steps = parse_plan(raw, DISPATCH)
+
+    assert [step.id for step in steps] == ["geo", "food"]
+    assert steps[1].depends_on == ("geo",)
+
+
+@pytest.mark.parametrize("steps", [
+    [{"id": "a", "tool": "unknown_tool", "args": {}}],
+    [{"id": "a", "tool": "search_flights", "args": {}, "depends_on": ["missing"]}],
+    [
+        {"id": "a", "tool": "search_flights", "args": {}, "depends_on": ["b"]},
+        {"id": "b", "tool": "search_flights", "args": {}, "depends_on": ["a"]},
+    ],
+])
+def test_parse_plan_rejects_invalid_plans(steps):
+    with pytest.raises(PlanError):
+        parse_plan(json.dumps({"steps": steps}), DISPATCH)
+
+
+def test_resolve_args_converts_single_numeric_reference():
+    outputs = {"geo": "Address: Tallinn\nLatitude: 59.437\nLongitude: 24.7536\nPlace ID: abc"}
+
+    args = resolve_args({"latitude": "${geo.Latitude}", "query": "near ${geo.Address}"}, outputs)
+
+    assert args == {"latitude": 59.437, "query": "near Tallinn"}
+
+
+async def test_execute_plan_runs_independent_steps_in_parallel():
+    steps = [
+        PlanStep("a", "search_flights", {}),
+        PlanStep("b", "search_flights", {}),
+        PlanStep("c", "search_flights", {}, depends_on=("a", "b")),
+    ]
+    order = []
+
+    async def run_step(step, finished):
+        order.append((step.id, sorted(finished)))
+        await asyncio.sleep(0.1)
+        return step.id
+
+    started = time.perf_counter()
+    events = [(kind, step.id) async for kind, step, _ in execute_plan(steps, run_step)]
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.3
+    assert order[-1] == ("c", ["a", "b"])
+    assert events[-1] == ("finished", "c")
+
+
+async def test_plan_strategy_uses_single_synthesis_turn(make_client):
+    async def geocode_address(address: str) -> str:
+        return "Latitude: 59.43\nLongitude: 24.75"
+
+    async def search_places_nearby(latitude: float, longitude: float, place_type: str) -> str:
+        return f"{place_type} at {latitude},{longitude}"
+
+    planner = FakePlanner(json.dumps({"steps": [
+        {"id": "geo", "tool": "geocode_address", "args": {"address": "Tallinn"}},
+        {"id": "near", "tool": "search_places_nearby", "args": {
+            "latitude": "${geo.Latitude}", "longitude": "${geo.Longitude}", "place_type": "cafe",
+        }},
+    ]}))
+    model = FakeModel([FakeResponse([text("Try the cafe.")])])
+    client = make_client(model, [geocode_address, search_places_nearby], mode="travel", planner=planner)
+
+    result = await client.respond("cafes in Tallinn", mode="travel", strategy="plan")
+
+    assert result.text == "Try the cafe."
+    assert planner.calls == 1
+    assert len(model.chat.sent) == 1
+    assert "cafe at 59.43,24.75" in model.chat.sent[0]
+    assert model.chat.kwargs[0]["tool_config"]["function_calling_config"]["mode"] == "NONE"
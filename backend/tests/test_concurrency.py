@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.services.concurrency import ConcurrencyLimiter, LimiterBusyError
+
+
+async def test_limiter_caps_in_flight_calls_and_reports_queue_depth():
+    limiter = ConcurrencyLimiter("gemini", max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.05)
+
+    tasks = [asyncio.create_task(call()) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    assert limiter.stats()["queue_depth"] == 3
+    await asyncio.gather(*tasks)
+
+    stats = limiter.stats()
+    assert peak == 2
+    assert stats["total_calls"] == 5
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+    assert stats["max_wait_ms"] > 0
+
+
+async def test_limiter_rejects_after_queue_timeout():
+    limiter = ConcurrencyLimiter("gemini", max_concurrency=1, queue_timeout=0.01)
+
+    async with limiter.slot():
+        with pytest.raises(LimiterBusyError):
+            async with limiter.slot():
+                pass
+
+    assert limiter.stats()["rejected"] == 1
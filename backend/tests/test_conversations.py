@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.conversations import Conversation, ConversationNotFoundError, ConversationStore
+from fakes import FakeModel, FakeResponse, call, text
+
+
+class RecordingModel(FakeModel):
+    def __init__(self, script):
+        super().__init__(script)
+        self.histories = []
+
+    def start_chat(self, history=None):
+        self.histories.append(history)
+        return self.chat
+
+
+async def test_store_evicts_least_recently_used():
+    store = ConversationStore(max_entries=2)
+    for conversation_id in ("a", "b"):
+        await store.save(store.create("travel", conversation_id=conversation_id))
+
+    await store.get("a")
+    await store.save(store.create("travel", conversation_id="c"))
+
+    assert (await store.get("a")).id == "a"
+    with pytest.raises(ConversationNotFoundError):
+        await store.get("b")
+    assert store.stats()["evictions"] == 1
+
+
+async def test_idle_conversations_expire():
+    store = ConversationStore(ttl_seconds=60)
+    conversation = store.create("travel")
+    conversation.updated_at = time.time() - 120
+    await store.save(conversation)
+
+    with pytest.raises(ConversationNotFoundError):
+        await store.get(conversation.id)
+
+
+def test_turn_cap_drops_whole_exchanges():
+    conversation = Conversation(id="a", mode="general")
+    for index in range(4):
+        conversation.add_exchange(f"q{index}", f"a{index}", [], max_turns=5)
+
+    assert [turn.content for turn in conversation.turns] == ["q2", "a2", "q3", "a3"]
+
+
+async def test_follow_up_reuses_stored_turns_and_tool_results(make_client):
+    async def search_flights(origin: str) -> str:
+        return f"TLL-HEL 49 EUR https://example.com/book/{origin}\n---"
+
+    model = RecordingModel([
+        FakeResponse([call("search_flights", origin="TLL")]),
+        FakeResponse([text("Cheapest is 49 EUR")]),
+        FakeResponse([text("Book it at the link above")]),
+    ])
+    client = make_client(model, [search_flights])
+
+    first = await client.respond("flights from Tallinn", start_conversation=True)
+    assert first.conversation_id
+    assert "https://example.com/book/TLL" in first.tool_results[0]
+
+    second = await client.respond("how do I book it?", conversation_id=first.conversation_id)
+
+    assert second.conversation_id == first.conversation_id
+    assert [entry["parts"][0] for entry in model.histories[-1]] == ["flights from Tallinn", "Cheapest is 49 EUR"]
+    follow_up = model.chat.sent[-1]
+    assert "RESULTS FROM THE PREVIOUS ANSWER" in follow_up and "TLL-HEL 49 EUR" in follow_up
+    # The stored URL is offered as a short link id, like fresh tool results
+    assert "https://example.com" not in follow_up
+    # Tool results from the first answer stay available to later turns
+    assert (await client.conversations.get(first.conversation_id)).tool_results == first.tool_results
+
+
+async def test_unknown_conversation_is_restored_from_history_or_rejected(make_client):
+    client = make_client(RecordingModel([FakeResponse([text("Sure")])]), [])
+
+    with pytest.raises(ConversationNotFoundError):
+        await client.respond("hi again", conversation_id="gone")
+
+    result = await client.respond(
+        "hi again", history=[{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
+        conversation_id="gone",
+    )
+    assert result.conversation_id == "gone"
+    assert len((await client.conversations.get("gone")).turns) == 4
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.rows = {}
+        self.purges = []
+
+    async def load(self, conversation_id):
+        await asyncio.sleep(0.01)  # a database round trip
+        row = self.rows.get(conversation_id)
+        return Conversation.from_dict(row) if row is not None else None
+
+    async def save(self, conversation):
+        self.rows[conversation.id] = conversation.to_dict()
+
+    async def delete(self, conversation_id):
+        return self.rows.pop(conversation_id, None) is not None
+
+    async def purge(self, older_than):
+        self.purges.append(older_than)
+        expired = [key for key, row in self.rows.items() if row["updated_at"] < older_than]
+        for key in expired:
+            del self.rows[key]
+        return len(expired)
+
+
+async def test_requests_without_a_conversation_store_nothing(make_client):
+    client = make_client(RecordingModel([FakeResponse([text("Sure")])]), [])
+
+    result = await client.respond("hi")
+
+    assert result.text == "Sure" and result.conversation_id is None
+    assert client.conversations.stats()["entries"] == 0
+
+
+async def test_expired_rows_are_purged_on_write_at_most_once_per_interval():
+    backend = FakeBackend()
+    store = ConversationStore(ttl_seconds=60, backend=backend, purge_interval_seconds=300)
+    stale = store.create("travel", conversation_id="stale")
+    stale.updated_at = time.time() - 120
+    await backend.save(stale)
+
+    await store.save(store.create("travel", conversation_id="a"))
+    await store.save(store.create("travel", conversation_id="b"))
+
+    assert sorted(backend.rows) == ["a", "b"] and len(backend.purges) == 1
+    assert store.stats()["purged"] == 1
+
+
+async def test_delete_reports_rows_only_the_backend_had():
+    backend = FakeBackend()
+    await backend.save(Conversation(id="other-worker", mode="travel"))
+    store = ConversationStore(backend=backend)
+
+    assert await store.delete("other-worker") is True
+    assert await store.delete("other-worker") is False
+
+
+async def test_concurrent_turns_of_a_conversation_are_serialized(make_client):
+    model = RecordingModel([FakeResponse([text(answer)]) for answer in ("one", "two", "three")])
+    client = make_client(model, [])
+    # Every turn loads the conversation from the backend, as another worker would
+    client.conversations = ConversationStore(max_entries=0, backend=FakeBackend())
+    first = await client.respond("first", start_conversation=True)
+
+    await asyncio.gather(
+        client.respond("second", conversation_id=first.conversation_id),
+        client.respond("third", conversation_id=first.conversation_id),
+    )
+
+    stored = await client.conversations.get(first.conversation_id)
+    assert [turn.content for turn in stored.turns][::2] == ["first", "second", "third"]
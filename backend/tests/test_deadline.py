@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.deadline import Deadline, iterate_within
+from app.services.llm import _load_genai
+from fakes import FakeModel, FakeResponse, call, text
+
+
+@pytest.fixture
+def deadline_client(make_client):
+    # Import the SDK up front so its import time doesn't count against the deadline
+    _load_genai()
+    return lambda model, tools: make_client(model, tools, agent_synthesis_reserve_seconds=0.2)
+
+
+def test_reserve_is_capped_for_short_deadlines():
+    deadline = Deadline(1.0, reserve=10.0)
+
+    assert deadline.reserve == 0.3
+    assert 0.6 < deadline.work_remaining() <= 0.7
+    assert deadline.clamp(0.1) == 0.1
+
+
+async def test_iterate_within_times_out_and_closes_iterator():
+    closed = []
+
+    async def ticks():
+        try:
+            while True:
+                await asyncio.sleep(0.05)
+                yield "tick"
+        finally:
+            closed.append(True)
+
+    received = []
+    try:
+        async for item in iterate_within(ticks(), 0.12):
+            received.append(item)
+    except asyncio.TimeoutError:
+        pass
+
+    assert received == ["tick", "tick"]
+    assert closed == [True]
+
+
+async def test_slow_tool_is_cancelled_and_synthesis_is_forced(deadline_client):
+    async def fast_search(query: str) -> str:
+        return f"result for {query}\n---"
+
+    async def slow_search(query: str) -> str:
+        await asyncio.sleep(5)
+        return "too late"
+
+    model = FakeModel([
+        FakeResponse([call("fast_search", query="a"), call("slow_search", query="b")]),
+        FakeResponse([text("Partial answer")]),
+    ])
+    client = deadline_client(model, [fast_search, slow_search])
+
+    started = time.perf_counter()
+    events = [event async for event in client.stream("search", deadline_seconds=0.6, stream_tokens=False)]
+
+    assert time.perf_counter() - started < 1.0
+    assert "deadline_reached" in [event.type for event in events]
+    assert events[-1].result.text == "Partial answer"
+    synthesis = model.chat.sent[-1]
+    assert "result for a" in synthesis and "Cancelled slow_search" in synthesis
+    assert model.chat.kwargs[-1]["tool_config"]["function_calling_config"]["mode"] == "NONE"
+
+
+async def test_fallback_answer_when_synthesis_also_times_out(deadline_client):
+    async def fast_search(query: str) -> str:
+        return f"result for {query}\n---"
+
+    class SlowChat:
+        def __init__(self):
+            self.turns = 0
+
+        async def send_message_async(self, content, **kwargs):
+            self.turns += 1
+            if self.turns == 1:
+                return FakeResponse([call("fast_search", query="a")])
+            await asyncio.sleep(5)
+
+    chat = SlowChat()
+    model = FakeModel([])
+    model.chat = chat
+    client = deadline_client(model, [fast_search])
+
+    started = time.perf_counter()
+    result = await client.respond("search", deadline_seconds=0.5)
+
+    assert time.perf_counter() - started < 0.8
+    assert "ran out of time" in result.text and "result for a" in result.text
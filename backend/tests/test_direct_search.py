@@ -0,0 +1,113 @@
+from app.services.direct_search import direct_search_plan, is_form_prompt, render_direct_answer
+from app.services.llm import DIRECT_SEARCH_MODEL, ToolOutcome
+from fakes import FakeModel
+
+INTENT = {
+    "mode": "detailed", "transportMode": "all", "tripType": "one-way",
+    "from": "TLL", "to": "HEL", "departDate": "2025-03-14", "cabinClass": "ECONOMY",
+    "maxStops": None, "adults": 1, "children": 0, "infants": 0, "accommodations": {"enabled": False},
+}
+
+KIWI = (
+    "📊 Found 2 flights (1 direct, 1 with stops)\n----------------------------------------\n"
+    "✈️ 63 USD | 1h 05m | Direct\nRoute: Finnair AY1024: Tallinn (2025-03-14 08:00) -> Helsinki (2025-03-14 09:05)\n"
+    "Link: https://www.kiwi.com/book/1\n---\n"
+    "✈️ 49 USD | 3h 30m | 1 Stop(s)\nRoute: airBaltic BT311: Tallinn (2025-03-14 06:00) -> Riga (2025-03-14 07:00) | "
+    "airBaltic BT301: Riga (2025-03-14 08:30) -> Helsinki (2025-03-14 09:30)\nLink: https://www.kiwi.com/book/2\n---"
+)
+SKY = "✈️ $58 | 2025-03-14 10:00 -> 2025-03-14 11:05 | 1 hr 5 min | 0 stops"
+
+
+def outcome(name: str, result: str, error: bool = False) -> ToolOutcome:
+    return ToolOutcome(name, {}, result, [f"Called: {name}"], 5.0, error=error)
+
+
+def test_only_complete_form_searches_take_the_fast_path():
+    assert [step.tool for step in direct_search_plan(INTENT)] == ["search_flights", "search_flights_sky"]
+    assert direct_search_plan({**INTENT, "tripType": "round-trip"}) is None
+    assert direct_search_plan({**INTENT, "tripType": "outbound-window", "windowStart": "2025-03-01"}) is None
+    assert direct_search_plan({**INTENT, "transportMode": "ground"}) is None
+    assert direct_search_plan({**INTENT, "accommodations": {"enabled": True, "city": "Helsinki"}}) is None
+
+    stay = direct_search_plan({
+        **INTENT, "tripType": "round-trip", "returnDate": "2025-03-17",
+        "accommodations": {"enabled": True, "city": "Helsinki", "maxResults": 3},
+    })
+    hotels = next(step for step in stay if step.tool == "search_hotels")
+    assert hotels.depends_on == ("geo",) and hotels.args["latitude"] == "${geo.Latitude}"
+
+    assert is_form_prompt("Use the travel form above")
+    assert is_form_prompt("Find flights!")
+    assert not is_form_prompt("Find flights with good legroom, I'm 2m tall")
+    assert not is_form_prompt("") and not is_form_prompt("?!")
+
+
+def test_template_compares_prices_and_keeps_links():
+    steps = direct_search_plan(INTENT)
+    text = render_direct_answer(INTENT, steps, {
+        "kiwi": outcome("search_flights", KIWI),
+        "sky": outcome("search_flights_sky", "Error: RAPIDAPI_KEY is not set.", error=True),
+    })
+
+    assert "- **Best price:** $49 with Kiwi.com (1 stop, 3h 30m) [Book](https://www.kiwi.com/book/2)" in text
+    assert "direct from $63 (1h 05m), or save $14 with 1 stop at $49" in text
+    assert "airBaltic" in text
+    assert "Google Flights did not return results" in text
+
+
+def test_stays_are_ranked_per_night_within_the_requested_currency():
+    intent = {
+        **INTENT, "tripType": "round-trip", "returnDate": "2025-03-17", "currency": "EUR",
+        "accommodations": {"enabled": True, "city": "Helsinki"},
+    }
+    steps = direct_search_plan(intent)
+    booking = (
+        "Hotel: Grand\nPrice: 450 EUR\nLink: https://booking.com/grand\n---\n"  # 3 nights: 150/night
+        "Hotel: Hostel\nPrice: 210 EUR\nLink: https://booking.com/hostel\n---"
+    )
+    airbnb = (
+        "🏠 Loft\nPrice: 100 EUR/night\nRating: 4.9 | Guests: 1\nLink: https://airbnb.com/loft\n---\n"
+        "🏠 Cabin\nPrice: 40 SEK/night\nRating: 4.5 | Guests: 1\nLink: https://airbnb.com/cabin\n---"
+    )
+    text = render_direct_answer(intent, steps, {
+        "kiwi": outcome("search_flights", KIWI),
+        "sky": outcome("search_flights_sky", SKY),
+        "geo": outcome("geocode_address", "Latitude: 60.17\nLongitude: 24.94"),
+        "hotels": outcome("search_hotels", booking),
+        "airbnb": outcome("search_airbnb", airbnb),
+    })
+
+    rows = [line for line in text.splitlines() if "Booking.com" in line or "| Airbnb |" in line]
+    assert [row.split(" | ")[1] for row in rows] == ["Hostel", "Loft", "Grand", "Cabin"]
+    assert "| Hostel | €70 | €210 |" in text and "| Loft | €100 | €300 |" in text
+    assert "| Cabin | 40 SEK | 120 SEK |" in text
+
+
+def test_empty_results_hand_over_to_the_agent():
+    steps = direct_search_plan(INTENT)
+    assert render_direct_answer(INTENT, steps, {
+        "kiwi": outcome("search_flights", "No flights found from TLL to HEL."),
+        "sky": outcome("search_flights_sky", "No flights found."),
+    }) is None
+
+
+async def test_form_submission_is_answered_without_the_model(make_client):
+    async def search_flights(from_location: str, to_location: str, date_from: str, date_to: str = None,
+                             return_from: str = None, return_to: str = None, cabin_class: str = "ECONOMY",
+                             max_stops: int = None, adults: int = 1, children: int = 0, infants: int = 0) -> str:
+        return KIWI
+
+    async def search_flights_sky(from_location: str, to_location: str, date: str = None, whole_month: str = None,
+                                 return_date: str = None, cabin_class: str = "economy", adults: int = 1,
+                                 max_stops: int = None) -> str:
+        return SKY
+
+    model = FakeModel([])
+    client = make_client(model, [search_flights, search_flights_sky], mode="travel", prefetch_tools=False)
+
+    result = await client.respond("Use the travel form above", mode="travel", travel_intent=INTENT)
+
+    assert result.model == DIRECT_SEARCH_MODEL
+    assert model.chat.sent == []
+    assert "| Google Flights |" in result.text and "$49" in result.text
+    assert len(result.tool_results) == 2
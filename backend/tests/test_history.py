@@ -0,0 +1,72 @@
+import asyncio
+
+from app.schemas import ChatMessage
+from app.services.history import ChatTurn, HistoryCompressor, estimate_tokens
+
+
+def conversation(exchanges: int, size: int = 400) -> list[dict]:
+    turns = []
+    for index in range(exchanges):
+        turns.append({"role": "user", "content": f"question {index} " + "q" * size})
+        turns.append({"role": "assistant", "content": f"answer {index} " + "a" * size})
+    return turns
+
+
+def make_compressor(budget: int = 600, **options):
+    calls: list[tuple[str, int]] = []
+
+    async def summarizer(previous: str, turns: list[ChatTurn], max_words: int) -> str:
+        calls.append((previous, len(turns)))
+        return f"summary#{len(calls)}"
+
+    return HistoryCompressor(summarizer, {"travel": budget}, keep_turns=4, **options), calls
+
+
+async def test_short_history_is_returned_verbatim():
+    compressor, calls = make_compressor()
+    history = [ChatMessage(role="user", content="hi"), ChatMessage(role="model", content="hello")]
+
+    compressed = await compressor.compress(history, "travel")
+
+    assert compressed.summary is None
+    assert [turn.role for turn in compressed.turns] == ["user", "model"]
+    assert calls == []
+
+
+async def test_long_history_keeps_recent_turns_within_budget():
+    compressor, calls = make_compressor()
+
+    compressed = await compressor.compress(conversation(10), "travel")
+
+    assert compressed.summary == "summary#1"
+    assert compressed.turns[0].role == "user"
+    assert compressed.turns[-1].content.startswith("answer 9")
+    assert sum(estimate_tokens(turn.content) for turn in compressed.turns) <= 600
+    assert compressed.summarized_turns + len(compressed.turns) == 20
+
+
+async def test_summary_is_reused_and_extended_incrementally():
+    compressor, calls = make_compressor()
+    history = conversation(10)
+
+    first = await compressor.compress(history, "travel")
+    again = await compressor.compress(history, "travel")
+    assert again.summary == first.summary and len(calls) == 1
+
+    # Growing the conversation folds only the new turns into the old summary
+    grown = await compressor.compress(conversation(14), "travel")
+    assert grown.summary == "summary#2"
+    assert calls[1][0] == "summary#1"
+    assert calls[1][1] == grown.summarized_turns - first.summarized_turns
+
+
+async def test_slow_summarizer_falls_back_to_extractive_summary():
+    async def slow(previous: str, turns: list[ChatTurn], max_words: int) -> str:
+        await asyncio.sleep(1)
+        return "never"
+
+    compressor = HistoryCompressor(slow, {"travel": 600}, keep_turns=4, summary_timeout=0.05)
+
+    compressed = await compressor.compress(conversation(10), "travel")
+
+    assert "question 0" in compressed.summary
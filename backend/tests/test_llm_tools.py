@@ -0,0 +1,168 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_llm_client
+from app.main import app
+from app.services import llm
+from fakes import FakeModel, FakeResponse, call, text
+
+
+async def test_tool_calls_run_concurrently_and_keep_order(make_client):
+    async def search_flights(from_location: str) -> str:
+        await asyncio.sleep(0.3)
+        return f"flight from {from_location}"
+
+    async def search_hotels(location: str) -> str:
+        await asyncio.sleep(0.1)
+        return f"hotel in {location}"
+
+    async def search_places(query: str) -> str:
+        await asyncio.sleep(0.2)
+        return f"places for {query}"
+
+    model = FakeModel([
+        FakeResponse([
+            call("search_flights", from_location="TLL"),
+            call("search_hotels", location="Helsinki"),
+            call("search_places", query="museums"),
+        ]),
+        FakeResponse([text("Here is your trip")]),
+    ])
+    client = make_client(model, [search_flights, search_hotels, search_places], compact_tool_results=False)
+
+    started = time.perf_counter()
+    result = await client.respond("trip to Helsinki")
+    elapsed = time.perf_counter() - started
+
+    # About the slowest call, not the 0.6s the three take one after another
+    assert 0.3 <= elapsed < 0.45
+    assert result.text == "Here is your trip"
+    responses = [part.function_response for part in model.chat.sent[1]]
+    assert [(r.name, r.response["result"]) for r in responses] == [
+        ("search_flights", "flight from TLL"),
+        ("search_hotels", "hotel in Helsinki"),
+        ("search_places", "places for museums"),
+    ]
+
+
+async def test_tool_call_timeout_and_errors_are_isolated(make_client):
+    client = make_client(enabled=False, tool_timeout_seconds=0.05)
+
+    async def hang() -> str:
+        await asyncio.sleep(1)
+        return "never"
+
+    async def boom() -> str:
+        raise RuntimeError("provider down")
+
+    tool_map = {"hang": hang, "boom": boom}
+    outcomes = await asyncio.gather(
+        client._run_tool_call("hang", {}, tool_map),
+        client._run_tool_call("boom", {}, tool_map),
+        client._run_tool_call("missing", {}, tool_map),
+    )
+
+    assert "timed out" in outcomes[0].result
+    assert "provider down" in outcomes[1].result
+    assert outcomes[2].result == "Unknown function: missing"
+    assert all(outcome.error for outcome in outcomes)
+
+
+async def test_stream_ends_with_done_event_when_disabled(make_client):
+    client = make_client(enabled=False)
+
+    events = [event async for event in client.stream("flights TLL to HEL", mode="travel")]
+
+    assert events[0].type == "started"
+    assert events[-1].type == "done"
+    assert events[-1].result.model == "mock-gemini"
+
+
+async def test_stream_reports_tools_and_tokens(make_client):
+    async def search_flights(from_location: str) -> str:
+        await asyncio.sleep(0.05)
+        return f"flight from {from_location}\n---"
+
+    async def search_hotels(location: str) -> str:
+        return f"hotel in {location}"
+
+    model = FakeModel([
+        FakeResponse([call("search_flights", from_location="TLL"), call("search_hotels", location="Helsinki")]),
+        FakeResponse([text("Best option: "), text("direct flight")]),
+    ])
+    client = make_client(model, [search_flights, search_hotels])
+
+    events = [event async for event in client.stream("trip", mode="general")]
+    types = [event.type for event in events]
+
+    assert types.count("tool_started") == 2
+    finished = [event.data["name"] for event in events if event.type == "tool_finished"]
+    assert finished == ["search_hotels", "search_flights"]
+    assert "".join(event.data["text"] for event in events if event.type == "token") == "Best option: direct flight"
+    assert events[-1].result.text == "Best option: direct flight"
+    sent_names = [part.function_response.name for part in model.chat.sent[1]]
+    assert sent_names == ["search_flights", "search_hotels"]
+
+
+def test_profiles_expose_mode_specific_tools(make_client):
+    client = make_client(enabled=False)
+
+    travel = client.profile_for("travel")
+    jobs = client.profile_for("jobs")
+
+    assert "search_flights" in travel.dispatch
+    assert "search_jobs" not in travel.dispatch
+    assert "search_jobs" in jobs.dispatch and "web_search" in jobs.dispatch
+    assert client.profile_for("unknown").mode == "general"
+    assert len(client.profile_for("general").tools) == len(travel.tools) + len(jobs.tools) + 9
+
+
+def test_stream_errors_do_not_leak_exception_text(make_client):
+    client = make_client(enabled=False)
+
+    async def failing_stream(*args, **kwargs):
+        raise RuntimeError("GET https://provider.example/search?key=SECRET failed")
+        yield
+
+    client.stream = failing_stream
+    app.dependency_overrides[get_llm_client] = lambda: client
+    try:
+        response = TestClient(app).post(
+            "/api/llm/prompt/stream", json={"prompt": "hello"}, headers={"X-Request-ID": "req-42"},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert "event: error" in response.text
+    assert "SECRET" not in response.text and '"request_id": "req-42"' in response.text
+
+
+async def test_first_profile_build_runs_once_off_the_event_loop(make_client, monkeypatch):
+    client = make_client(enabled=False)
+    built = []
+
+    def slow_build(mode, *args):
+        built.append(mode)
+        time.sleep(0.2)  # tool module imports
+        return SimpleNamespace(mode=mode)
+
+    monkeypatch.setattr(llm, "build_agent_profile", slow_build)
+    async def ticker():
+        started = time.perf_counter()
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+        return time.perf_counter() - started
+
+    profiles = await asyncio.gather(
+        client.get_profile("travel"), client.get_profile("travel"),
+        asyncio.to_thread(client.profile_for, "travel"),  # warmup
+        ticker(),
+    )
+
+    assert built == ["travel"]
+    assert profiles[0] is profiles[1] is profiles[2]
+    # The loop kept running while the profile was built
+    assert profiles[3] < 0.15
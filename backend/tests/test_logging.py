@@ -0,0 +1,47 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from app import logging_setup
+from app.logging_setup import JsonFormatter, RequestIdFilter, log_payload, request_id_var
+from app.main import app
+
+
+def test_json_formatter_includes_request_id_and_extra_fields():
+    record = logging.LogRecord("app.services.llm", logging.INFO, __file__, 1, "TOOL RESULT", (), None)
+    record.tool = "search_flights"
+    record.latency_ms = 812.5
+    token = request_id_var.set("req-123")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["request_id"] == "req-123"
+    assert entry["msg"] == "TOOL RESULT"
+    assert entry["tool"] == "search_flights" and entry["latency_ms"] == 812.5
+
+
+def test_payload_logging_respects_sample_rate(monkeypatch, caplog):
+    logger = logging.getLogger("test.payload")
+    caplog.set_level(logging.DEBUG, logger="test.payload")
+
+    monkeypatch.setattr(logging_setup, "_payload_sample_rate", 0.0)
+    log_payload(logger, "tool_result", "x" * 100)
+    assert not caplog.records
+
+    monkeypatch.setattr(logging_setup, "_payload_sample_rate", 1.0)
+    log_payload(logger, "tool_result", "x" * 100)
+    assert caplog.records[0].payload_chars == 100
+
+
+def test_request_id_header_is_echoed():
+    client = TestClient(app)
+
+    response = client.get("/health", headers={"X-Request-ID": "abc123"})
+
+    assert response.headers["x-request-id"] == "abc123"
+    assert client.get("/health").headers["x-request-id"]
@@ -0,0 +1,145 @@
+import asyncio
+
+import httpx
+
+from app.config import Settings
+from app.services.mcp_client import PersistentMCPClient, PoolConfig, pool_configs
+from app.services.resilience import CircuitBreaker, RetryPolicy
+
+
+def mcp_transport(requests: list) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "HEAD":
+            return httpx.Response(200)
+        return httpx.Response(200, json={"content": [{"type": "text", "text": request.headers["x-api-host"]}]})
+    return httpx.MockTransport(handler)
+
+
+def test_service_setting_overrides_the_shared_pool_limit():
+    pools = pool_configs(Settings(mcp_max_connections=20, mcp_max_keepalive_connections=10, mcp_max_connections_booking=4))
+
+    assert pools["flights-sky"] == PoolConfig(20, 10, 120.0)
+    assert pools["booking"].max_connections == 4 and pools["booking"].max_keepalive_connections == 4
+
+
+async def test_each_service_gets_one_pool_even_under_concurrent_first_calls():
+    requests = []
+    client = PersistentMCPClient("key", transport=mcp_transport(requests))
+
+    results = await asyncio.gather(*(
+        client.call_tool(service, "search", {"q": index})
+        for index, service in enumerate(["booking", "booking", "flights-sky", "booking"])
+    ))
+
+    assert [r.content for r in results] == [
+        "booking-com.p.rapidapi.com", "booking-com.p.rapidapi.com",
+        "flights-sky.p.rapidapi.com", "booking-com.p.rapidapi.com",
+    ]
+    assert sorted(client._clients) == ["booking", "flights-sky"]
+    assert client.stats()["services"]["booking"]["open"]
+
+    await client.close()
+    assert client._clients == {}
+
+
+async def test_warm_up_opens_every_service_pool():
+    requests = []
+    client = PersistentMCPClient("key", transport=mcp_transport(requests))
+
+    await client.warm_up(connections=2)
+
+    assert len(requests) == 2 * len(PersistentMCPClient.API_HOSTS)
+    assert all(service["open"] for service in client.stats()["services"].values())
+    await client.close()
+
+
+def scripted_transport(statuses: list, requests: list) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        status = statuses.pop(0) if statuses else 200
+        if status == "timeout":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(status, json={"content": [{"type": "text", "text": "ok"}]})
+    return httpx.MockTransport(handler)
+
+
+NO_DELAY = {service: RetryPolicy(max_attempts=3, base_delay=0.0) for service in PersistentMCPClient.API_HOSTS}
+
+
+async def test_read_only_tools_retry_transient_failures():
+    requests = []
+    client = PersistentMCPClient("key", transport=scripted_transport(["timeout", 503], requests), retry_policies=NO_DELAY)
+
+    result = await client.call_tool("booking", "Search_hotels", {"dest_id": "1"})
+
+    assert result.success and result.attempts == 3 and len(requests) == 3
+    assert client.stats()["services"]["booking"]["retries"] == 2
+
+
+async def test_client_errors_and_non_idempotent_tools_are_not_retried():
+    requests = []
+    client = PersistentMCPClient("key", transport=scripted_transport([400, 503], requests), retry_policies=NO_DELAY)
+
+    assert not (await client.call_tool("booking", "Search_hotels", {})).success
+    assert not (await client.call_tool("booking", "createBooking", {})).success
+    assert len(requests) == 2
+
+
+async def test_breaker_fails_fast_while_a_provider_is_down():
+    requests = []
+    client = PersistentMCPClient(
+        "key", transport=scripted_transport([503] * 4, requests), retry_policies=NO_DELAY, breaker_threshold=2,
+    )
+
+    first = await client.call_tool("flights-sky", "searchFlights", {})
+    second = await client.call_tool("flights-sky", "searchFlights", {})
+
+    assert first.error.startswith("HTTP 503") and len(requests) == 2
+    assert "circuit open" in second.error and second.attempts == 0
+    breaker = client.stats()["services"]["flights-sky"]["breaker"]
+    assert breaker["state"] == "open" and breaker["short_circuited"] == 2
+    # Other services are still called
+    assert (await client.call_tool("booking", "Search_hotels", {})).error.startswith("HTTP 503")
+
+
+def test_breaker_closes_after_a_successful_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("booking", failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 31
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+async def test_identical_concurrent_calls_share_one_request():
+    requests = []
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await release.wait()
+        return httpx.Response(200, json={"content": [{"type": "text", "text": "TLL-HEL 49 EUR"}]})
+
+    client = PersistentMCPClient("key", transport=httpx.MockTransport(handler))
+    calls = [
+        client.call_tool("flights-sky", "searchFlights", {"originSkyId": "TLL", "destinationSkyId": "HEL"}),
+        client.call_tool("flights-sky", "searchFlights", {"destinationSkyId": "HEL", "originSkyId": "TLL"}),
+        client.call_tool("flights-sky", "searchFlights", {"originSkyId": "TLL", "destinationSkyId": "RIX"}),
+    ]
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    await asyncio.sleep(0.01)
+    # A caller giving up does not cancel the shared call
+    tasks[0].cancel()
+    release.set()
+    results = await asyncio.gather(*tasks[1:])
+
+    assert len(requests) == 2
+    assert [r.content for r in results] == ["TLL-HEL 49 EUR", "TLL-HEL 49 EUR"]
+    stats = client.stats()
+    assert stats["calls_saved"] == 1 and stats["services"]["flights-sky"]["calls"] == 3
+    assert stats["in_flight"] == 0
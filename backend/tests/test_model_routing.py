@@ -0,0 +1,58 @@
+from langchain_core.messages import AIMessage
+
+from app.config import Settings
+from app.services.agent_profiles import ModelRoute, model_route
+from fakes import FakeModel, FakeResponse, call, text
+from test_sandbox import FakeLLM, make_service, slow_flights
+
+
+class HistoryModel(FakeModel):
+    """FakeModel whose chat exposes a history, like a Gemini ChatSession."""
+
+    def __init__(self, script):
+        super().__init__(script)
+        self.chat.history = ["earlier turns"]
+        self.started_with = []
+
+    def start_chat(self, history=None):
+        self.started_with.append(history)
+        return self.chat
+
+
+def test_mode_setting_overrides_global_and_default():
+    settings = Settings(gemini_tool_model="flash", gemini_answer_model_travel="pro")
+
+    assert model_route(settings, "travel", "base") == ModelRoute("flash", "pro")
+    assert model_route(settings, "jobs", "base") == ModelRoute("flash", "base")
+    assert not model_route(Settings(), "unknown", "base").tiered
+
+
+async def test_tool_turn_on_fast_model_answer_on_strong_model(make_client):
+    async def search_flights(origin: str) -> str:
+        return f"flights from {origin}\n---"
+
+    fast = HistoryModel([FakeResponse([call("search_flights", origin="TLL")])])
+    strong = HistoryModel([FakeResponse([text("Cheapest is 49 EUR")])])
+    client = make_client(fast, [search_flights], answer_model=strong)
+    client._routes["general"] = ModelRoute("fast", "strong")
+
+    result = await client.respond("flights from Tallinn")
+
+    assert fast.chat.sent == ["flights from Tallinn"]
+    # The answer model continues the same chat with the function responses
+    assert strong.started_with == [["earlier turns"]]
+    assert len(strong.chat.sent[0]) == 1
+    assert result.text == "Cheapest is 49 EUR" and result.model == "strong"
+
+
+async def test_sandbox_routes_turns_by_phase():
+    fast = FakeLLM([AIMessage(content="", tool_calls=[{"name": "slow_flights", "args": {"origin": "TLL"}, "id": "call-1"}])])
+    strong = FakeLLM([AIMessage(content="Done")])
+    service = make_service(fast, [slow_flights])
+    service._llms = {"fast": fast, "strong": strong}
+    service._routes = {"general": ModelRoute("test-model", "test-model"), "travel": ModelRoute("fast", "strong")}
+
+    result = await service.process("flights from TLL", namespace="travel")
+
+    assert len(fast.calls) == 1 and len(strong.calls) == 1
+    assert result.text == "Done" and result.model == "strong"
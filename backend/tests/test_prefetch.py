@@ -0,0 +1,75 @@
+import asyncio
+
+from app.services.prefetch import canonical_call, flight_calls_from_intent
+from fakes import FakeModel, FakeResponse, call, text
+
+INTENT = {
+    "transportMode": "all",
+    "tripType": "round-trip",
+    "from": "TLL",
+    "to": "HEL",
+    "departDate": "2025-03-01",
+    "returnDate": "2025-03-05",
+    "cabinClass": "BUSINESS",
+    "maxStops": 0,
+    "adults": 2,
+}
+
+
+def test_intent_maps_to_kiwi_and_skyscanner_calls():
+    calls = dict(flight_calls_from_intent(INTENT))
+
+    assert calls["search_flights"]["return_from"] == "2025-03-05"
+    assert calls["search_flights"]["cabin_class"] == "BUSINESS"
+    assert calls["search_flights_sky"]["cabin_class"] == "business"
+    assert calls["search_flights_sky"]["date"] == "2025-03-01"
+    assert flight_calls_from_intent({**INTENT, "transportMode": "ground"}) == []
+    assert flight_calls_from_intent({**INTENT, "departDate": None}) == []
+
+
+def test_whole_month_intent_spans_the_month():
+    intent = {"tripType": "whole-month", "from": "TLL", "to": "HEL", "wholeMonth": "2024-02"}
+    calls = dict(flight_calls_from_intent(intent))
+
+    assert (calls["search_flights"]["date_from"], calls["search_flights"]["date_to"]) == ("2024-02-01", "2024-02-29")
+    assert calls["search_flights_sky"]["whole_month"] == "2024-02"
+
+
+def test_canonical_call_ignores_defaults_case_and_float_numbers():
+    async def search(origin: str, adults: int = 1, stops: int | None = None) -> str:
+        return ""
+
+    assert canonical_call(search, {"origin": "tll"}) == canonical_call(search, {"origin": "TLL", "adults": 1.0})
+    assert canonical_call(search, {"origin": "TLL"}) != canonical_call(search, {"origin": "TLL", "stops": 0})
+    assert canonical_call(search, {"unknown": 1}) is None
+
+
+async def test_model_tool_call_reuses_prefetched_result(make_client):
+    provider_calls: list[str] = []
+
+    async def search_flights(from_location: str, to_location: str, date_from: str, return_from: str = None,
+                             cabin_class: str = "ECONOMY", max_stops: int = None, adults: int = 1,
+                             children: int = 0, infants: int = 0) -> str:
+        provider_calls.append("kiwi")
+        await asyncio.sleep(0.05)
+        return "Price: 99 EUR\n---"
+
+    async def search_flights_sky(from_location: str, to_location: str, **options) -> str:
+        provider_calls.append("sky")
+        await asyncio.sleep(1)
+        return "never used"
+
+    model = FakeModel([
+        FakeResponse([call("search_flights", from_location="tll", to_location="HEL", date_from="2025-03-01",
+                           return_from="2025-03-05", cabin_class="BUSINESS", max_stops=0.0, adults=2.0)]),
+        FakeResponse([text("Direct for 99 EUR")]),
+    ])
+    client = make_client(model, [search_flights, search_flights_sky], mode="travel")
+
+    events = [event async for event in client.stream("flights", mode="travel", travel_intent=INTENT)]
+
+    assert [event.data["name"] for event in events if event.type == "tool_prefetched"] == ["search_flights", "search_flights_sky"]
+    started = next(event for event in events if event.type == "tool_started")
+    assert started.data["prefetched"]
+    assert provider_calls.count("kiwi") == 1
+    assert events[-1].result.text == "Direct for 99 EUR"
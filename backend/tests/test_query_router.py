@@ -0,0 +1,125 @@
+import json
+import time
+from pathlib import Path
+
+from app.config import Settings
+from app.services.query_router import TRAIN_PATH, NaiveBayesClassifier, QueryRouter, build_query_router, load_examples
+from fakes import FakeModel, FakeResponse, text
+
+
+def test_rules_pick_chains_and_whole_trips_keep_every_tool():
+    router = build_query_router(Settings())
+
+    assert router.route("Cheapest flights from London to Barcelona").chains == ("FLIGHT_SEARCH",)
+    assert router.route("flights and hotel in Lisbon").chains == ("FLIGHT_SEARCH", "ACCOMMODATION")
+    assert router.route("Plan a weekend in Riga: flights and things to do").source == "full_trip"
+    assert router.route("flights, a hotel and restaurants in Rome").source == "broad"
+
+
+def test_classifier_covers_prompts_without_keywords():
+    classifier = NaiveBayesClassifier().fit([
+        ("software developer openings in Berlin", "JOBS"),
+        ("senior engineer listings remote", "JOBS"),
+        ("cheap tickets to Berlin", "FLIGHT_SEARCH"),
+    ])
+    router = QueryRouter(classifier, min_confidence=0.6)
+
+    decision = router.route("senior engineer listings in Munich")
+    assert decision.chains == ("JOBS",) and decision.source == "classifier"
+    assert router.route("thanks!").chains == ()
+
+
+def test_travel_form_adds_its_chains():
+    router = build_query_router(Settings())
+    form = {"transportMode": "flights", "from": "TLL", "to": "LHR", "accommodations": {"enabled": False}}
+
+    assert router.route("Use the travel form above", form).chains == ("FLIGHT_SEARCH",)
+    assert router.route("Use the travel form above", form).source == "intent"
+    assert router.route("and a hotel near the airport?", form).chains == ("FLIGHT_SEARCH", "ACCOMMODATION")
+    # Any transport mode plus a stay spans three chains: every tool stays bound
+    whole_trip = {**form, "transportMode": "all", "accommodations": {"enabled": True, "city": "London"}}
+    assert router.route("Use the travel form above", whole_trip).source == "broad"
+    # An empty form leaves the prompt to decide
+    empty = {"transportMode": "all", "from": "", "to": "", "accommodations": {"enabled": False}}
+    assert router.route("thanks!", empty).chains == ()
+
+
+def test_held_out_prompts_are_never_routed_unsafely():
+    eval_path = Path(TRAIN_PATH).with_name("eval.jsonl")
+    entries = [json.loads(line) for line in eval_path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    trained = {prompt.lower() for prompt, _ in load_examples()}
+    router = build_query_router(Settings())
+
+    assert not [entry["prompt"] for entry in entries if entry["prompt"].lower() in trained]
+    for entry in entries:
+        chains = set(router.route(entry["prompt"], entry.get("intent")).chains)
+        # No chains keeps every tool: slower, never wrong
+        assert not chains or entry["chains"] and set(entry["chains"]) <= chains, entry["prompt"]
+
+
+def test_decisions_stay_under_a_millisecond():
+    router = build_query_router(Settings())
+    prompt = "what should I visit in Barcelona with kids on a rainy day"
+    started = time.perf_counter()
+    for _ in range(200):
+        router.route(prompt)
+    assert (time.perf_counter() - started) / 200 < 0.001
+
+
+async def test_routed_turn_binds_only_the_chain_tools(make_client):
+    async def search_flights(origin: str) -> str:
+        return "flights"
+
+    async def search_hotels(city: str) -> str:
+        return "hotels"
+
+    async def get_directions(origin: str, destination: str) -> str:
+        return "directions"
+
+    full = FakeModel([])
+    narrowed = FakeModel([FakeResponse([text("Hotel Lisboa, 80 EUR")])])
+    bound = []
+
+    def build_chat_model(profile, model_id):
+        bound.append([func.__name__ for func in profile.tools])
+        return narrowed
+
+    client = make_client(full, [search_flights, search_hotels, get_directions], mode="travel")
+    client._sdk_ready = True
+    client._build_chat_model = build_chat_model
+    client._build_planner_model = lambda profile: None
+
+    events = [event async for event in client.stream("hotels in Lisbon", mode="travel")]
+
+    assert bound == [["search_hotels"]]
+    assert full.chat.sent == [] and narrowed.chat.sent == ["hotels in Lisbon"]
+    assert next(e for e in events if e.type == "routed").data["chains"] == ["ACCOMMODATION"]
+    # The narrowed profile is reused by later turns of the same chain
+    narrowed.chat.script.append(FakeResponse([text("Hostel Porto, 25 EUR")]))
+    await client.respond("hostels in Porto", mode="travel")
+    assert len(bound) == 1
+
+
+async def test_travel_form_turns_are_routed(make_client):
+    async def search_flights(origin: str) -> str:
+        return "flights"
+
+    async def search_hotels(city: str) -> str:
+        return "hotels"
+
+    narrowed = FakeModel([FakeResponse([text("Book the 08:00")])])
+    bound = []
+
+    def build_chat_model(profile, model_id):
+        bound.append([func.__name__ for func in profile.tools])
+        return narrowed
+
+    client = make_client(FakeModel([]), [search_flights, search_hotels], mode="travel", prefetch_tools=False)
+    client._sdk_ready = True
+    client._build_chat_model = build_chat_model
+    client._build_planner_model = lambda profile: None
+    form = {"transportMode": "flights", "from": "TLL", "to": "LHR", "accommodations": {"enabled": False}}
+
+    result = await client.respond("which one leaves earliest?", mode="travel", travel_intent=form)
+
+    assert bound == [["search_flights"]] and result.text == "Book the 08:00"
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.mcp_client import PersistentMCPClient
+from app.services.tool_registry import ensure_project_root
+
+ensure_project_root()
+from mcp_servers.rate_limit import (  # noqa: E402
+    HostBucket, RapidAPIRateLimiter, RateLimitExceeded, parse_rate_limit_headers,
+)
+
+
+def test_headers_are_parsed_per_window():
+    windows = parse_rate_limit_headers({
+        "X-RateLimit-Requests-Limit": "500",
+        "X-RateLimit-Requests-Remaining": "120",
+        "X-RateLimit-Requests-Reset": "86400",
+        "x-ratelimit-remaining": "3",
+        "x-ratelimit-reset": str(1_700_000_010),  # epoch timestamp
+    }, now=1_700_000_000)
+
+    assert sorted(windows) == [(3, 10.0), (120, 86400.0)]
+
+
+async def test_callers_queue_for_tokens_instead_of_failing():
+    bucket = HostBucket("jsearch.p.rapidapi.com", rate=50.0, burst=1)
+
+    started = time.monotonic()
+    waits = await asyncio.gather(*(bucket.acquire(max_wait=1.0) for _ in range(3)))
+
+    assert waits[0] < 0.01 and time.monotonic() - started >= 0.035
+    assert bucket.stats()["queued"] == 2 and bucket.stats()["rejected"] == 0
+
+
+async def test_learned_budget_paces_and_an_exhausted_quota_blocks():
+    now = [0.0]
+    bucket = HostBucket("booking-com.p.rapidapi.com", rate=10.0, burst=5, clock=lambda: now[0])
+
+    # 2 requests left in a 4 second window: half a request per second
+    bucket.observe(200, {"x-ratelimit-requests-remaining": "2", "x-ratelimit-requests-reset": "4"})
+    assert bucket.effective_rate == 0.5 and bucket.tokens == 2
+
+    bucket.observe(200, {"x-ratelimit-requests-remaining": "0", "x-ratelimit-requests-reset": "30"})
+    with pytest.raises(RateLimitExceeded):
+        await bucket.acquire(max_wait=1.0)
+    assert bucket.stats()["quota_reset_in_s"] == 30.0
+
+    now[0] = 31.0  # window reset: back to the configured rate
+    assert await bucket.acquire(max_wait=1.0) == 0.0
+    assert bucket.stats()["quota_remaining"] is None and bucket.effective_rate == 10.0
+
+
+async def test_mcp_client_and_direct_calls_share_a_bucket_per_api_host():
+    statuses = [429, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0) if statuses else 200
+        headers = {"x-ratelimit-requests-remaining": "41", "x-ratelimit-requests-reset": "3600"}
+        if status == 429:
+            headers["retry-after"] = "0.05"
+        return httpx.Response(status, headers=headers, json={"content": [{"type": "text", "text": "ok"}]})
+
+    limiter = RapidAPIRateLimiter(rate=100.0, burst=5, max_wait=1.0)
+    client = PersistentMCPClient("key", transport=httpx.MockTransport(handler), rate_limiter=limiter)
+
+    result = await client.call_tool("booking", "Search_hotels", {"dest_id": "1"})
+    assert result.success and result.attempts == 2
+
+    direct = limiter.install(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    await direct.get("https://booking-com.p.rapidapi.com/v1/hotels", headers={"x-rapidapi-host": "booking-com.p.rapidapi.com"})
+    await direct.get("https://maps.googleapis.com/maps/api/geocode/json")
+    await direct.aclose()
+
+    stats = limiter.stats()["hosts"]
+    assert list(stats) == ["booking-com.p.rapidapi.com"]
+    assert stats["booking-com.p.rapidapi.com"]["requests"] == 3 and stats["booking-com.p.rapidapi.com"]["throttled"] == 1
+    assert client.stats()["services"]["booking"]["rate_limit"]["quota_remaining"] == 41
+    await client.close()
+
+
+async def test_calls_past_the_maximum_wait_fail_without_tripping_the_breaker():
+    limiter = RapidAPIRateLimiter(rate=1.0, burst=1, max_wait=0.05)
+    limiter.observe("flights-sky.p.rapidapi.com", 200, {"x-ratelimit-requests-remaining": "0",
+                                                        "x-ratelimit-requests-reset": "60"})
+    requests = []
+    client = PersistentMCPClient(
+        "key", transport=httpx.MockTransport(lambda r: requests.append(r) or httpx.Response(200)), rate_limiter=limiter,
+    )
+
+    result = await client.call_tool("flights-sky", "searchFlights", {})
+
+    assert "rate limit" in result.error and requests == []
+    assert client.stats()["services"]["flights-sky"]["breaker"]["consecutive_failures"] == 0
+    await client.close()
+
+
+async def test_exhausted_quota_without_a_reset_time_blocks_only_for_the_cooldown():
+    now = [0.0]
+    bucket = HostBucket("jsearch.p.rapidapi.com", rate=10.0, burst=5, clock=lambda: now[0], quota_cooldown=30.0)
+
+    bucket.observe(200, {"x-ratelimit-requests-remaining": "0"})
+    assert bucket.wait_time() == 30.0
+    with pytest.raises(RateLimitExceeded):
+        await bucket.acquire(max_wait=1.0)
+
+    now[0] = 30.0  # cooldown over: calls probe the API again
+    assert await bucket.acquire(max_wait=1.0) == 0.0
+    assert bucket.quota_remaining is None
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.config import Settings
+from app.schemas import ChatMessage
+from app.services.response_cache import HashingEmbedder, SemanticResponseCache, normalize_intent, prompt_slots
+from fakes import FakeModel, FakeResponse, text
+
+
+def make_cache(**overrides) -> SemanticResponseCache:
+    options = {"threshold": 0.8, "ttl_by_mode": {"travel": 300, "jobs": 3600}}
+    options.update(overrides)
+    return SemanticResponseCache(HashingEmbedder(), **options)
+
+
+async def test_similar_prompt_hits_and_unrelated_prompt_misses():
+    cache = make_cache()
+    await cache.store("travel", "cheap flights TLL to HEL next weekend", "answer")
+
+    hit = await cache.lookup("travel", "next weekend cheap flight from TLL to HEL")
+    assert hit is not None and hit.value == "answer"
+    assert await cache.lookup("travel", "hotels in Barcelona with a pool") is None
+    assert await cache.lookup("jobs", "cheap flights TLL to HEL next weekend") is None
+
+
+async def test_intent_is_part_of_the_key_and_entries_expire():
+    cache = make_cache(ttl_by_mode={"travel": 0.05})
+    intent = {"origin": "TLL", "destination": "HEL"}
+    await cache.store("travel", "flights", "answer", intent)
+
+    assert await cache.lookup("travel", "flights", {"destination": "hel", "origin": "tll "}) is not None
+    assert await cache.lookup("travel", "flights", {"origin": "TLL", "destination": "RIX"}) is None
+    await asyncio.sleep(0.06)
+    assert await cache.lookup("travel", "flights", intent) is None
+    assert cache.stats()["entries"] == 0
+
+
+async def test_oldest_entries_are_evicted():
+    cache = make_cache(max_entries=2)
+    for index, city in enumerate(["Tallinn", "Helsinki", "Riga"]):
+        await cache.store("travel", f"hotels in {city}", index)
+
+    assert cache.stats()["entries"] == 2
+    assert await cache.lookup("travel", "hotels in Tallinn") is None
+    assert (await cache.lookup("travel", "hotels in Riga")).value == 2
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("flights from London to Paris on 2025-06-01", "flights from Paris to London on 2025-06-01"),
+    ("flights from London to Paris on 2025-06-01", "flights from London to Paris on 2025-06-02"),
+    ("flights London to Paris on June 1", "flights London to Paris on June 3rd"),
+    ("hotels in Rome for 2 adults", "hotels in Rome for 4 adults"),
+    ("hotels in Rome for two adults", "hotels in Rome for two adults and 1 child"),
+    ("hotels in Rome next weekend", "hotels in Rome this weekend"),
+    ("cheapest flight London to Paris", "fastest flight London to Paris"),
+])
+async def test_changed_route_date_or_party_misses_at_the_default_threshold(cached, asked):
+    cache = make_cache(threshold=Settings().response_cache_threshold)
+    await cache.store("travel", cached, "answer")
+
+    assert await cache.lookup("travel", asked) is None
+    assert (await cache.lookup("travel", cached)).value == "answer"
+
+
+def test_prompt_slots_normalize_dates_numbers_and_routes():
+    assert prompt_slots("TLL-HEL on June 3rd for two adults")[0] == prompt_slots("TLL to HEL jun 3 for 2 adults")[0]
+    assert prompt_slots("fastest flight from Tallinn to Helsinki?") == prompt_slots("fastest flight Tallinn to Helsinki")
+
+
+async def test_prompts_that_are_only_slots_hit_on_an_exact_match():
+    cache = make_cache()
+    await cache.store("travel", "TLL-HEL on June 3rd for two adults", "answer")
+
+    assert (await cache.lookup("travel", "TLL to HEL jun 3 for 2 adults")).value == "answer"
+    assert await cache.lookup("travel", "TLL to HEL jun 3 for 3 adults") is None
+
+
+def test_normalize_intent_ignores_order_case_and_empty_fields():
+    assert normalize_intent({"a": "X", "b": None}) == normalize_intent({"a": " x"})
+    assert normalize_intent(None) == ""
+
+
+async def test_client_serves_repeat_prompt_from_cache(make_client):
+    model = FakeModel([FakeResponse([text("Direct flight at 09:00")])])
+    client = make_client(model, response_cache_enabled=True)
+
+    first = await client.respond("fastest flight Tallinn to Helsinki", mode="general")
+    second = await client.respond("fastest flight from Tallinn to Helsinki?", mode="general")
+
+    assert not first.cached
+    assert second.cached and second.text == first.text
+    assert second.cache_similarity >= client.response_cache.threshold
+    assert len(model.chat.sent) == 1
+
+    # Follow-ups with history always go to the model
+    model.chat.script.append(FakeResponse([text("Later flight at 18:00")]))
+    history = [ChatMessage(role="user", content="hi")]
+    third = await client.respond("fastest flight Tallinn to Helsinki", history=history, mode="general")
+    assert not third.cached
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.tools import tool
+
+from app.main import app
+from app.routers import llm as llm_router
+from app.services.agent_profiles import ModelRoute
+from app.services.history import HistoryCompressor
+from app.services.sandbox_llm import LangChainSandboxService
+
+
+class FakeRAG:
+    def __init__(self, delay: float = 0.0, docs=()):
+        self.delay = delay
+        self.docs = list(docs)
+
+    async def search(self, query, namespace, top_k=5):
+        await asyncio.sleep(self.delay)
+        return self.docs
+
+
+GUIDANCE = [{"title": "Flights Sky params", "content": "Use IATA codes"}]
+
+
+class FakeLLM:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def ainvoke(self, messages):
+        self.calls.append(list(messages))
+        return self.responses.pop(0)
+
+    async def astream(self, messages):
+        self.calls.append(list(messages))
+        response = self.responses.pop(0)
+        # Text in two chunks, tool calls as one chunk of partial-call deltas
+        half = len(response.content) // 2
+        for piece in (response.content[:half], response.content[half:]):
+            if piece:
+                yield AIMessageChunk(content=piece)
+        if response.tool_calls:
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(response.tool_calls)
+            ])
+
+
+@tool
+async def slow_flights(origin: str) -> str:
+    """Search flights."""
+    await asyncio.sleep(0.2)
+    return f"flights from {origin}"
+
+
+@tool
+async def slow_hotels(city: str) -> str:
+    """Search hotels."""
+    await asyncio.sleep(0.2)
+    return f"hotels in {city}"
+
+
+@tool
+async def hanging(query: str) -> str:
+    """Never answers."""
+    await asyncio.sleep(5)
+    return "never"
+
+
+def make_service(llm, tools, rag_delay: float = 0.0, rag_docs=()) -> LangChainSandboxService:
+    service = LangChainSandboxService.__new__(LangChainSandboxService)
+    service.model_id = "test-model"
+    service._enabled = True
+    service._pipelined_rag = True
+    service.rag_service = FakeRAG(rag_delay, rag_docs)
+    service.llm = llm
+    service._llms = {"test-model": llm}
+    service._routes = {"general": ModelRoute("test-model", "test-model")}
+    service._tools = tools
+    service._tool_map = {t.name: t for t in tools}
+    service._tool_timeout = 0.5
+    service.history = HistoryCompressor(None, {})
+    return service
+
+
+async def test_tool_calls_run_concurrently_as_tool_messages():
+    llm = FakeLLM([
+        AIMessage(content="", tool_calls=[
+            {"name": "slow_flights", "args": {"origin": "TLL"}, "id": "call-1"},
+            {"name": "slow_hotels", "args": {"city": "Helsinki"}, "id": "call-2"},
+            {"name": "missing", "args": {}, "id": "call-3"},
+        ]),
+        AIMessage(content="Here is your trip"),
+    ])
+    service = make_service(llm, [slow_flights, slow_hotels])
+
+    started = time.perf_counter()
+    result = await service.process("trip to Helsinki")
+
+    assert time.perf_counter() - started < 0.35
+    assert result.text == "Here is your trip"
+    assert result.tools_used == ["slow_flights", "slow_hotels", "missing"]
+    tool_messages = [m for m in llm.calls[1] if isinstance(m, ToolMessage)]
+    assert [(m.tool_call_id, m.content) for m in tool_messages[:2]] == [
+        ("call-1", "flights from TLL"), ("call-2", "hotels in Helsinki"),
+    ]
+    assert "Tool not found" in tool_messages[2].content
+
+
+async def test_slow_tool_times_out_without_blocking_the_turn():
+    service = make_service(FakeLLM([]), [hanging])
+
+    message = await service._run_tool({"name": "hanging", "args": {"query": "x"}, "id": "call-1"})
+
+    assert message.tool_call_id == "call-1"
+    assert "timed out" in message.content
+
+
+async def test_rag_is_skipped_when_no_tool_is_called():
+    llm = FakeLLM([AIMessage(content="Hello!")])
+    service = make_service(llm, [], rag_delay=1.0, rag_docs=GUIDANCE)
+
+    started = time.perf_counter()
+    events = [event async for event in service.stream("hi", stream_tokens=False)]
+
+    assert time.perf_counter() - started < 0.5
+    assert "rag_retrieved" not in [event.type for event in events]
+    result = events[-1].result
+    assert result.text == "Hello!" and result.rag_context == []
+
+
+async def test_first_tool_calls_run_as_planned_and_rag_guides_the_next_turn():
+    llm = FakeLLM([
+        AIMessage(content="", tool_calls=[
+            {"name": "slow_flights", "args": {"origin": "TLL"}, "id": "call-1"},
+            # Planned while retrieval was still running: the argument is missing
+            {"name": "slow_hotels", "args": {}, "id": "call-2"},
+        ]),
+        AIMessage(content="", tool_calls=[{"name": "slow_hotels", "args": {"city": "Helsinki"}, "id": "call-3"}]),
+        AIMessage(content="Done"),
+    ])
+    service = make_service(llm, [slow_flights, slow_hotels], rag_delay=0.15, rag_docs=GUIDANCE)
+
+    events = [event async for event in service.stream("trip from Tallinn to Helsinki", stream_tokens=False)]
+
+    assert "Use IATA codes" not in llm.calls[0][0].content
+    assert "Use IATA codes" in llm.calls[1][0].content
+    calls = [event.data["id"] for event in events if event.type == "tool_call"]
+    assert calls == ["call-1", "call-2", "call-3"]
+    first_results = [m for m in llm.calls[1] if isinstance(m, ToolMessage)]
+    assert first_results[0].content == "flights from TLL"
+    assert first_results[1].content.startswith("Error - ")
+    # Retrieval overlapped the first turn's tools and is reported after them
+    kinds = [event.type for event in events]
+    assert kinds.index("rag_retrieved") > kinds.index("tool_result")
+    assert events[-1].result.text == "Done"
+    assert events[-1].result.rag_context[0]["title"] == "Flights Sky params"
+
+
+async def test_stream_emits_tool_and_token_events_then_summary():
+    llm = FakeLLM([
+        AIMessage(content="", tool_calls=[
+            {"name": "slow_flights", "args": {"origin": "TLL"}, "id": "call-1"},
+            {"name": "hanging", "args": {"query": "x"}, "id": "call-2"},
+        ]),
+        AIMessage(content="Cheapest flight is 49 EUR"),
+    ])
+    service = make_service(llm, [slow_flights, hanging])
+
+    events = [event async for event in service.stream("flights from TLL")]
+
+    kinds = [event.type for event in events]
+    assert kinds[:2] == ["tool_call", "tool_call"]
+    results = [event.data for event in events if event.type == "tool_result"]
+    # The fast call is reported first, the timed-out one after it
+    assert [(r["id"], r["error"]) for r in results] == [("call-1", False), ("call-2", True)]
+    assert "".join(event.data["text"] for event in events if event.type == "token") == "Cheapest flight is 49 EUR"
+    done = events[-1]
+    assert done.type == "done"
+    assert done.result.tools_used == ["slow_flights", "hanging"]
+    assert done.result.rag_context == []
+    assert done.result.text == "Cheapest flight is 49 EUR"
+
+
+class FailingLLM:
+    async def astream(self, messages):
+        raise RuntimeError("GET https://provider.example/search?key=SECRET failed")
+        yield
+
+
+async def test_agent_failures_do_not_leak_exception_text():
+    service = make_service(FailingLLM(), [])
+
+    events = [event async for event in service.stream("hi")]
+
+    error = next(event for event in events if event.type == "error")
+    assert "SECRET" not in str(error.data) and "request_id" in error.data
+    assert events[-1].type == "done" and "SECRET" not in events[-1].result.text
+
+
+def test_sandbox_stream_turns_service_crashes_into_an_error_event(monkeypatch):
+    class CrashingService:
+        async def stream(self, *args):
+            raise RuntimeError("key=SECRET")
+            yield
+
+    monkeypatch.setattr(llm_router, "get_sandbox_service", CrashingService)
+
+    response = TestClient(app).post(
+        "/api/llm/sandbox/stream", json={"prompt": "hi"}, headers={"X-Request-ID": "req-7"},
+    )
+
+    assert "event: error" in response.text
+    assert "SECRET" not in response.text and '"request_id": "req-7"' in response.text
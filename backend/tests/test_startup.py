@@ -0,0 +1,19 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_app_import_defers_gemini_sdk_and_tool_modules():
+    check = (
+        "import sys, app.main; "
+        "heavy = [m for m in ('google.generativeai', 'langchain_google_genai', 'mcp_servers.travel_server', "
+        "'mcp_servers.rate_limit') "
+        "if m in sys.modules]; "
+        "print(','.join(heavy))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True,
+    ).stdout
+
+    assert output.strip().splitlines()[-1:] in ([], [""])
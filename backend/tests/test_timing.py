@@ -0,0 +1,64 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.dependencies import get_llm_client
+from app.main import app
+from app.services.llm import GeminiClient
+from app.services.timing import RequestTimer, span, start_span
+
+
+async def test_spans_nest_across_tasks():
+    async def tool(name: str) -> None:
+        with span(f"tool:{name}", provider="kiwi") as tool_span:
+            with span("http"):
+                await asyncio.sleep(0.01)
+            tool_span.set(status="ok")
+
+    timer = RequestTimer("req")
+    with timer.activate():
+        with span("rag"):
+            with span("rag_embed"):
+                pass
+        turn = start_span("llm_turn", turn=1)
+        turn.end(status="ok")
+        await asyncio.gather(tool("a"), tool("b"))
+
+    tree = timer.to_dict()
+    assert [child["name"] for child in tree["children"]] == ["rag", "llm_turn", "tool:a", "tool:b"]
+    assert tree["children"][0]["children"][0]["name"] == "rag_embed"
+    assert tree["children"][2]["children"][0]["name"] == "http"
+    assert tree["children"][2]["duration_ms"] >= 10
+    assert 'tool_a;dur=' in timer.server_timing()
+    assert 'desc="kiwi ok"' in timer.server_timing()
+
+
+def test_spans_outside_a_timer_are_discarded():
+    with span("orphan") as orphan:
+        pass
+    assert orphan.duration_ms is not None
+
+
+async def test_failed_block_is_marked_as_error():
+    timer = RequestTimer()
+    with timer.activate():
+        try:
+            with span("tool:boom"):
+                raise RuntimeError("down")
+        except RuntimeError:
+            pass
+
+    assert timer.to_dict()["children"][0]["status"] == "error"
+
+
+def test_prompt_endpoint_returns_timings():
+    app.dependency_overrides[get_llm_client] = lambda: GeminiClient(Settings(gemini_api_key=None))
+    try:
+        response = TestClient(app).post("/api/llm/prompt", json={"prompt": "hello"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["timings"]["name"] == "llm_prompt"
+    assert response.headers["server-timing"].startswith("llm_prompt;dur=")
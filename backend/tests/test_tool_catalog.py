@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import mcp_client, tool_catalog
+from app.services.mcp_client import PersistentMCPClient
+from app.services.tool_catalog import ToolCatalog, ToolSchema
+
+SERVERS = {"rapidapi-sky": {"category": "travel", "service": "flights-sky"}, "google-maps": {"category": "travel"}}
+
+SEARCH = {
+    "name": "searchFlights",
+    "description": "Search flights",
+    "inputSchema": {
+        "properties": {"date": {"type": "string"}, "adults": {"type": "integer", "minimum": 1}},
+        "required": ["date"],
+    },
+    "server": "rapidapi-sky",
+    "category": "travel",
+}
+
+
+class Fetcher:
+    def __init__(self, tools=None):
+        self.calls = []
+        self.tools = tools if tools is not None else [ToolSchema(**{**SEARCH, "description": "fresh"})]
+
+    async def __call__(self, server, config):
+        self.calls.append(server)
+        await asyncio.sleep(0.01)
+        return list(self.tools)
+
+
+def write_snapshot(path, fetched_at=0.0):
+    path.write_text(json.dumps({"rapidapi-sky": {"server": "rapidapi-sky", "tools": [SEARCH], "count": 1,
+                                                 "fetched_at": fetched_at}}))
+
+
+async def test_snapshot_serves_precomputed_forms_without_fetching(tmp_path):
+    snapshot = tmp_path / "tools.json"
+    write_snapshot(snapshot, fetched_at=1000.0)
+    fetch = Fetcher()
+    catalog = ToolCatalog(lambda: SERVERS, fetch, snapshot, ttl_seconds=60, clock=lambda: 1010.0)
+
+    assert catalog.load_snapshot() == 1
+    entry = await catalog.get("rapidapi-sky")
+
+    assert fetch.calls == []
+    form = entry.forms["searchFlights"]
+    assert [(f.name, f.type, f.required) for f in form.fields] == [("date", "date", True), ("adults", "number", False)]
+
+
+async def test_stale_entries_are_served_while_a_background_refresh_runs(tmp_path):
+    snapshot = tmp_path / "tools.json"
+    write_snapshot(snapshot)  # no timestamp: stale
+    fetch = Fetcher()
+    catalog = ToolCatalog(lambda: SERVERS, fetch, snapshot, ttl_seconds=60, clock=lambda: 1000.0)
+    catalog.load_snapshot()
+
+    entry = await catalog.get("rapidapi-sky")
+    assert entry.tools[0].description == "Search flights"
+
+    await asyncio.sleep(0.05)
+    assert fetch.calls == ["rapidapi-sky"]
+    assert (await catalog.get("rapidapi-sky")).tools[0].description == "fresh"
+    assert json.loads(snapshot.read_text())["rapidapi-sky"]["fetched_at"] == 1000.0
+
+
+async def test_first_fetch_is_shared_and_failures_keep_the_cached_copy():
+    fetch = Fetcher()
+    catalog = ToolCatalog(lambda: SERVERS, fetch, ttl_seconds=60)
+
+    entries = await asyncio.gather(catalog.get("rapidapi-sky"), catalog.get("rapidapi-sky"))
+    assert fetch.calls == ["rapidapi-sky"] and entries[0] is entries[1]
+
+    fetch.tools = []
+    assert await catalog.refresh("rapidapi-sky") is entries[0]
+    assert catalog.stats()["failed_refreshes"] == 1
+
+
+def test_catalog_endpoint_returns_every_server_in_one_response(tmp_path, monkeypatch):
+    snapshot = tmp_path / "tools.json"
+    write_snapshot(snapshot, fetched_at=1000.0)
+    catalog = ToolCatalog(lambda: SERVERS, Fetcher(), snapshot, ttl_seconds=60, clock=lambda: 1010.0)
+    catalog.load_snapshot()
+    monkeypatch.setattr(tool_catalog, "_catalog", catalog)
+
+    body = TestClient(app).get("/api/mcp/catalog").json()
+
+    assert body["servers"]["rapidapi-sky"]["count"] == 1
+    assert body["servers"]["rapidapi-sky"]["forms"]["searchFlights"]["toolName"] == "searchFlights"
+    assert body["servers"]["google-maps"]["tools"] == []
+
+
+async def test_mcp_client_lists_tools_from_the_catalog(monkeypatch):
+    fetch = Fetcher()
+    monkeypatch.setattr(tool_catalog, "_catalog", ToolCatalog(lambda: SERVERS, fetch, ttl_seconds=60))
+    client = PersistentMCPClient("key")
+
+    assert [tool["name"] for tool in await client.list_tools("flights-sky")] == ["searchFlights"]
+    await client.list_tools("flights-sky")
+    assert fetch.calls == ["rapidapi-sky"]
+    assert await client.list_tools("booking") == []
+
+
+async def test_rapidapi_schemas_are_fetched_over_http_not_npx(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.url.path, request.headers["x-api-host"]))
+        return httpx.Response(200, json={"tools": [{k: SEARCH[k] for k in ("name", "description", "inputSchema")}]})
+
+    async def spawn(server_name, config):
+        raise AssertionError("started an MCP server")
+
+    client = PersistentMCPClient("key", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(mcp_client, "_mcp_client", client)
+    monkeypatch.setattr(tool_catalog, "fetch_tools_from_server", spawn)
+
+    tools = await tool_catalog.fetch_tools("rapidapi-sky", SERVERS["rapidapi-sky"])
+
+    assert [(tool.name, tool.server) for tool in tools] == [("searchFlights", "rapidapi-sky")]
+    assert requests == [("/tools/list", "flights-sky.p.rapidapi.com")]
+    await client.close()
+
+
+async def test_snapshot_is_written_to_a_fresh_cache_directory(tmp_path):
+    snapshot = tmp_path / "cache" / "catalog.json"
+    catalog = ToolCatalog(lambda: SERVERS, Fetcher(), snapshot, ttl_seconds=60)
+
+    await catalog.refresh("rapidapi-sky")
+
+    assert json.loads(snapshot.read_text())["rapidapi-sky"]["count"] == 1
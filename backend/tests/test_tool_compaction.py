@@ -0,0 +1,150 @@
+from app.services.llm import ToolOutcome
+from app.services.tool_compaction import ToolResultStore
+
+
+KIWI_OUTPUT = (
+    "📊 Found 2 flights (1 direct, 1 with stops)\n"
+    "💰 Direct: from $91 | Cheapest (1+ stop): $77\n"
+    "⏱️ Fastest: 1h 5m\n"
+    "----------------------------------------\n"
+    "✈️ 91 USD | 1h 05m | Direct\n"
+    "Route: airBaltic BT301: Tallinn (2025-01-15 08:00) -> Helsinki (2025-01-15 09:05)\n"
+    "Link: https://www.kiwi.com/en/booking?token=" + "a" * 400 + "\n---\n"
+    "✈️ 77 USD | 3h 30m | 1 Stop(s)\n"
+    "Route: SAS SK1: Tallinn (2025-01-15 07:00) -> Stockholm (2025-01-15 07:40) | "
+    "SAS SK2: Stockholm (2025-01-15 09:30) -> Helsinki (2025-01-15 10:30)\n"
+    "Link: https://www.kiwi.com/en/booking?token=" + "b" * 400 + "\n---"
+)
+
+
+def test_kiwi_compaction_keeps_prices_stops_and_link_ids():
+    store = ToolResultStore()
+
+    compact = store.compact("search_flights", KIWI_OUTPUT)
+
+    assert len(compact) < len(KIWI_OUTPUT) / 3
+    assert "Found 2 flights" in compact
+    assert "91 USD | 1h 05m | Direct | airBaltic BT301 Tallinn 08:00→Helsinki 09:05 | [L1]" in compact
+    assert "SAS SK2 Stockholm 09:30→Helsinki 10:30 | [L2]" in compact
+    assert "https://" not in compact
+    assert store.links["L1"].startswith("https://www.kiwi.com/en/booking?token=")
+
+
+def test_default_compaction_drops_images_and_truncates():
+    store = ToolResultStore(max_chars=120)
+    listings = "".join(
+        f"🏠 Flat {i}\nPrice: 80 EUR/night\nLink: https://airbnb.com/rooms/{i}\n"
+        f"Image: https://a0.muscache.com/{i}.jpg\n---\n"
+        for i in range(10)
+    )
+
+    compact = store.compact("search_places", listings)
+
+    assert "muscache" not in compact
+    assert compact.startswith("🏠 Flat 0\nPrice: 80 EUR/night\nLink: [L1]")
+    assert "truncated" in compact
+
+
+def test_link_ids_expand_in_final_and_streamed_text():
+    store = ToolResultStore()
+    store.shorten("https://example.com/one")
+    store.shorten("https://example.com/two")
+
+    assert store.expand_links("Book: [L1] or [here](L2)") == (
+        "Book: https://example.com/one or [here](https://example.com/two)"
+    )
+    streamed = store.expand_stream("Book: [") + store.expand_stream("L2] now") + store.flush_stream()
+    assert streamed == "Book: https://example.com/two now"
+
+
+SKY_OUTPUT = "\n".join(
+    f"✈️ ${price} | 2025-01-15 {dep} -> 2025-01-15 {arr} | {duration} | {stops} stops"
+    for price, dep, arr, duration, stops in [
+        (189, "06:10", "11:45", "5 hr 35 min", 1), (92, "08:00", "09:05", "1 hr 5 min", 0),
+        (92, "08:00", "09:05", "1 hr 5 min", 0), (240, "07:00", "14:20", "7 hr 20 min", 2),
+        (131, "12:15", "13:20", "1 hr 5 min", 0), (305, "16:00", "17:05", "1 hr 5 min", 0),
+        (118, "19:30", "23:55", "4 hr 25 min", 1), (150, "10:00", "11:05", "1 hr 5 min", 0),
+        (99, "21:40", "22:45", "1 hr 5 min", 0), (410, "05:55", "12:10", "6 hr 15 min", 1),
+        (175, "13:00", "17:30", "4 hr 30 min", 1), (260, "09:45", "15:05", "5 hr 20 min", 1),
+    ]
+)
+
+BOOKING_OUTPUT = "\n".join(
+    f"Hotel: {name}\nPrice: {price} EUR\n"
+    f"Link: https://www.booking.com/hotel/fi/{slug}.html?aid=304142&label=gen173nr-{'x' * 120}"
+    f"&checkin=2025-01-15&checkout=2025-01-18&group_adults=2&no_rooms=1\n---"
+    for name, price, slug in [
+        ("Hotel Kämp", "912.6", "kamp"), ("Scandic Grand Central Helsinki", "402.3", "scandic-grand-central"),
+        ("Hotel Haven", "688.0", "haven"),
+    ]
+)
+
+AIRBNB_OUTPUT = "".join(
+    f"🏠 {name}\nPrice: {price} EUR/night\nRating: {rating} | Guests: 2\n"
+    f"Link: https://www.airbnb.com/rooms/{room}?check_in=2025-01-15&check_out=2025-01-18&adults=2\n"
+    f"Image: https://a0.muscache.com/im/pictures/miso/Hosting-{room}/original/{'f' * 40}.jpeg\n---\n"
+    for name, price, rating, room in [
+        ("Sunny loft in Kallio", 95, 4.92, 51234567), ("Design studio by the sea", 140, "N/A", 71234567),
+    ]
+)
+
+
+def test_sky_compaction_sorts_dedupes_and_caps_offers():
+    store = ToolResultStore()
+
+    compact = store.compact("search_flights_sky", SKY_OUTPUT)
+    lines = compact.splitlines()
+
+    assert len(compact) < len(SKY_OUTPUT) * 0.6
+    assert lines[0] == "All departures on 2025-01-15"
+    assert lines[1] == "$92 | 08:00→09:05 | 1h 5m | direct"
+    assert lines[2].startswith("$99 ") and lines[3] == "$118 | 19:30→23:55 | 4h 25m | 1 stop"
+    assert lines[-1] == "(+3 pricier offers)" and "$410" not in compact
+    assert store.compact("search_flights_sky", "No flights found.") == "No flights found."
+
+
+def test_booking_compaction_keeps_totals_and_link_ids():
+    store = ToolResultStore()
+
+    compact = store.compact("search_hotels", BOOKING_OUTPUT)
+
+    assert len(compact) < len(BOOKING_OUTPUT) / 4
+    assert compact.splitlines() == [
+        "Booking.com prices are totals for the whole stay",
+        "Hotel Kämp | 912.6 EUR | [L1]",
+        "Scandic Grand Central Helsinki | 402.3 EUR | [L2]",
+        "Hotel Haven | 688.0 EUR | [L3]",
+    ]
+    assert store.links["L2"].startswith("https://www.booking.com/hotel/fi/scandic-grand-central.html")
+
+
+def test_airbnb_compaction_drops_images_and_repeated_guest_counts():
+    store = ToolResultStore()
+
+    compact = store.compact("search_airbnb", AIRBNB_OUTPUT)
+
+    assert len(compact) < len(AIRBNB_OUTPUT) / 3
+    assert compact.splitlines() == [
+        "Airbnb listings for 2 guests",
+        "Sunny loft in Kallio | 95 EUR/night | rating 4.92 | [L1]",
+        "Design studio by the sea | 140 EUR/night | [L2]",
+    ]
+    assert "muscache" not in compact and len(store.links) == 2
+
+
+def test_each_tool_outcome_is_compacted_once(make_client, monkeypatch):
+    client = make_client()
+    compacted = []
+    original = ToolResultStore.compact
+    monkeypatch.setattr(
+        ToolResultStore, "compact",
+        lambda self, name, result: compacted.append(name) or original(self, name, result),
+    )
+    store = ToolResultStore()
+    outcome = ToolOutcome("search_flights", {}, KIWI_OUTPUT, [], 1.0)
+
+    # Function response, forced synthesis and the conversation record
+    views = {client._model_view(outcome, store) for _ in range(3)}
+
+    assert len(views) == 1 and compacted == ["search_flights"]
+    assert len(store.links) == 2
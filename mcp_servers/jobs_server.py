@@ -1,7 +1,11 @@
 import os
-import httpx
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from .rate_limit import rapidapi_client
+except ImportError:  # run as a script: python mcp_servers/<server>.py
+    from rate_limit import rapidapi_client
+
 mcp = FastMCP("jobs")
 # API keys are read at call time in each function to ensure proper loading
 
@@ -33,7 +37,7 @@ async def search_jobs(query: str, location: str = "Remote", remote_jobs_only: bo
         "x-rapidapi-host": RAPIDAPI_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=querystring)
             response.raise_for_status()
@@ -95,7 +99,7 @@ async def optimize_resume(resume_text: str, job_description: str) -> str:
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
+    async with rapidapi_client(timeout=60.0) as client:
         try:
             response = await client.post(url, headers=headers, json=payload)
             response.raise_for_status()
@@ -146,7 +150,7 @@ async def analyze_job_match(resume_text: str, job_description: str) -> str:
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
+    async with rapidapi_client(timeout=60.0) as client:
         try:
             response = await client.post(url, headers=headers, json=payload)
             response.raise_for_status()
@@ -0,0 +1,303 @@
+"""
+Shared rate limiting for RapidAPI calls.
+
+Every RapidAPI API (host) gets a token bucket. Callers take a token before
+each request and queue, up to a maximum wait, when none is left, so bursts
+are paced to the quota instead of coming back as 429s. The bucket learns its
+budget from the ``x-ratelimit-*-remaining`` / ``x-ratelimit-*-reset``
+response headers:
+
+- short windows (per second/minute) lower the refill rate to what is left
+  spread over the time until the reset;
+- any window with nothing left blocks the host until that window resets,
+  or for a cooldown when the headers give no reset time;
+- a 429 blocks the host for its Retry-After (or one second).
+
+One limiter per process is shared by the MCP tool servers in this package
+and the backend's PersistentMCPClient; both install it as httpx event hooks
+(see ``rapidapi_client`` and ``install``).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Callable, Mapping
+
+import httpx
+
+_REMAINING_HEADER = re.compile(r"^x-ratelimit-(?:(?P<name>.+)-)?remaining$")
+
+# Windows that reset within this many seconds are paced; longer ones (daily,
+# monthly quotas) only stop calls once they are used up
+PACING_WINDOW_SECONDS = 60.0
+
+# How long a budget learned without a reset time holds; an exhausted one
+# blocks the host this long before calls probe the API again
+QUOTA_COOLDOWN_SECONDS = 60.0
+
+
+class RateLimitExceeded(RuntimeError):
+    """No request budget for a host within the caller's maximum wait."""
+
+    def __init__(self, host: str, wait: float) -> None:
+        super().__init__(f"RapidAPI rate limit for {host}: no budget for another {wait:.0f}s, try again later")
+        self.host = host
+        self.wait = wait
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str], now: float | None = None) -> list[tuple[int, float | None]]:
+    """(remaining, seconds until reset) for every x-ratelimit window in the headers."""
+    lowered = {key.lower(): value for key, value in headers.items()}
+    windows = []
+    for key, value in lowered.items():
+        match = _REMAINING_HEADER.match(key)
+        if not match:
+            continue
+        try:
+            remaining = int(float(value))
+        except ValueError:
+            continue
+        name = match.group("name")
+        reset_value = lowered.get(f"x-ratelimit-{name}-reset" if name else "x-ratelimit-reset")
+        reset = None
+        if reset_value is not None:
+            try:
+                reset = float(reset_value)
+            except ValueError:
+                reset = None
+            else:
+                # Some APIs send an epoch timestamp instead of seconds left
+                if reset > 1e9:
+                    reset = reset - (now if now is not None else time.time())
+                reset = max(reset, 0.0)
+        windows.append((remaining, reset))
+    return windows
+
+
+class HostBucket:
+    """Token bucket for one RapidAPI host, adjusted by its rate-limit headers."""
+
+    def __init__(self, host: str, rate: float, burst: int, clock: Callable[[], float] = time.monotonic,
+                 quota_cooldown: float = QUOTA_COOLDOWN_SECONDS) -> None:
+        self.host = host
+        self.rate = rate  # configured requests per second
+        self.burst = burst
+        self.quota_cooldown = quota_cooldown
+        self._clock = clock
+        self.tokens = float(burst)
+        self._updated = clock()
+        self.learned_rate: float | None = None
+        self.quota_remaining: int | None = None
+        self._quota_reset_at: float | None = None
+        self._blocked_until = 0.0
+        self._queue = asyncio.Lock()
+        self.waiting = 0
+        self.requests = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0  # 429 responses seen
+        self.max_wait_s = 0.0
+
+    @property
+    def effective_rate(self) -> float:
+        return min(self.rate, self.learned_rate) if self.learned_rate else self.rate
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(float(self.burst), self.tokens + (now - self._updated) * self.effective_rate)
+        self._updated = now
+        if self._quota_reset_at is not None and now >= self._quota_reset_at:
+            self.quota_remaining = None
+            self._quota_reset_at = None
+            self.learned_rate = None
+
+    def wait_time(self) -> float:
+        """Seconds until a request may go out."""
+        now = self._clock()
+        self._refill(now)
+        waits = [self._blocked_until - now]
+        if self.quota_remaining is not None and self.quota_remaining <= 0:
+            waits.append(self._quota_reset_at - now)
+        if self.tokens < 1:
+            waits.append((1 - self.tokens) / self.effective_rate)
+        return max(0.0, *waits)
+
+    async def acquire(self, max_wait: float) -> float:
+        """Take one request's budget, queueing (FIFO) up to ``max_wait`` seconds.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: No budget within ``max_wait``
+        """
+        started = self._clock()
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self._queue.acquire(), timeout=max_wait)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise RateLimitExceeded(self.host, self.wait_time()) from None
+            try:
+                while True:
+                    wait = self.wait_time()
+                    if wait <= 0:
+                        break
+                    if self._clock() - started + wait > max_wait:
+                        self.rejected += 1
+                        raise RateLimitExceeded(self.host, wait)
+                    await asyncio.sleep(wait)
+                self.tokens -= 1
+                if self.quota_remaining is not None:
+                    self.quota_remaining -= 1
+            finally:
+                self._queue.release()
+        finally:
+            self.waiting -= 1
+        waited = self._clock() - started
+        self.requests += 1
+        if waited > 0.001:
+            self.queued += 1
+            self.max_wait_s = max(self.max_wait_s, waited)
+        return waited
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Update the budget from a response."""
+        now = self._clock()
+        self._refill(now)
+        windows = parse_rate_limit_headers(headers)
+        if windows:
+            paced = [
+                remaining / max(reset, 1.0)
+                for remaining, reset in windows
+                if reset is not None and reset <= PACING_WINDOW_SECONDS and remaining > 0
+            ]
+            self.learned_rate = min(paced) if paced else None
+            remaining, reset = min(windows, key=lambda window: window[0])
+            self.quota_remaining = remaining
+            self._quota_reset_at = now + (reset if reset is not None else self.quota_cooldown)
+            self.tokens = min(self.tokens, float(max(remaining, 0)))
+        if status_code == 429:
+            self.throttled += 1
+            try:
+                retry_after = float(headers.get("retry-after", 1.0))
+            except ValueError:
+                retry_after = 1.0
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self.tokens = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        now = self._clock()
+        self._refill(now)
+        return {
+            "tokens": round(self.tokens, 2),
+            "rate_per_s": round(self.effective_rate, 3),
+            "learned_rate_per_s": round(self.learned_rate, 3) if self.learned_rate else None,
+            "quota_remaining": self.quota_remaining,
+            "quota_reset_in_s": round(self._quota_reset_at - now, 1) if self._quota_reset_at is not None else None,
+            "blocked_for_s": round(max(0.0, self._blocked_until - now), 1),
+            "queue_depth": self.waiting,
+            "requests": self.requests,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "max_wait_s": round(self.max_wait_s, 2),
+        }
+
+
+class RapidAPIRateLimiter:
+    """Token buckets for every RapidAPI host seen by this process."""
+
+    def __init__(self, rate: float = 5.0, burst: int = 5, max_wait: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic, quota_cooldown: float = QUOTA_COOLDOWN_SECONDS) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.quota_cooldown = quota_cooldown
+        self._clock = clock
+        self._buckets: dict[str, HostBucket] = {}
+
+    def configure(self, rate: float, burst: int, max_wait: float,
+                  quota_cooldown: float = QUOTA_COOLDOWN_SECONDS) -> None:
+        """Change the defaults; existing buckets keep what they learned."""
+        self.rate, self.burst, self.max_wait, self.quota_cooldown = rate, burst, max_wait, quota_cooldown
+        for bucket in self._buckets.values():
+            bucket.rate, bucket.burst, bucket.quota_cooldown = rate, burst, quota_cooldown
+
+    def bucket(self, host: str) -> HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = HostBucket(host, self.rate, self.burst, self._clock, self.quota_cooldown)
+        return bucket
+
+    async def acquire(self, host: str) -> float:
+        return await self.bucket(host).acquire(self.max_wait)
+
+    def observe(self, host: str, status_code: int, headers: Mapping[str, str]) -> None:
+        self.bucket(host).observe(status_code, headers)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate_per_s": self.rate,
+            "burst": self.burst,
+            "max_wait_s": self.max_wait,
+            "quota_cooldown_s": self.quota_cooldown,
+            "hosts": {host: bucket.stats() for host, bucket in sorted(self._buckets.items())},
+        }
+
+    # httpx event hooks
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        host = rapidapi_host(request)
+        if host:
+            await self.acquire(host)
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        host = rapidapi_host(response.request)
+        if host:
+            self.observe(host, response.status_code, response.headers)
+
+    def install(self, client: httpx.AsyncClient) -> httpx.AsyncClient:
+        """Pace a client's RapidAPI requests through this limiter."""
+        client.event_hooks["request"].append(self._on_request)
+        client.event_hooks["response"].append(self._on_response)
+        return client
+
+
+def rapidapi_host(request: httpx.Request) -> str | None:
+    """The RapidAPI API a request goes to, or None for other hosts.
+
+    Direct calls name it in x-rapidapi-host; calls through the RapidAPI MCP
+    gateway (mcp.rapidapi.com) in x-api-host.
+    """
+    host = request.headers.get("x-rapidapi-host") or request.headers.get("x-api-host")
+    if host:
+        return host
+    return request.url.host if request.url.host.endswith(".p.rapidapi.com") else None
+
+
+_limiter: RapidAPIRateLimiter | None = None
+
+
+def get_rate_limiter() -> RapidAPIRateLimiter:
+    """Process-wide limiter; defaults from RAPIDAPI_RATE_PER_SECOND, RAPIDAPI_BURST,
+    RAPIDAPI_MAX_WAIT_SECONDS and RAPIDAPI_QUOTA_COOLDOWN_SECONDS."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RapidAPIRateLimiter(
+            rate=float(os.getenv("RAPIDAPI_RATE_PER_SECOND", "5")),
+            burst=int(os.getenv("RAPIDAPI_BURST", "5")),
+            max_wait=float(os.getenv("RAPIDAPI_MAX_WAIT_SECONDS", "10")),
+            quota_cooldown=float(os.getenv("RAPIDAPI_QUOTA_COOLDOWN_SECONDS", str(QUOTA_COOLDOWN_SECONDS))),
+        )
+    return _limiter
+
+
+def rapidapi_client(**kwargs: Any) -> httpx.AsyncClient:
+    """httpx.AsyncClient whose RapidAPI requests go through the shared limiter.
+
+    For calls to ``*.p.rapidapi.com`` hosts; other APIs use a plain httpx.AsyncClient.
+    """
+    return get_rate_limiter().install(httpx.AsyncClient(**kwargs))
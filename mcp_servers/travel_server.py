@@ -3,6 +3,11 @@ import httpx
 import asyncio
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from .rate_limit import rapidapi_client
+except ImportError:  # run as a script: python mcp_servers/<server>.py
+    from rate_limit import rapidapi_client
+
 # Initialize FastMCP server
 mcp = FastMCP("travel")
 
@@ -78,7 +83,7 @@ async def search_flights(
         "x-rapidapi-host": RAPIDAPI_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=querystring)
             response.raise_for_status()
@@ -359,7 +364,7 @@ async def search_hotels(latitude: float, longitude: float, checkin_date: str, ch
         "x-rapidapi-host": "booking-com.p.rapidapi.com"
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=querystring)
             response.raise_for_status()
@@ -404,7 +409,7 @@ async def _execute_sky_search(
         "x-rapidapi-host": "google-flights2.p.rapidapi.com"
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with rapidapi_client(timeout=30.0) as client:
         try:
 
             # Google Flights2 API uses simpler params - direct IATA codes, no entity IDs needed
@@ -1007,7 +1012,7 @@ async def search_ground_transport_backup(from_location: str, to_location: str, d
         "x-rapidapi-host": RAPIDAPI_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=querystring)
             response.raise_for_status()
@@ -2,6 +2,11 @@ import os
 import httpx
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from .rate_limit import rapidapi_client
+except ImportError:  # run as a script: python mcp_servers/<server>.py
+    from rate_limit import rapidapi_client
+
 # Initialize FastMCP server
 mcp = FastMCP("trends")
 
@@ -115,7 +120,7 @@ async def get_google_trends(keyword: str, geo: str = "US") -> str:
         "x-rapidapi-host": TRENDLY_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=querystring)
             response.raise_for_status()
@@ -205,7 +210,7 @@ async def get_tiktok_trends(region: str = "US") -> str:
         "x-rapidapi-host": TIKTOK_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=params)
             response.raise_for_status()
@@ -253,7 +258,7 @@ async def search_tiktok(query: str) -> str:
         "x-rapidapi-host": TIKTOK_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=params)
             response.raise_for_status()
@@ -303,7 +308,7 @@ async def search_instagram(query: str, search_type: str = "hashtag") -> str:
         "x-rapidapi-host": INSTAGRAM_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=params)
             response.raise_for_status()
@@ -340,7 +345,7 @@ async def get_instagram_posts(hashtag: str, count: int = 10) -> str:
         "x-rapidapi-host": INSTAGRAM_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=params)
             response.raise_for_status()
@@ -387,7 +392,7 @@ async def search_facebook(query: str) -> str:
         "x-rapidapi-host": FACEBOOK_HOST
     }
 
-    async with httpx.AsyncClient() as client:
+    async with rapidapi_client() as client:
         try:
             response = await client.get(url, headers=headers, params=params)
             response.raise_for_status()